@@ -10,3 +10,6 @@ python manage.py collectstatic --no-input
 
 # Appliquer les migrations
 python manage.py migrate
+
+# Table du cache partagé (sans effet si elle existe déjà)
+python manage.py createcachetable
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class CoursConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cours'
+
+    def ready(self):
+        # Enregistre les signaux de maintenance des progressions, des places
+        # occupées, des caches (plans de cours, facettes, notifications non lues,
+        # vérification des certificats, statistiques des notes), de l'index de
+        # recherche et du stockage des fichiers de soumission
+        from . import (  # noqa: F401
+            blobs, certificates, content, enrollment, facets, grade_stats, notifications, progress, search
+        )
@@ -0,0 +1,182 @@
+"""
+Stockage adressé par le contenu des fichiers de soumission.
+
+Chaque fichier est rangé sous submissions/blobs/<xx>/<empreinte SHA-256> : un
+contenu identique (nouvelle soumission, copie d'un camarade) n'est écrit
+qu'une fois et compté dans SubmissionBlob.ref_count. L'empreinte est calculée
+pendant la réception, par les gestionnaires d'envoi de FILE_UPLOAD_HANDLERS
+(requêtes multipart) ou lors de l'assemblage d'un envoi par morceaux
+(cours.uploads) ; à défaut, le fichier est relu une fois avant d'être rangé.
+
+Toute Submission enregistrée avec un nouveau fichier passe par `pre_save` :
+les chemins d'enregistrement existants (serializer, admin, envoi par morceaux)
+n'ont rien à savoir du stockage.
+"""
+import hashlib
+import os
+
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F
+from django.db.models.signals import post_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Submission, SubmissionBlob
+
+
+# ---------------------------
+# Empreinte calculée pendant la réception
+# ---------------------------
+class HashingUploadMixin:
+    """
+    Calcule l'empreinte SHA-256 du fichier au fil des morceaux reçus et la
+    place dans l'attribut `sha256` du fichier produit.
+    """
+
+    def new_file(self, *args, **kwargs):
+        # Avant super() : MemoryFileUploadHandler lève StopFutureHandlers lorsqu'il prend le fichier
+        self.digest = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.sha256 = self.digest.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(HashingUploadMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadMixin, TemporaryFileUploadHandler):
+    pass
+
+
+def file_sha256(content):
+    """
+    Empreinte d'un fichier Django lu par morceaux ; la position est remise au début.
+    """
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+# ---------------------------
+# Contenus et compteurs de références
+# ---------------------------
+def blob_name(sha256, filename):
+    return f"submissions/blobs/{sha256[:2]}/{sha256}{os.path.splitext(filename)[1].lower()}"
+
+
+def store_blob(content, filename, sha256=None):
+    """
+    Ajoute une référence au contenu de `content`, en l'écrivant dans le
+    stockage s'il n'y est pas encore. Retourne (SubmissionBlob, créé).
+    """
+    sha256 = sha256 or file_sha256(content)
+    storage = SubmissionBlob._meta.get_field('file').storage
+
+    with transaction.atomic():
+        blob = SubmissionBlob.objects.select_for_update().filter(sha256=sha256).first()
+        if blob is not None:
+            SubmissionBlob.objects.filter(sha256=sha256).update(ref_count=F('ref_count') + 1)
+            if not storage.exists(blob.file.name):
+                # Fichier perdu (purge interrompue) : le contenu reçu le remplace
+                storage.save(blob.file.name, content)
+            return blob, False
+
+    name = blob_name(sha256, filename)
+    # Un fichier déjà présent sous ce nom a, par construction, le même contenu
+    stored = name if storage.exists(name) else storage.save(name, content)
+    try:
+        with transaction.atomic():
+            return SubmissionBlob.objects.create(sha256=sha256, file=stored, size=content.size, ref_count=1), True
+    except IntegrityError:
+        # Même contenu rangé au même moment par une autre requête
+        if stored != name:
+            storage.delete(stored)
+        SubmissionBlob.objects.filter(sha256=sha256).update(ref_count=F('ref_count') + 1)
+        return SubmissionBlob.objects.get(sha256=sha256), False
+
+
+def release_blob(sha256):
+    """
+    Retire une référence au contenu `sha256`. Le contenu n'est pas supprimé
+    ici : une soumission concurrente peut encore le reprendre.
+    """
+    if sha256:
+        SubmissionBlob.objects.filter(sha256=sha256, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+
+
+def purge_unused_blobs(batch_size=500):
+    """
+    Supprime les contenus qui ne sont plus référencés. Retourne le nombre
+    de contenus supprimés.
+    """
+    storage = SubmissionBlob._meta.get_field('file').storage
+    purged = 0
+    while True:
+        with transaction.atomic():
+            # Verrou des lignes : store_blob attend la fin de la purge avant de reprendre un contenu
+            queryset = SubmissionBlob.objects.filter(ref_count=0).order_by('sha256')
+            if connection.features.has_select_for_update_skip_locked:
+                queryset = queryset.select_for_update(skip_locked=True)
+            blobs = list(queryset[:batch_size])
+            if not blobs:
+                return purged
+            for blob in blobs:
+                storage.delete(blob.file.name)
+            SubmissionBlob.objects.filter(sha256__in=[blob.sha256 for blob in blobs], ref_count=0).delete()
+            purged += len(blobs)
+
+
+def identical_submissions(queryset):
+    """
+    Groupes de soumissions au contenu identique parmi `queryset`, en une
+    requête. Chaque groupe est trié par date : la première est l'original.
+    """
+    duplicated = (
+        queryset.exclude(sha256='').values('sha256').order_by()
+        .annotate(copies=Count('id')).filter(copies__gt=1).values('sha256')
+    )
+    groups = {}
+    rows = (
+        queryset.filter(sha256__in=duplicated)
+        .select_related('student', 'assignment')
+        .order_by('sha256', 'submitted_at', 'id')
+    )
+    for submission in rows:
+        groups.setdefault(submission.sha256, []).append(submission)
+    return list(groups.values())
+
+
+# ---------------------------
+# Signaux
+# ---------------------------
+@receiver(pre_save, sender=Submission)
+def submission_file_stored(sender, instance, raw=False, **kwargs):
+    file = instance.file
+    if raw or not file or file._committed:
+        return
+    content = file.file
+    instance.original_filename = os.path.basename(file.name)
+    blob, _ = store_blob(content, file.name, getattr(content, 'sha256', None))
+    if instance.pk:
+        # Remplacement du fichier : l'ancien contenu perd une référence
+        release_blob(Submission.objects.filter(pk=instance.pk).values_list('sha256', flat=True).first())
+    # Le fichier est désormais celui du contenu : FileField n'a plus rien à écrire
+    instance.file = blob.file.name
+    instance.sha256 = blob.sha256
+
+
+@receiver(post_delete, sender=Submission)
+def submission_deleted(sender, instance, **kwargs):
+    release_blob(instance.sha256)
@@ -0,0 +1,113 @@
+"""
+Rendu PDF des certificats avec Pillow.
+
+Ce module n'importe pas Django : il est exécuté dans les processus du pool de
+rendu (cours.certificates). Le modèle de page et les polices sont chargés une
+seule fois par processus par `init_worker`, puis chaque rendu ne fait que
+copier le fond, écrire le texte et encoder le PDF.
+"""
+import hashlib
+import io
+import os
+import unicodedata
+from datetime import datetime
+
+from PIL import Image, ImageDraw, ImageFont
+
+# A4 paysage à 150 dpi
+PAGE_SIZE = (1754, 1240)
+RESOLUTION = 150.0
+
+# Polices utilisées si CERTIFICATE_FONT n'est pas défini (régulière, grasse)
+SYSTEM_FONTS = [
+    ('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'),
+    ('/usr/share/fonts/dejavu/DejaVuSans.ttf', '/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf'),
+    ('/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf',
+     '/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf'),
+]
+
+_template = None
+_fonts = None
+# Vrai si seule la police intégrée de Pillow, sans accents, est disponible
+_ascii_only = False
+
+
+def _default_template():
+    image = Image.new('RGB', PAGE_SIZE, 'white')
+    draw = ImageDraw.Draw(image)
+    width, height = PAGE_SIZE
+    draw.rectangle([40, 40, width - 40, height - 40], outline=(31, 58, 96), width=12)
+    draw.rectangle([70, 70, width - 70, height - 70], outline=(191, 155, 48), width=4)
+    return image
+
+
+def _load_font(path, size):
+    if path:
+        return ImageFont.truetype(path, size)
+    return ImageFont.load_default(size)
+
+
+def init_worker(template_path=None, font_path=None, bold_font_path=None):
+    """
+    Initialise le processus de rendu : modèle de page et polices.
+    """
+    global _template, _fonts, _ascii_only
+    if template_path:
+        with Image.open(template_path) as template:
+            _template = template.convert('RGB').resize(PAGE_SIZE)
+    else:
+        _template = _default_template()
+    if not font_path:
+        font_path, bold_font_path = next(
+            ((regular, bold) for regular, bold in SYSTEM_FONTS if os.path.exists(regular)),
+            (None, None),
+        )
+    bold_font_path = bold_font_path if bold_font_path and os.path.exists(bold_font_path) else font_path
+    _ascii_only = font_path is None
+    _fonts = {
+        'title': _load_font(bold_font_path, 96),
+        'name': _load_font(bold_font_path, 72),
+        'body': _load_font(font_path, 40),
+        'small': _load_font(font_path, 28),
+    }
+
+
+def _centered(draw, y, text, font, fill):
+    if _ascii_only:
+        text = ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+    draw.text((PAGE_SIZE[0] / 2, y), text, font=font, fill=fill, anchor='mm')
+
+
+def render_certificate(data):
+    """
+    Rend le certificat décrit par `data` (student, course, number, issued_at
+    au format ISO) et retourne (empreinte SHA-256, contenu PDF). Le rendu est
+    déterministe : les mêmes données produisent le même fichier.
+    """
+    if _template is None:
+        init_worker()
+
+    image = _template.copy()
+    draw = ImageDraw.Draw(image)
+    issued_at = datetime.fromisoformat(data['issued_at'])
+    navy = (31, 58, 96)
+    grey = (90, 90, 90)
+
+    _centered(draw, 300, "Certificat de réussite", _fonts['title'], navy)
+    _centered(draw, 470, "Décerné à", _fonts['body'], grey)
+    _centered(draw, 580, data['student'], _fonts['name'], (0, 0, 0))
+    _centered(draw, 700, "pour avoir terminé avec succès", _fonts['body'], grey)
+    _centered(draw, 790, data['course'], _fonts['body'], navy)
+    _centered(draw, 960, f"Délivré le {issued_at:%d/%m/%Y}", _fonts['small'], grey)
+    _centered(draw, 1020, f"N° {data['number']}", _fonts['small'], grey)
+
+    output = io.BytesIO()
+    image.save(
+        output, 'PDF',
+        resolution=RESOLUTION,
+        title=f"Certificat {data['number']}",
+        creationDate=issued_at.utctimetuple(),
+        modDate=issued_at.utctimetuple(),
+    )
+    content = output.getvalue()
+    return hashlib.sha256(content).hexdigest(), content
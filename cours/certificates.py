@@ -0,0 +1,349 @@
+"""
+Éligibilité, délivrance et rendu des certificats.
+
+L'éligibilité est décidée par une seule requête d'anti-jointure (« une leçon
+du cours sans complétion de l'utilisateur ») quel que soit le nombre de
+leçons ; generate et mark_completed s'appuient sur le même contrôle.
+
+La délivrance n'effectue pas le rendu PDF : elle dépose un CertificateRenderJob
+dans la même transaction et le certificat reste « pending ». La commande
+render_certificates traite ensuite les rendus par lots dans un pool de
+processus (cours.certificate_pdf) et range les fichiers sous un nom dérivé de
+leur empreinte SHA-256.
+
+La vérification publique d'un certificat par son numéro est servie depuis le
+cache partagé (charge utile minimale signée et son ETag) : les vérifications
+répétées ne touchent pas la base. L'entrée est invalidée à chaque écriture du
+certificat, en particulier à sa révocation, ce qui permet une longue durée
+de vie. Seul le cache HTTP (CERTIFICATE_VERIFICATION_MAX_AGE) reste court.
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, Exists, F, OuterRef, Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import certificate_pdf
+from .models import Certificate, CertificateRenderJob, Lesson, LessonCompletion
+from .notifications import retry_delay
+
+logger = logging.getLogger(__name__)
+
+RENDER_WORKERS = getattr(settings, 'CERTIFICATE_RENDER_WORKERS', None) or os.cpu_count()
+RENDER_MAX_ATTEMPTS = getattr(settings, 'CERTIFICATE_RENDER_MAX_ATTEMPTS', 5)
+RENDER_CLAIM_TIMEOUT = getattr(settings, 'CERTIFICATE_RENDER_CLAIM_TIMEOUT', 10 * 60)
+TEMPLATE_PATH = getattr(settings, 'CERTIFICATE_TEMPLATE', None)
+FONT_PATH = getattr(settings, 'CERTIFICATE_FONT', None)
+BOLD_FONT_PATH = getattr(settings, 'CERTIFICATE_BOLD_FONT', None)
+
+VERIFICATION_SALT = 'cours.certificates.verification'
+VERIFICATION_CACHE_TIMEOUT = getattr(settings, 'CERTIFICATE_VERIFICATION_CACHE_TIMEOUT', 7 * 24 * 60 * 60)
+# Numéros inconnus : cache court, pour absorber les énumérations sans masquer longtemps une délivrance
+VERIFICATION_MISS_TIMEOUT = 60
+
+
+def is_course_completed(user, course):
+    """
+    Vrai si le cours a au moins une leçon et que `user` les a toutes terminées.
+    """
+    completed = LessonCompletion.objects.filter(user_id=user.pk, lesson_id=OuterRef('pk'))
+    counts = Lesson.objects.filter(module__course_id=course.pk).aggregate(
+        total=Count('id'),
+        missing=Count('id', filter=~Q(Exists(completed))),
+    )
+    return counts['total'] > 0 and counts['missing'] == 0
+
+
+def certificate_number(user, course):
+    return f"CERT-{user.pk}-{course.pk}-{int(time.time())}"
+
+
+def issue_certificate(user, course):
+    """
+    Délivre le certificat de `user` pour `course`, ou retourne celui qui existe
+    déjà. La contrainte d'unicité (user, course) départage les demandes
+    concurrentes. Retourne (certificat, créé).
+    """
+    certificate = Certificate.objects.filter(user_id=user.pk, course_id=course.pk).first()
+    if certificate is not None:
+        return certificate, False
+    try:
+        with transaction.atomic():
+            certificate = Certificate.objects.create(
+                user_id=user.pk,
+                course_id=course.pk,
+                certificate_number=certificate_number(user, course),
+            )
+            enqueue_renders([certificate])
+            return certificate, True
+    except IntegrityError:
+        return Certificate.objects.get(user_id=user.pk, course_id=course.pk), False
+
+
+def eligible_students(course):
+    """
+    Identifiants des inscrits qui ont terminé toutes les leçons du cours, en
+    une requête groupée (plus le nombre total de leçons).
+    """
+    total = Lesson.objects.filter(module__course_id=course.pk).count()
+    if not total:
+        return []
+    return list(
+        LessonCompletion.objects.filter(
+            lesson__module__course_id=course.pk,
+            user__enrolled_courses=course.pk,
+        )
+        .order_by()
+        .values('user_id')
+        .annotate(done=Count('lesson_id'))
+        .filter(done=total)
+        .values_list('user_id', flat=True)
+    )
+
+
+def issue_cohort_certificates(course, batch_size=1000):
+    """
+    Délivre en masse les certificats de tous les inscrits éligibles qui n'en
+    ont pas encore. Retourne le nombre de certificats créés.
+    """
+    holders = set(Certificate.objects.filter(course_id=course.pk).values_list('user_id', flat=True))
+    user_ids = [user_id for user_id in eligible_students(course) if user_id not in holders]
+    stamp = int(time.time())
+    with transaction.atomic():
+        Certificate.objects.bulk_create(
+            [
+                Certificate(
+                    user_id=user_id,
+                    course_id=course.pk,
+                    certificate_number=f"CERT-{user_id}-{course.pk}-{stamp}",
+                )
+                for user_id in user_ids
+            ],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+        # bulk_create avec ignore_conflicts ne renvoie pas les clés : on relit les nouveaux certificats
+        created = Certificate.objects.filter(
+            course_id=course.pk, user_id__in=user_ids, render_job__isnull=True
+        ).only('id')
+        return enqueue_renders(created, batch_size=batch_size)
+
+
+# ---------------------------
+# File de rendu PDF
+# ---------------------------
+def enqueue_renders(certificates, batch_size=1000):
+    jobs = CertificateRenderJob.objects.bulk_create(
+        [CertificateRenderJob(certificate_id=certificate.pk) for certificate in certificates],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+    return len(jobs)
+
+
+def certificate_payload(certificate):
+    user = certificate.user
+    return {
+        'student': f"{user.first_name} {user.last_name}".strip() or user.username,
+        'course': str(certificate.course),
+        'number': certificate.certificate_number,
+        'issued_at': certificate.issued_date.isoformat(),
+    }
+
+
+def render_pool(workers=None):
+    """
+    Pool de processus de rendu ; chaque processus charge le modèle et les polices une seule fois.
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers or RENDER_WORKERS,
+        initializer=certificate_pdf.init_worker,
+        initargs=(TEMPLATE_PATH, FONT_PATH, BOLD_FONT_PATH),
+    )
+
+
+def store_pdf(digest, content):
+    """
+    Range le PDF sous certificates/<2 premiers caractères>/<empreinte>.pdf ;
+    un contenu identique n'est écrit qu'une fois.
+    """
+    storage = Certificate._meta.get_field('pdf_file').storage
+    name = f"certificates/{digest[:2]}/{digest}.pdf"
+    if storage.exists(name):
+        return name
+    return storage.save(name, ContentFile(content))
+
+
+def _claim_jobs(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        queryset = CertificateRenderJob.objects.filter(
+            status=CertificateRenderJob.PENDING,
+            available_at__lte=now,
+        ).order_by('available_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True, of=('self',))
+        jobs = list(queryset.select_related('certificate__user', 'certificate__course')[:batch_size])
+        if not jobs:
+            return []
+        CertificateRenderJob.objects.filter(id__in=[job.id for job in jobs]).update(
+            attempts=F('attempts') + 1,
+            available_at=now + timedelta(seconds=RENDER_CLAIM_TIMEOUT),
+        )
+        for job in jobs:
+            job.attempts += 1
+    return jobs
+
+
+def process_render_batch(executor, batch_size=100):
+    """
+    Rend un lot de certificats dans le pool `executor`. Retourne les compteurs du lot.
+    """
+    jobs = _claim_jobs(batch_size)
+    stats = {'processed': len(jobs), 'rendered': 0, 'retried': 0, 'failed': 0}
+    if not jobs:
+        return stats
+
+    futures = [
+        executor.submit(certificate_pdf.render_certificate, certificate_payload(job.certificate))
+        for job in jobs
+    ]
+    rendered = []
+    errors = {}
+    for job, future in zip(jobs, futures):
+        try:
+            digest, content = future.result()
+            job.certificate.pdf_file.name = store_pdf(digest, content)
+            rendered.append(job)
+        except Exception as e:
+            errors[job.id] = f"{type(e).__name__}: {e}"
+
+    now = timezone.now()
+    with transaction.atomic():
+        certificates = [job.certificate for job in rendered]
+        Certificate.objects.bulk_update(certificates, ['pdf_file'])
+        # Un certificat révoqué entre-temps garde son statut
+        Certificate.objects.filter(
+            id__in=[certificate.id for certificate in certificates], status='pending'
+        ).update(status='issued')
+        CertificateRenderJob.objects.filter(id__in=[job.id for job in rendered]).update(
+            status=CertificateRenderJob.DONE, processed_at=now, last_error=''
+        )
+    stats['rendered'] = len(rendered)
+
+    for job in jobs:
+        error = errors.get(job.id)
+        if error is None:
+            continue
+        if job.attempts >= RENDER_MAX_ATTEMPTS:
+            CertificateRenderJob.objects.filter(id=job.id).update(
+                status=CertificateRenderJob.FAILED, processed_at=now, last_error=error
+            )
+            stats['failed'] += 1
+            logger.error(f"Rendu du certificat {job.certificate.certificate_number} abandonné: {error}")
+        else:
+            CertificateRenderJob.objects.filter(id=job.id).update(
+                available_at=now + retry_delay(job.attempts), last_error=error
+            )
+            stats['retried'] += 1
+    return stats
+
+
+def run_render_worker(batch_size=100, workers=None, poll_interval=1.0, once=False, on_batch=None):
+    """
+    Traite la file de rendu en continu (ou une seule fois avec `once`).
+    Retourne les compteurs cumulés.
+    """
+    totals = {'processed': 0, 'rendered': 0, 'retried': 0, 'failed': 0, 'batches': 0}
+    started = time.perf_counter()
+    with render_pool(workers) as executor:
+        while True:
+            batch_started = time.perf_counter()
+            stats = process_render_batch(executor, batch_size)
+            elapsed = time.perf_counter() - batch_started
+            if stats['processed']:
+                totals['batches'] += 1
+                for key in ('processed', 'rendered', 'retried', 'failed'):
+                    totals[key] += stats[key]
+                if on_batch:
+                    on_batch(stats, elapsed)
+                continue
+            if once:
+                break
+            time.sleep(poll_interval)
+    totals['elapsed'] = time.perf_counter() - started
+    return totals
+
+
+# ---------------------------
+# Vérification publique
+# ---------------------------
+def verification_cache_key(number):
+    return f"certificate_verification:{hashlib.sha256(number.encode()).hexdigest()}"
+
+
+def verification_payload(certificate):
+    """
+    Charge utile minimale exposée publiquement. Le statut est réduit à
+    valide/révoqué : le passage de pending à issued par le rendu ne la change pas.
+    """
+    user = certificate.user
+    return {
+        'certificate_number': certificate.certificate_number,
+        'student': f"{user.first_name} {user.last_name}".strip() or user.username,
+        'course': str(certificate.course),
+        'issued_date': certificate.issued_date.isoformat(),
+        'status': 'revoked' if certificate.status == 'revoked' else 'valid',
+    }
+
+
+def build_verification(number):
+    certificate = (
+        Certificate.objects.select_related('user', 'course')
+        .filter(certificate_number=number)
+        .first()
+    )
+    if certificate is None:
+        return None
+    payload = verification_payload(certificate)
+    data = dict(payload, signature=signing.dumps(payload, salt=VERIFICATION_SALT, compress=True))
+    body = json.dumps(data, sort_keys=True, separators=(',', ':'))
+    return {'data': data, 'etag': f'"{hashlib.sha256(body.encode()).hexdigest()[:32]}"'}
+
+
+def get_verification(number):
+    """
+    Vérification en cache de `number` : {'data', 'etag'}, ou None si le numéro est inconnu.
+    """
+    key = verification_cache_key(number)
+    entry = cache.get(key)
+    if entry is None:
+        entry = build_verification(number)
+        if entry is None:
+            cache.set(key, {}, VERIFICATION_MISS_TIMEOUT)
+        else:
+            cache.set(key, entry, VERIFICATION_CACHE_TIMEOUT)
+    return entry or None
+
+
+def revoke_certificate(certificate):
+    certificate.status = 'revoked'
+    certificate.save(update_fields=['status'])
+
+
+@receiver([post_save, post_delete], sender=Certificate)
+def certificate_changed(sender, instance, **kwargs):
+    number = instance.certificate_number
+    transaction.on_commit(lambda: cache.delete(verification_cache_key(number)))
@@ -0,0 +1,41 @@
+"""
+Fils de discussion des leçons, reconstruits à partir du chemin matérialisé des commentaires.
+"""
+from .models import Comment
+from .serializers import CommentThreadSerializer
+
+
+def get_comment_thread(lesson_id, root=None):
+    """
+    Retourne le fil d'une leçon (ou le sous-arbre de `root`) déjà imbriqué.
+
+    Tout le fil est lu en une requête, filtrée par l'index (lesson, path) :
+    l'ordre des chemins place chaque commentaire juste après son parent.
+    """
+    comments = Comment.objects.filter(lesson_id=lesson_id).select_related('user').order_by('path')
+    if root is not None:
+        comments = comments.filter(path__startswith=root.path)
+
+    nodes = {}
+    roots = []
+    for comment, data in _serialized(comments):
+        node = {**data, 'reply_count': 0, 'descendant_count': 0, 'replies': []}
+        nodes[comment.path] = node
+        parent_path = comment.path[:-(Comment.PATH_SEGMENT_WIDTH + 1)]
+        parent = nodes.get(parent_path)
+        if parent is None:
+            roots.append(node)
+            continue
+        parent['replies'].append(node)
+        parent['reply_count'] += 1
+        # Incrémente le nombre total de réponses de chaque ancêtre présent dans le fil
+        ancestor_path = parent_path
+        while ancestor_path in nodes:
+            nodes[ancestor_path]['descendant_count'] += 1
+            ancestor_path = ancestor_path[:-(Comment.PATH_SEGMENT_WIDTH + 1)]
+    return roots
+
+
+def _serialized(comments):
+    comments = list(comments)
+    return zip(comments, CommentThreadSerializer(comments, many=True).data)
@@ -0,0 +1,154 @@
+"""
+Synchronisation en lot des leçons complétées hors ligne (application mobile).
+
+Un lot d'événements (lesson_id, completed_at) est traité en un nombre constant
+de requêtes : résolution des leçons et de l'inscription en une requête,
+insertion en masse des complétions en ignorant les doublons, recalcul absolu
+de la progression, puis évaluation de la fin des modules et des cours touchés.
+Rejouer un lot ne change rien : les complétions existantes sont signalées et
+les notifications portent des clés d'idempotence.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .certificates import is_course_completed, issue_certificate
+from .enrollment import Enrollment
+from .models import Course, Lesson, LessonCompletion, ModuleProgress
+from .notifications import enqueue_notifications
+from .progress import refresh_user_progress
+
+MAX_EVENTS = getattr(settings, 'COMPLETION_SYNC_MAX_EVENTS', 500)
+
+
+def _parse_event(event, now):
+    """
+    Retourne (lesson_id, completed_at), ou None si l'événement est invalide.
+    Une date absente ou dans le futur est ramenée à maintenant.
+    """
+    if not isinstance(event, dict):
+        return None
+    try:
+        lesson_id = int(event.get('lesson_id'))
+    except (TypeError, ValueError):
+        return None
+    completed_at = now
+    raw = event.get('completed_at')
+    if raw:
+        try:
+            completed_at = parse_datetime(str(raw))
+        except ValueError:
+            completed_at = None
+        if completed_at is None:
+            return None
+        if timezone.is_naive(completed_at):
+            completed_at = timezone.make_aware(completed_at)
+        completed_at = min(completed_at, now)
+    return lesson_id, completed_at
+
+
+def sync_completions(user, events):
+    """
+    Enregistre un lot de leçons complétées par `user`. Retourne un résultat
+    par événement (statut completed, already_completed, duplicate, invalid,
+    not_found ou not_enrolled) et les modules, cours et certificats terminés.
+    """
+    now = timezone.now()
+    results = []
+    accepted = {}
+    for index, event in enumerate(events):
+        parsed = _parse_event(event, now)
+        result = {'index': index, 'lesson_id': event.get('lesson_id') if isinstance(event, dict) else None}
+        if parsed is None:
+            result['status'] = 'invalid'
+        elif parsed[0] in accepted:
+            result['status'] = 'duplicate'
+        else:
+            accepted[parsed[0]] = (result, parsed[1])
+        results.append(result)
+
+    # Leçons, module, cours et inscription de l'utilisateur, en une requête
+    lessons = {
+        lesson_id: (module_id, course_id, enrolled)
+        for lesson_id, module_id, course_id, enrolled in (
+            Lesson.objects.filter(id__in=list(accepted))
+            .annotate(enrolled=Exists(
+                Enrollment.objects.filter(course_id=OuterRef('module__course_id'), user_id=user.pk)
+            ))
+            .values_list('id', 'module_id', 'module__course_id', 'enrolled')
+        )
+    }
+    for lesson_id, (result, _) in accepted.items():
+        if lesson_id not in lessons:
+            result['status'] = 'not_found'
+        elif not lessons[lesson_id][2]:
+            result['status'] = 'not_enrolled'
+
+    candidates = {lesson_id: value for lesson_id, value in accepted.items() if 'status' not in value[0]}
+    already_completed = set(
+        LessonCompletion.objects.filter(user=user, lesson_id__in=list(candidates)).values_list('lesson_id', flat=True)
+    )
+    new = {}
+    for lesson_id, (result, completed_at) in candidates.items():
+        if lesson_id in already_completed:
+            result['status'] = 'already_completed'
+        else:
+            new[lesson_id] = (result, completed_at)
+
+    module_ids = {lessons[lesson_id][0] for lesson_id in new}
+    course_ids = {lessons[lesson_id][1] for lesson_id in new}
+    summary = {'results': results, 'completed_modules': [], 'completed_courses': [], 'certificates': []}
+
+    with transaction.atomic():
+        # Une complétion insérée entre-temps (autre appareil) est simplement ignorée
+        LessonCompletion.objects.bulk_create(
+            [LessonCompletion(user=user, lesson_id=lesson_id, completed_at=completed_at)
+             for lesson_id, (_, completed_at) in new.items()],
+            ignore_conflicts=True,
+        )
+        for result, _ in new.values():
+            result['status'] = 'completed'
+        if not new:
+            return summary
+
+        # bulk_create n'envoie pas de signal : la progression est recalculée ici
+        refresh_user_progress(user, module_ids, course_ids)
+        notifications = []
+
+        completed_modules = (
+            ModuleProgress.objects.filter(user=user, module_id__in=module_ids)
+            .select_related('module__course')
+        )
+        for progress in completed_modules:
+            if not progress.is_completed:
+                continue
+            module = progress.module
+            summary['completed_modules'].append(module.id)
+            notifications.append({
+                'user_id': user.pk,
+                'type': 'progression',
+                'title': "Module terminé",
+                'message': f"Vous avez terminé le module '{module.title}' du cours '{module.course}'",
+                'idempotency_key': f"module-completed:{module.id}:{user.pk}",
+            })
+
+        # Même contrôle que generate et mark_completed, une fois par cours touché
+        for course in Course.objects.filter(id__in=course_ids):
+            if not is_course_completed(user, course):
+                continue
+            certificate, _ = issue_certificate(user, course)
+            summary['completed_courses'].append(course.id)
+            summary['certificates'].append(certificate.certificate_number)
+            notifications.append({
+                'user_id': user.pk,
+                'type': 'achievement',
+                'title': "Cours terminé",
+                'message': f"Félicitations ! Vous avez terminé le cours '{course}'. Un certificat a été généré.",
+                'idempotency_key': f"course-completed:{course.id}:{user.pk}",
+            })
+
+        enqueue_notifications(notifications)
+
+    return summary
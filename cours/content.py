@@ -0,0 +1,101 @@
+"""
+Plan de cours (modules → leçons) mis en cache par cours.
+
+Le plan ne dépend pas de l'utilisateur : il est construit en un nombre
+constant de requêtes, mis en cache, puis invalidé dès qu'un module ou une
+leçon du cours change. Seuls les indicateurs de complétion sont calculés à
+chaque requête, à partir d'un unique ensemble d'identifiants.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import CourseModule, Lesson, LessonCompletion
+from .serializers import CourseModuleSerializer, LessonSerializer
+
+OUTLINE_CACHE_TIMEOUT = getattr(settings, 'COURSE_OUTLINE_CACHE_TIMEOUT', 60 * 60)
+
+
+def outline_cache_key(course_id):
+    return f"course_outline:{course_id}"
+
+
+def build_course_outline(course):
+    """
+    Construit le plan du cours avec deux requêtes : les modules puis toutes les leçons.
+    """
+    modules = list(
+        CourseModule.objects.filter(course=course)
+        .annotate(num_lessons=Count('lessons'))
+        .order_by('order')
+    )
+    lessons = (
+        Lesson.objects.filter(module__course=course)
+        .select_related('module')
+        .order_by('module__order', 'order')
+    )
+
+    lessons_by_module = {module.id: [] for module in modules}
+    for lesson_data in LessonSerializer(lessons, many=True).data:
+        lesson_data.pop('is_completed', None)
+        lessons_by_module[lesson_data['module']].append(lesson_data)
+
+    return [
+        {
+            "module": CourseModuleSerializer(module).data,
+            "lessons": lessons_by_module[module.id],
+        }
+        for module in modules
+    ]
+
+
+def get_course_outline(course):
+    key = outline_cache_key(course.id)
+    outline = cache.get(key)
+    if outline is None:
+        outline = build_course_outline(course)
+        cache.set(key, outline, OUTLINE_CACHE_TIMEOUT)
+    return outline
+
+
+def get_course_content(course, user):
+    """
+    Retourne le plan du cours enrichi des indicateurs de complétion de l'utilisateur.
+    """
+    completed_ids = set(
+        LessonCompletion.objects.filter(user=user, lesson__module__course=course)
+        .values_list('lesson_id', flat=True)
+    )
+    content = []
+    for entry in get_course_outline(course):
+        lessons = []
+        for lesson_data in entry["lessons"]:
+            completed = lesson_data['id'] in completed_ids
+            lessons.append({**lesson_data, 'is_completed': completed, 'completed': completed})
+        content.append({"module": entry["module"], "lessons": lessons})
+    return content
+
+
+def invalidate_course_outline(course_id):
+    if course_id is not None:
+        cache.delete(outline_cache_key(course_id))
+
+
+def _course_id_for_module(module_id):
+    return CourseModule.objects.filter(id=module_id).values_list('course_id', flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=CourseModule)
+def module_changed(sender, instance, **kwargs):
+    invalidate_course_outline(instance.course_id)
+
+
+@receiver([post_save, post_delete], sender=Lesson)
+def lesson_changed(sender, instance, **kwargs):
+    invalidate_course_outline(_course_id_for_module(instance.module_id))
+    # Ancien module renseigné par cours.progress.lesson_pre_save en cas de déplacement
+    previous_module_id = getattr(instance, '_previous_module_id', None)
+    if previous_module_id and previous_module_id != instance.module_id:
+        invalidate_course_outline(_course_id_for_module(previous_module_id))
@@ -0,0 +1,219 @@
+"""
+Inscriptions aux cours avec compteur de places dénormalisé (Course.seats_taken).
+
+Une place est réservée par un UPDATE conditionnel unique : la ligne du cours
+est verrouillée le temps de la transaction et la limite ne peut jamais être
+dépassée, même lors d'une ruée sur les inscriptions. La contrainte d'unicité
+(course, user) de la table d'inscription empêche les doubles inscriptions.
+"""
+import csv
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Lower
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+
+from .models import Course
+from .notifications import enqueue_notifications
+
+Enrollment = Course.students.through
+
+
+class EnrollmentError(Exception):
+    message = "Une erreur est survenue lors de l'inscription."
+
+    def __init__(self, message=None):
+        super().__init__(message or self.message)
+        self.message = message or self.message
+
+
+class AlreadyEnrolled(EnrollmentError):
+    message = "Vous êtes déjà inscrit à ce cours."
+
+
+class CourseFull(EnrollmentError):
+    message = "La limite d'inscription a été atteinte."
+
+
+class NotEnrolled(EnrollmentError):
+    message = "Vous n'êtes pas inscrit à ce cours."
+
+
+def has_free_seats(count=1):
+    """
+    Condition « il reste `count` places » (une limite nulle ou à 0 signifie illimité).
+    """
+    return (
+        Q(enrollment_limit__isnull=True)
+        | Q(enrollment_limit=0)
+        | Q(seats_taken__lte=F('enrollment_limit') - count)
+    )
+
+
+def enroll_student(course, user):
+    """
+    Inscrit `user` au cours en réservant atomiquement une place et retourne
+    la ligne d'inscription. Lève AlreadyEnrolled ou CourseFull.
+    """
+    if Enrollment.objects.filter(course_id=course.pk, user_id=user.pk).exists():
+        raise AlreadyEnrolled()
+
+    with transaction.atomic():
+        claimed = Course.objects.filter(has_free_seats(), pk=course.pk).update(
+            seats_taken=F('seats_taken') + 1
+        )
+        if not claimed:
+            raise CourseFull()
+        try:
+            with transaction.atomic():
+                return Enrollment.objects.create(course_id=course.pk, user_id=user.pk)
+        except IntegrityError:
+            # Inscription concurrente : l'exception annule aussi la place réservée
+            raise AlreadyEnrolled()
+
+
+def unenroll_student(course, user):
+    with transaction.atomic():
+        deleted, _ = Enrollment.objects.filter(course_id=course.pk, user_id=user.pk).delete()
+        if not deleted:
+            raise NotEnrolled()
+        Course.objects.filter(pk=course.pk).update(seats_taken=F('seats_taken') - 1)
+
+
+@receiver(m2m_changed, sender=Enrollment)
+def students_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Garde seats_taken à jour pour les modifications faites directement sur
+    Course.students (administration, scripts).
+    """
+    if action == 'pre_clear':
+        instance._cleared_course_ids = (
+            list(instance.enrolled_courses.values_list('id', flat=True)) if reverse else [instance.pk]
+        )
+        return
+    if action == 'post_clear':
+        course_ids = getattr(instance, '_cleared_course_ids', [])
+        for course in Course.objects.filter(id__in=course_ids):
+            Course.objects.filter(pk=course.pk).update(seats_taken=course.students.count())
+        return
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+
+    delta = 1 if action == 'post_add' else -1
+    if reverse:
+        Course.objects.filter(id__in=pk_set).update(seats_taken=F('seats_taken') + delta)
+    else:
+        Course.objects.filter(pk=instance.pk).update(seats_taken=F('seats_taken') + delta * len(pk_set))
+
+
+def read_identifiers(lines):
+    """
+    Lit des identifiants d'étudiants (id ou email) depuis les lignes d'un CSV :
+    première colonne de chaque ligne, en-tête éventuel ignoré.
+    """
+    identifiers = []
+    for index, row in enumerate(csv.reader(lines)):
+        if not row or not row[0].strip():
+            continue
+        value = row[0].strip()
+        if index == 0 and not value.isdigit() and '@' not in value:
+            continue
+        identifiers.append(value)
+    return identifiers
+
+
+def bulk_enroll(course, identifiers, batch_size=1000):
+    """
+    Inscrit en masse des étudiants désignés par id ou email.
+
+    Les utilisateurs sont résolus en une requête ; sous verrou de la ligne du
+    cours, les inscriptions existantes sont relues et la limite de places
+    vérifiée une seule fois, les inscriptions sont insérées par lots en ignorant les
+    conflits et les notifications déposées en masse dans la boîte d'envoi. Retourne un rapport par ligne.
+    """
+    values = [str(value).strip() for value in identifiers]
+    ids = {int(value) for value in values if value.isdigit()}
+    emails = {value.lower() for value in values if not value.isdigit()}
+
+    known_ids = set()
+    by_email = {}
+    users = (
+        User.objects.annotate(email_lower=Lower('email'))
+        .filter(Q(id__in=ids) | Q(email_lower__in=emails))
+        .values_list('id', 'email_lower')
+    )
+    for user_id, email in users:
+        known_ids.add(user_id)
+        if email:
+            by_email.setdefault(email, user_id)
+
+    report = []
+    candidates = []
+    seen = set()
+    for value in values:
+        if value.isdigit():
+            user_id = int(value) if int(value) in known_ids else None
+        else:
+            user_id = by_email.get(value.lower())
+        row = {'input': value, 'user_id': user_id}
+        if user_id is None:
+            row['status'] = 'not_found'
+        elif user_id in seen:
+            row['status'] = 'duplicate'
+        else:
+            seen.add(user_id)
+            candidates.append(row)
+        report.append(row)
+
+    with transaction.atomic():
+        locked = Course.objects.select_for_update().only('seats_taken', 'enrollment_limit').get(pk=course.pk)
+        # Lu sous verrou : les inscriptions validées entre-temps sont signalées
+        # already_enrolled plutôt que comptées comme insérées
+        already_enrolled = set(
+            Enrollment.objects.filter(course_id=course.pk, user_id__in=seen).values_list('user_id', flat=True)
+        )
+        for row in candidates:
+            if row['user_id'] in already_enrolled:
+                row['status'] = 'already_enrolled'
+        candidates = [row for row in candidates if 'status' not in row]
+
+        if locked.enrollment_limit:
+            free_seats = max(locked.enrollment_limit - locked.seats_taken, 0)
+            for row in candidates[free_seats:]:
+                row['status'] = 'course_full'
+            candidates = candidates[:free_seats]
+
+        Enrollment.objects.bulk_create(
+            [Enrollment(course_id=course.pk, user_id=row['user_id']) for row in candidates],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+        # Recompte exact : des inscriptions concurrentes ont pu être ignorées comme conflits
+        Course.objects.filter(pk=course.pk).update(
+            seats_taken=Enrollment.objects.filter(course_id=course.pk).count()
+        )
+        # Clé tirée de l'inscription, comme pour l'inscription unitaire : rejouer
+        # l'import ne notifie pas deux fois, une réinscription ultérieure si
+        enrollment_ids = dict(
+            Enrollment.objects.filter(course_id=course.pk, user_id__in=[row['user_id'] for row in candidates])
+            .values_list('user_id', 'id')
+        )
+        enqueue_notifications(
+            [
+                {
+                    'user_id': row['user_id'],
+                    'type': 'enrollment',
+                    'title': "Inscription réussie",
+                    'message': f"Vous êtes maintenant inscrit au cours: {course}",
+                    'idempotency_key': f"enrollment:{enrollment_ids[row['user_id']]}",
+                }
+                for row in candidates
+            ],
+            batch_size=batch_size,
+        )
+
+    for row in candidates:
+        row['status'] = 'enrolled'
+    return report
@@ -0,0 +1,77 @@
+"""
+Facettes du catalogue de cours : nombre de cours par catégorie, niveau,
+tranche de prix (gratuit / payant) et mise en avant.
+
+Toutes les facettes sont calculées par une seule requête groupée sur les
+quatre dimensions, puis agrégées en Python. Les facettes du catalogue complet
+sont mises en cache et invalidées à chaque écriture sur un cours ou une catégorie.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import BooleanField, Case, Count, Value, When
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Category, Course
+
+FACETS_CACHE_KEY = 'course_facets:all'
+FACETS_CACHE_TIMEOUT = getattr(settings, 'COURSE_FACETS_CACHE_TIMEOUT', 60 * 60)
+
+
+def compute_course_facets(queryset):
+    rows = (
+        queryset.order_by()
+        .annotate(is_free=Case(When(price=0, then=Value(True)), default=Value(False), output_field=BooleanField()))
+        .values('category_id', 'category__name', 'level', 'is_free', 'is_featured')
+        .annotate(total=Count('id'))
+    )
+
+    categories = {}
+    levels = {}
+    prices = {'free': 0, 'paid': 0}
+    featured = {True: 0, False: 0}
+    for row in rows:
+        total = row['total']
+        if row['category_id'] is not None:
+            category = categories.setdefault(
+                row['category_id'],
+                {'id': row['category_id'], 'name': row['category__name'], 'count': 0},
+            )
+            category['count'] += total
+        levels[row['level']] = levels.get(row['level'], 0) + total
+        prices['free' if row['is_free'] else 'paid'] += total
+        featured[row['is_featured']] += total
+
+    return {
+        'category': sorted(categories.values(), key=lambda category: -category['count']),
+        'level': [{'value': level, 'count': count} for level, count in sorted(levels.items())],
+        'price': [{'value': band, 'count': count} for band, count in prices.items()],
+        'is_featured': [{'value': value, 'count': count} for value, count in featured.items()],
+    }
+
+
+def get_course_facets(queryset=None):
+    """
+    Facettes de `queryset`, ou facettes en cache du catalogue complet si aucun filtre n'est appliqué.
+    """
+    if queryset is not None:
+        return compute_course_facets(queryset)
+    facets = cache.get(FACETS_CACHE_KEY)
+    if facets is None:
+        facets = compute_course_facets(Course.objects.all())
+        cache.set(FACETS_CACHE_KEY, facets, FACETS_CACHE_TIMEOUT)
+    return facets
+
+
+def get_category_course_counts():
+    return {category['id']: category['count'] for category in get_course_facets()['category']}
+
+
+def invalidate_course_facets():
+    cache.delete(FACETS_CACHE_KEY)
+
+
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Category)
+def catalog_changed(sender, **kwargs):
+    invalidate_course_facets()
@@ -0,0 +1,206 @@
+"""
+Statistiques des notes par devoir et par cours, calculées avec NumPy.
+
+Les notes sont lues en une requête sous forme de tableau plat (devoir,
+étudiant, note) puis normalisées par Assignment.max_score : chaque valeur est
+dans [0, 1]. Pour chaque étudiant, seule sa dernière soumission notée compte.
+Moyenne, écart type, médiane, percentiles et histogramme de tous les devoirs
+sont calculés ensemble, sans boucle Python par devoir : les valeurs sont
+triées par (devoir, note) et les percentiles lus par indices.
+
+Les statistiques sont mises en cache par devoir et par cours, puis invalidées
+dès qu'une note change (signaux de Submission, et cours.grading.bulk_grade
+pour les mises à jour en lot qui n'émettent pas de signaux).
+"""
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Assignment, Lesson, Submission
+
+STATS_CACHE_TIMEOUT = getattr(settings, 'GRADE_STATS_CACHE_TIMEOUT', 60 * 60)
+# Intervalles égaux de [0, 1] (note / barème)
+HISTOGRAM_BINS = getattr(settings, 'GRADE_STATS_HISTOGRAM_BINS', 10)
+# La médiane est le percentile 50
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def assignment_stats_key(assignment_id):
+    return f"grade_stats:assignment:{assignment_id}"
+
+
+def course_stats_key(course_id):
+    return f"grade_stats:course:{course_id}"
+
+
+def _latest_grades(assignment_ids):
+    """
+    Tableaux (devoir, note) des dernières soumissions notées de chaque
+    étudiant, triés par devoir.
+    """
+    rows = list(
+        Submission.objects.filter(assignment_id__in=assignment_ids, grade__isnull=False)
+        .order_by('assignment_id', 'student_id', '-submitted_at', '-id')
+        .values_list('assignment_id', 'student_id', 'grade')
+    )
+    data = np.array(rows, dtype=np.int64).reshape(-1, 3)
+    assignment, student = data[:, 0], data[:, 1]
+    # Première ligne de chaque couple (devoir, étudiant) : la plus récente
+    latest = np.ones(len(data), dtype=bool)
+    latest[1:] = (assignment[1:] != assignment[:-1]) | (student[1:] != student[:-1])
+    return assignment[latest], data[latest, 2]
+
+
+def _group_stats(groups, values, count):
+    """
+    Statistiques de `values` pour chacun des `count` groupes, `groups` donnant
+    le groupe de chaque valeur.
+    """
+    order = np.lexsort((values, groups))
+    groups, values = groups[order], values[order]
+    sizes = np.bincount(groups, minlength=count)
+    starts = np.cumsum(sizes) - sizes
+    empty = sizes == 0
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(groups, weights=values, minlength=count) / sizes
+        std = np.sqrt(np.bincount(groups, weights=(values - mean[groups]) ** 2, minlength=count) / sizes)
+
+    # Interpolation linéaire entre les deux valeurs encadrantes (comme np.percentile)
+    position = np.array(PERCENTILES) / 100 * np.maximum(sizes - 1, 0)[:, None]
+    low = np.floor(position).astype(np.int64)
+    high = np.ceil(position).astype(np.int64)
+    last = max(len(values) - 1, 0)
+    padded = values if len(values) else np.zeros(1)
+    low_values = padded[np.minimum(starts[:, None] + low, last)]
+    high_values = padded[np.minimum(starts[:, None] + high, last)]
+    percentiles = low_values + (high_values - low_values) * (position - low)
+    minimum = padded[np.minimum(starts, last)]
+    maximum = padded[np.minimum(starts + sizes - 1, last)]
+
+    bins = np.minimum((np.clip(values, 0, 1) * HISTOGRAM_BINS).astype(np.int64), HISTOGRAM_BINS - 1)
+    histogram = np.bincount(groups * HISTOGRAM_BINS + bins, minlength=count * HISTOGRAM_BINS)
+    histogram = histogram.reshape(count, HISTOGRAM_BINS)
+
+    stats = []
+    for index in range(count):
+        if empty[index]:
+            stats.append({
+                'count': 0, 'mean': None, 'std': None, 'min': None, 'max': None, 'median': None,
+                'percentiles': {f"p{p}": None for p in PERCENTILES},
+                'histogram': [0] * HISTOGRAM_BINS,
+            })
+            continue
+        by_percentile = dict(zip(PERCENTILES, percentiles[index].round(4).tolist()))
+        stats.append({
+            'count': int(sizes[index]),
+            'mean': round(float(mean[index]), 4),
+            'std': round(float(std[index]), 4),
+            'min': round(float(minimum[index]), 4),
+            'max': round(float(maximum[index]), 4),
+            'median': by_percentile[50],
+            'percentiles': {f"p{p}": value for p, value in by_percentile.items()},
+            'histogram': histogram[index].tolist(),
+        })
+    return stats
+
+
+def compute_grade_stats(assignments):
+    """
+    Statistiques normalisées des devoirs `assignments` ((id, max_score)) en
+    une requête. Retourne ({assignment_id: stats}, stats de l'ensemble).
+    """
+    ids = np.array(sorted(assignment_id for assignment_id, _ in assignments), dtype=np.int64)
+    max_scores = dict(assignments)
+    scale = np.array([max_scores[assignment_id] for assignment_id in ids.tolist()], dtype=np.float64)
+
+    assignment, grades = _latest_grades(ids.tolist())
+    groups = np.searchsorted(ids, assignment)
+    # Un barème nul ne permet pas de normaliser : ses notes sont ignorées
+    valid = scale[groups] > 0
+    groups = groups[valid]
+    values = grades[valid] / scale[groups]
+
+    per_assignment = _group_stats(groups, values, len(ids))
+    overall = _group_stats(np.zeros(len(values), dtype=np.int64), values, 1)[0]
+    return dict(zip(ids.tolist(), per_assignment)), overall
+
+
+def get_assignment_stats(assignment):
+    key = assignment_stats_key(assignment.id)
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_grade_stats([(assignment.id, assignment.max_score)])[0][assignment.id]
+        cache.set(key, stats, STATS_CACHE_TIMEOUT)
+    return {'assignment': assignment.id, 'title': assignment.title, 'max_score': assignment.max_score, **stats}
+
+
+def get_course_stats(course):
+    """
+    Statistiques du cours (toutes notes confondues) et de chacun de ses devoirs.
+    """
+    assignments = list(
+        Assignment.objects.filter(lesson__module__course=course)
+        .order_by('lesson__module__order', 'lesson__order', 'due_date', 'id')
+        .values_list('id', 'title', 'max_score')
+    )
+    keys = {assignment_id: assignment_stats_key(assignment_id) for assignment_id, _, _ in assignments}
+    cached = cache.get_many([*keys.values(), course_stats_key(course.id)])
+    overall = cached.get(course_stats_key(course.id))
+
+    # Sans les statistiques du cours, toutes les notes sont relues ; sinon seulement les devoirs manquants
+    stale = [
+        (assignment_id, max_score) for assignment_id, _, max_score in assignments
+        if overall is None or keys[assignment_id] not in cached
+    ]
+    if stale or overall is None:
+        computed, computed_overall = compute_grade_stats(stale)
+        entries = {keys[assignment_id]: stats for assignment_id, stats in computed.items()}
+        if overall is None:
+            overall = computed_overall
+            entries[course_stats_key(course.id)] = overall
+        cache.set_many(entries, STATS_CACHE_TIMEOUT)
+        cached.update(entries)
+
+    return {
+        'course': {'assignments': len(assignments), **overall},
+        'assignments': [
+            {'assignment': assignment_id, 'title': title, 'max_score': max_score, **cached[keys[assignment_id]]}
+            for assignment_id, title, max_score in assignments
+        ],
+    }
+
+
+def invalidate_grade_stats(assignment_ids, course_ids=None):
+    """
+    Oublie les statistiques des devoirs `assignment_ids` et de leurs cours,
+    après validation de la transaction.
+    """
+    assignment_ids = set(assignment_ids)
+    if not assignment_ids:
+        return
+    if course_ids is None:
+        course_ids = set(
+            Assignment.objects.filter(id__in=assignment_ids).values_list('lesson__module__course_id', flat=True)
+        )
+    keys = [assignment_stats_key(assignment_id) for assignment_id in assignment_ids]
+    keys += [course_stats_key(course_id) for course_id in course_ids if course_id is not None]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+@receiver([post_save, post_delete], sender=Submission)
+def submission_graded(sender, instance, created=False, **kwargs):
+    # Une nouvelle soumission sans note ne change aucune statistique
+    if created and instance.grade is None:
+        return
+    invalidate_grade_stats([instance.assignment_id])
+
+
+@receiver([post_save, post_delete], sender=Assignment)
+def assignment_changed(sender, instance, **kwargs):
+    # Barème modifié ou devoir supprimé : la ligne peut ne plus exister, on passe par la leçon
+    course_ids = Lesson.objects.filter(id=instance.lesson_id).values_list('module__course_id', flat=True)
+    invalidate_grade_stats([instance.id], set(course_ids))
@@ -0,0 +1,230 @@
+"""
+Export du carnet de notes d'un cours (étudiants × devoirs), en flux.
+
+Les lignes sont produites au fil de deux curseurs côté serveur
+(`values_list(...).iterator(chunk_size)`) triés par étudiant : les inscrits et
+les soumissions du cours, fusionnés à la volée. Aucune instance de modèle
+n'est créée et un seul étudiant est en mémoire à la fois. La première ligne
+(l'en-tête) part dès que la liste des devoirs est lue.
+
+Formats : CSV, ou XLSX écrit directement en flux (zip sans retour arrière,
+feuille en chaînes en ligne), sans dépendance supplémentaire.
+"""
+import csv
+import io
+import itertools
+import zipfile
+from operator import itemgetter
+from xml.sax.saxutils import escape
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+from .enrollment import Enrollment
+from .models import Assignment, Submission
+
+EXPORT_CHUNK_SIZE = getattr(settings, 'GRADEBOOK_EXPORT_CHUNK_SIZE', 2000)
+# Taille des morceaux envoyés au client
+FLUSH_SIZE = 64 * 1024
+
+CSV_CONTENT_TYPE = 'text/csv; charset=utf-8'
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def _student_grades(course, chunk_size):
+    """
+    (student_id, username, email, {assignment_id: note}) par étudiant ayant
+    rendu au moins un devoir, trié par étudiant. Pour plusieurs soumissions au
+    même devoir, la plus récente compte.
+    """
+    rows = (
+        Submission.objects.filter(assignment__lesson__module__course=course)
+        .order_by('student_id', 'assignment_id', '-submitted_at', '-id')
+        .values_list('student_id', 'student__username', 'student__email', 'assignment_id', 'grade')
+        .iterator(chunk_size=chunk_size)
+    )
+    for student_id, group in itertools.groupby(rows, key=itemgetter(0)):
+        grades = {}
+        for _, username, email, assignment_id, grade in group:
+            grades.setdefault(assignment_id, grade)
+        yield student_id, username, email, grades
+
+
+def gradebook_rows(course, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Lignes du carnet de notes : en-tête, puis une ligne par étudiant inscrit
+    ou ayant rendu un devoir, avec sa note à chaque devoir et le total.
+    """
+    assignments = list(
+        Assignment.objects.filter(lesson__module__course=course)
+        .order_by('lesson__module__order', 'lesson__order', 'due_date', 'id')
+        .values_list('id', 'title', 'max_score')
+    )
+    assignment_ids = [assignment_id for assignment_id, _, _ in assignments]
+    max_total = sum(max_score for _, _, max_score in assignments)
+    yield (['student_id', 'username', 'email']
+           + [f"{title} (/{max_score})" for _, title, max_score in assignments]
+           + [f"total (/{max_total})"])
+
+    students = (
+        Enrollment.objects.filter(course=course)
+        .order_by('user_id')
+        .values_list('user_id', 'user__username', 'user__email')
+        .iterator(chunk_size=chunk_size)
+    )
+    graded = _student_grades(course, chunk_size)
+
+    # Fusion de deux flux triés par identifiant d'étudiant
+    student = next(students, None)
+    group = next(graded, None)
+    while student is not None or group is not None:
+        if group is None or (student is not None and student[0] < group[0]):
+            identity, grades = student, {}
+            student = next(students, None)
+        elif student is None or group[0] < student[0]:
+            # Soumissions d'un étudiant désinscrit depuis
+            identity, grades = group[:3], group[3]
+            group = next(graded, None)
+        else:
+            identity, grades = student, group[3]
+            student = next(students, None)
+            group = next(graded, None)
+        values = [grades.get(assignment_id) for assignment_id in assignment_ids]
+        yield list(identity) + values + [sum(value for value in values if value is not None)]
+
+
+def csv_stream(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for index, row in enumerate(rows):
+        writer.writerow(['' if value is None else value for value in row])
+        # L'en-tête part seul, tout de suite ; ensuite par morceaux
+        if index == 0 or buffer.tell() >= FLUSH_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink:
+    """
+    Destination sans retour arrière pour zipfile : les octets écrits sont
+    récupérés au fur et à mesure par le générateur.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+XLSX_STATIC_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Notes" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c><v>{value}</v></c>'
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(str(value))}</t></is></c>'
+
+
+def xlsx_stream(rows):
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_STATIC_PARTS.items():
+            archive.writestr(name, content)
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            for index, row in enumerate(rows):
+                sheet.write(('<row>' + ''.join(_xlsx_cell(value) for value in row) + '</row>').encode())
+                if index == 0 or sink.size >= FLUSH_SIZE:
+                    yield sink.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.drain()
+
+
+async def _async_chunks(chunks, batch_size=16):
+    # Sous ASGI, un itérateur synchrone serait entièrement consommé avant l'envoi :
+    # les morceaux sont tirés par petits lots, dans le thread des requêtes SQL
+    next_batch = sync_to_async(lambda: list(itertools.islice(chunks, batch_size)))
+    while True:
+        batch = await next_batch()
+        if not batch:
+            return
+        for chunk in batch:
+            yield chunk
+
+
+def gradebook_response(request, course, output='csv'):
+    """
+    Réponse en flux du carnet de notes de `course`, au format 'csv' ou 'xlsx'.
+    """
+    rows = gradebook_rows(course)
+    if output == 'xlsx':
+        chunks, content_type, extension = xlsx_stream(rows), XLSX_CONTENT_TYPE, 'xlsx'
+    else:
+        chunks, content_type, extension = csv_stream(rows), CSV_CONTENT_TYPE, 'csv'
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        chunks = _async_chunks(chunks)
+
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="notes-cours-{course.pk}.{extension}"'
+    response['Cache-Control'] = 'no-store'
+    # Désactive la mise en tampon des proxys (nginx)
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,246 @@
+"""
+Notation en lot des soumissions.
+
+Un lot de lignes (submission_id, grade, feedback) est validé en une passe :
+soumissions et barèmes (Assignment.max_score) sont lus en une requête, les
+lignes valides appliquées par bulk_update dans une seule transaction, et les
+notifications d'évaluation déposées en une insertion dans la boîte d'envoi.
+Chaque ligne reçoit un statut : graded, unchanged, duplicate, invalid,
+not_found ou out_of_range. Rejouer un lot déjà appliqué ne change rien et ne
+notifie personne.
+
+File de correction : les soumissions non notées, de l'échéance la plus proche
+à la plus lointaine puis par ordre d'arrivée. L'échéance appartient au devoir :
+aucun index de Submission ne peut servir ce tri, qui se fait après jointure.
+L'index partiel submission_grading_queue_idx sert la file filtrée sur un devoir
+(ordre d'arrivée) et les décomptes par devoir de pending_counts. Plusieurs correcteurs se partagent la file en
+réservant chacun les N suivantes (FOR UPDATE SKIP LOCKED sur PostgreSQL) ; une
+réservation non suivie d'une note expire après CLAIM_TTL.
+"""
+import csv
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .grade_stats import invalidate_grade_stats
+from .models import Course, Submission
+from .notifications import enqueue_notifications
+
+MAX_ROWS = getattr(settings, 'GRADING_BULK_MAX_ROWS', 5000)
+GRADE_COLUMNS = ['submission_id', 'grade', 'feedback']
+
+QUEUE_ORDERING = ('assignment__due_date', 'submitted_at', 'id')
+CLAIM_TTL = getattr(settings, 'GRADING_CLAIM_TTL', 30 * 60)
+CLAIM_MAX = getattr(settings, 'GRADING_CLAIM_MAX', 50)
+
+
+def read_grades(lines):
+    """
+    Lit des lignes de notation depuis un CSV (colonnes submission_id, grade et,
+    facultative, feedback). L'en-tête est facultatif s'il suit cet ordre.
+    """
+    rows = []
+    reader = csv.reader(lines)
+    columns = GRADE_COLUMNS
+    for index, row in enumerate(reader):
+        if not row or not any(value.strip() for value in row):
+            continue
+        if index == 0 and not row[0].strip().isdigit():
+            columns = [value.strip().lower() for value in row]
+            continue
+        rows.append({column: value.strip() for column, value in zip(columns, row)})
+    return rows
+
+
+def _parse_row(row):
+    """
+    Retourne (submission_id, grade, feedback) ; feedback vaut None si la ligne
+    n'en contient pas. Lève ValueError si la ligne est invalide.
+    """
+    if not isinstance(row, dict):
+        raise ValueError("Ligne invalide.")
+    try:
+        submission_id = int(row.get('submission_id'))
+    except (TypeError, ValueError):
+        raise ValueError("submission_id doit être un entier.")
+    grade = row.get('grade')
+    try:
+        grade = int(grade)
+    except (TypeError, ValueError):
+        # « 15.0 » exporté par un tableur est accepté, pas « 15.5 »
+        try:
+            grade = float(grade)
+        except (TypeError, ValueError):
+            raise ValueError("grade doit être un entier.")
+        if not grade.is_integer():
+            raise ValueError("grade doit être un entier.")
+        grade = int(grade)
+    feedback = row.get('feedback')
+    return submission_id, grade, None if feedback is None else str(feedback)
+
+
+def bulk_grade(rows, queryset=None):
+    """
+    Applique les notes de `rows` aux soumissions de `queryset` (toutes par
+    défaut). Retourne le nombre de soumissions notées et un résultat par ligne.
+    """
+    queryset = Submission.objects.all() if queryset is None else queryset
+    results = []
+    accepted = {}
+    for index, row in enumerate(rows):
+        result = {'index': index, 'submission_id': row.get('submission_id') if isinstance(row, dict) else None}
+        try:
+            submission_id, grade, feedback = _parse_row(row)
+        except ValueError as e:
+            result.update(status='invalid', detail=str(e))
+        else:
+            if submission_id in accepted:
+                result['status'] = 'duplicate'
+            else:
+                accepted[submission_id] = (result, grade, feedback)
+        results.append(result)
+
+    # Soumissions et barèmes, en une requête
+    submissions = {
+        submission.id: submission
+        for submission in queryset.filter(id__in=list(accepted)).select_related('assignment')
+    }
+
+    now = timezone.now()
+    to_update = []
+    notifications = []
+    for submission_id, (result, grade, feedback) in accepted.items():
+        submission = submissions.get(submission_id)
+        if submission is None:
+            result['status'] = 'not_found'
+            continue
+        assignment = submission.assignment
+        if not 0 <= grade <= assignment.max_score:
+            result.update(status='out_of_range', detail=f"La note doit être comprise entre 0 et {assignment.max_score}.")
+            continue
+        feedback = submission.feedback if feedback is None else feedback
+        if submission.grade == grade and submission.feedback == feedback:
+            result['status'] = 'unchanged'
+            continue
+
+        submission.grade = grade
+        submission.feedback = feedback
+        # bulk_update n'applique pas auto_now
+        submission.updated_at = now
+        to_update.append(submission)
+        result['status'] = 'graded'
+        notifications.append({
+            'user_id': submission.student_id,
+            'type': 'grade',
+            'title': "Devoir noté",
+            'message': f"Votre devoir '{assignment.title}' a été noté : {grade}/{assignment.max_score}.",
+        })
+
+    with transaction.atomic():
+        Submission.objects.bulk_update(to_update, ['grade', 'feedback', 'updated_at'], batch_size=500)
+        enqueue_notifications(notifications)
+        # bulk_update n'émet pas de signaux : les statistiques des devoirs notés sont oubliées ici
+        invalidate_grade_stats({submission.assignment_id for submission in to_update})
+
+    return {'graded': len(to_update), 'results': results}
+
+
+# ---------------------------
+# File de correction
+# ---------------------------
+def grading_scope(queryset, user):
+    """
+    Soumissions que `user` peut corriger : toutes pour l'équipe, sinon celles
+    des cours qu'il enseigne.
+    """
+    if user.is_staff or user.is_superuser:
+        return queryset
+    return queryset.filter(assignment__lesson__module__course__instructor=user)
+
+
+def can_grade(user):
+    """
+    Vrai pour l'équipe et pour les enseignants d'au moins un cours.
+    """
+    return user.is_staff or user.is_superuser or Course.objects.filter(instructor=user).exists()
+
+
+def _claim_expiry():
+    return timezone.now() - timedelta(seconds=CLAIM_TTL)
+
+
+def available(user):
+    """
+    Condition : soumission libre, réservée par `user` ou dont la réservation a expiré.
+    """
+    return Q(claimed_by__isnull=True) | Q(claimed_by=user) | Q(claimed_at__lt=_claim_expiry())
+
+
+def grading_queue(queryset, user=None, claimed=None):
+    """
+    Soumissions non notées de `queryset`, dans l'ordre de la file. `claimed`
+    restreint aux réservations de `user` ('mine') ou à ce qu'il peut prendre
+    ('available').
+    """
+    queryset = queryset.filter(grade__isnull=True)
+    if claimed == 'mine':
+        queryset = queryset.filter(claimed_by=user, claimed_at__gte=_claim_expiry())
+    elif claimed == 'available':
+        queryset = queryset.filter(available(user))
+    return queryset.select_related('assignment', 'student').order_by(*QUEUE_ORDERING)
+
+
+def pending_counts(queryset):
+    """
+    Nombre de soumissions à noter par devoir, en une requête groupée, dans
+    l'ordre des échéances.
+    """
+    expiry = _claim_expiry()
+    return list(
+        queryset.filter(grade__isnull=True)
+        .values('assignment_id', 'assignment__title', 'assignment__due_date')
+        .annotate(
+            pending=Count('id'),
+            claimed=Count('id', filter=Q(claimed_by__isnull=False, claimed_at__gte=expiry)),
+        )
+        .order_by('assignment__due_date', 'assignment_id')
+    )
+
+
+def claim_submissions(queryset, user, count):
+    """
+    Réserve pour `user` les `count` prochaines soumissions libres de la file.
+    Les lignes verrouillées par un autre correcteur sont sautées plutôt
+    qu'attendues : deux correcteurs ne reçoivent jamais la même soumission.
+    Retourne les soumissions réservées, dans l'ordre de la file.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        candidates = queryset.filter(grade__isnull=True).filter(available(user)).order_by(*QUEUE_ORDERING)
+        if connection.features.has_select_for_update_skip_locked:
+            # Seules les soumissions sont verrouillées, pas les devoirs joints pour le tri
+            candidates = candidates.select_for_update(skip_locked=True, of=('self',))
+        ids = list(candidates.values_list('id', flat=True)[:count])
+        # Condition répétée : sans SKIP LOCKED (SQLite), une réservation concurrente n'est pas écrasée
+        queryset.model.objects.filter(id__in=ids, grade__isnull=True).filter(available(user)).update(
+            claimed_by=user, claimed_at=now
+        )
+    return list(
+        queryset.model.objects.filter(id__in=ids, claimed_by=user, claimed_at=now)
+        .select_related('assignment', 'student')
+        .order_by(*QUEUE_ORDERING)
+    )
+
+
+def release_submissions(queryset, user, ids=None):
+    """
+    Rend à la file les soumissions réservées par `user` (toutes, ou celles de
+    `ids`). Retourne le nombre de réservations levées.
+    """
+    claims = queryset.filter(claimed_by=user, grade__isnull=True)
+    if ids is not None:
+        claims = claims.filter(id__in=ids)
+    return claims.update(claimed_by=None, claimed_at=None)
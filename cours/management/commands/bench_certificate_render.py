@@ -0,0 +1,54 @@
+import os
+import time
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand
+
+from cours import certificate_pdf
+from cours.certificates import render_pool
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le débit de rendu des certificats PDF (certificats par seconde et par cœur), "
+        "en série puis dans le pool de processus. N'écrit rien en base ni dans le stockage."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+
+    def handle(self, *args, **options):
+        issued_at = datetime.now(timezone.utc).isoformat()
+        payloads = [
+            {
+                'student': f"Étudiante Numéro {i}",
+                'course': f"Cours #{i % 17}",
+                'number': f"CERT-{i}-{i % 17}-{int(time.time())}",
+                'issued_at': issued_at,
+            }
+            for i in range(options['count'])
+        ]
+
+        certificate_pdf.init_worker()
+        serial_count = max(options['count'] // 10, 1)
+        start = time.perf_counter()
+        for payload in payloads[:serial_count]:
+            certificate_pdf.render_certificate(payload)
+        serial_rate = serial_count / (time.perf_counter() - start)
+        self.stdout.write(f"Série (1 cœur) : {serial_rate:.1f} certificats/s")
+
+        workers = options['workers']
+        with render_pool(workers) as executor:
+            # Préchauffe : démarrage des processus et chargement du modèle
+            list(executor.map(certificate_pdf.render_certificate, payloads[:workers]))
+            start = time.perf_counter()
+            results = list(executor.map(certificate_pdf.render_certificate, payloads, chunksize=4))
+            elapsed = time.perf_counter() - start
+
+        rate = len(results) / elapsed
+        megabytes = sum(len(content) for _, content in results) / 1024 / 1024
+        self.stdout.write(
+            f"Pool ({workers} processus) : {len(results)} certificats en {elapsed:.2f} s — "
+            f"{rate:.1f} certificats/s, {rate / workers:.1f} par cœur ({megabytes:.1f} Mo produits)"
+        )
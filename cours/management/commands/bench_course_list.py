@@ -0,0 +1,62 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from cours.models import Course, CourseModule, Lesson, LessonCompletion
+from cours.views import CourseViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le nombre de requêtes SQL de CourseViewSet.list selon la taille de la page. "
+        "Les données de test sont créées dans une transaction annulée à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 50, 200])
+        parser.add_argument('--lessons', type=int, default=5, help="Leçons par cours")
+
+    def handle(self, *args, **options):
+        sizes = sorted(options['sizes'])
+        results = []
+
+        with transaction.atomic():
+            user = User.objects.create_user(username='bench-course-list', password='bench')
+            view = CourseViewSet.as_view({'get': 'list'})
+            factory = APIRequestFactory()
+
+            created = 0
+            for size in sizes:
+                self._create_courses(size - created, options['lessons'], user)
+                created = size
+
+                request = factory.get('/api/courses/', HTTP_HOST='localhost')
+                force_authenticate(request, user=user)
+                start = time.perf_counter()
+                with CaptureQueriesContext(connection) as queries:
+                    response = view(request)
+                    response.render()
+                elapsed = (time.perf_counter() - start) * 1000
+                results.append((size, len(queries), elapsed))
+                self.stdout.write(f"{size:>6} cours : {len(queries):>3} requêtes, {elapsed:8.1f} ms")
+
+            transaction.set_rollback(True)
+
+        if len({count for _, count, _ in results}) > 1:
+            raise CommandError("Le nombre de requêtes varie avec la taille de la page.")
+        self.stdout.write(self.style.SUCCESS("Nombre de requêtes constant quelle que soit la taille de la page."))
+
+    def _create_courses(self, count, lessons_per_course, user):
+        for _ in range(count):
+            course = Course.objects.create(level='beginner', thumbnail='courses/bench.png')
+            course.students.add(user)
+            module = CourseModule.objects.create(course=course, title='Module', description='', order=1)
+            lessons = Lesson.objects.bulk_create(
+                Lesson(module=module, title=f"Leçon {i}", content='', order=i)
+                for i in range(lessons_per_course)
+            )
+            LessonCompletion.objects.create(user=user, lesson=lessons[0])
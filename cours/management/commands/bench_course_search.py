@@ -0,0 +1,71 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from cours.models import Category, Course
+from cours.search import get_search_backend
+
+VOCABULARY = [
+    'python', 'django', 'javascript', 'react', 'données', 'statistiques', 'algèbre', 'réseaux',
+    'sécurité', 'cuisine', 'photographie', 'marketing', 'comptabilité', 'design', 'musique',
+    'guitare', 'anglais', 'espagnol', 'gestion', 'projet', 'agile', 'docker', 'kubernetes',
+    'machine', 'apprentissage', 'visualisation', 'excel', 'finance', 'écriture', 'dessin',
+]
+QUERIES = ['python', 'pyt', 'django react', 'sécu', 'machine apprentissage', 'guitare', 'fin', 'docker kube']
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère un catalogue de cours, l'indexe puis mesure la latence de la recherche plein texte. "
+        "Les données sont créées dans une transaction annulée à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--courses', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=20, help="Exécutions par requête")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        backend = get_search_backend()
+
+        with transaction.atomic():
+            categories = Category.objects.bulk_create(
+                Category(name=name.capitalize(), description='', slug=f"bench-{name}", icon='categories/bench.png')
+                for name in VOCABULARY[:10]
+            )
+            start = time.perf_counter()
+            courses = (
+                Course(
+                    category=rng.choice(categories),
+                    level=rng.choice(['beginner', 'intermediate', 'advanced']),
+                    thumbnail='courses/bench.png',
+                    what_you_learn=rng.sample(VOCABULARY, 4),
+                    requirements=rng.sample(VOCABULARY, 2),
+                )
+                for _ in range(options['courses'])
+            )
+            Course.objects.bulk_create(courses, batch_size=2000)
+            self.stdout.write(f"Catalogue de {options['courses']} cours créé en {time.perf_counter() - start:.1f} s")
+
+            start = time.perf_counter()
+            backend.index()
+            self.stdout.write(f"Index reconstruit en {time.perf_counter() - start:.1f} s")
+
+            for query in QUERIES:
+                timings = []
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    results = list(backend.search(Course.objects.all(), query).values_list('id', flat=True)[:20])
+                    timings.append((time.perf_counter() - start) * 1000)
+                timings.sort()
+                p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+                self.stdout.write(
+                    f"{query!r:>26} : {len(results):>2} résultats, "
+                    f"médiane {statistics.median(timings):7.1f} ms, p95 {p95:7.1f} ms"
+                )
+
+            transaction.set_rollback(True)
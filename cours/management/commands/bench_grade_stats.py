@@ -0,0 +1,93 @@
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from cours.grade_stats import PERCENTILES, assignment_stats_key, course_stats_key
+from cours.models import Assignment, Course, CourseModule, Lesson, Submission
+from cours.views import CourseViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le calcul des statistiques de notes d'un cours (par devoir et pour le "
+        "cours), sans cache puis avec cache, et les compare à numpy.percentile. Les "
+        "données de test sont créées dans une transaction annulée à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--assignments', type=int, default=200)
+        parser.add_argument('--submissions', type=int, default=50000)
+
+    def handle(self, *args, **options):
+        grade_stats = CourseViewSet.as_view({'get': 'grade_stats'}, **CourseViewSet.grade_stats.kwargs)
+        factory = APIRequestFactory()
+        rng = np.random.default_rng(0)
+        students_count = max(1, options['submissions'] // options['assignments'])
+
+        with transaction.atomic():
+            staff = User.objects.create(username='bench-stats-staff', is_staff=True)
+            students = User.objects.bulk_create(
+                User(username=f"bench-stats-{i}") for i in range(students_count)
+            )
+            course = Course.objects.create(level='beginner', thumbnail='courses/bench.png')
+            module = CourseModule.objects.create(course=course, title='Module', description='', order=1)
+            lesson = Lesson.objects.create(module=module, title='Leçon', content='', order=1)
+            due = timezone.now() + timedelta(days=7)
+            assignments = Assignment.objects.bulk_create(
+                Assignment(lesson=lesson, title=f"Devoir {i}", description='', due_date=due,
+                           max_score=int(rng.choice([10, 20, 100])))
+                for i in range(options['assignments'])
+            )
+            grades = {}
+            batch = []
+            for assignment in assignments:
+                values = rng.integers(0, assignment.max_score + 1, size=len(students))
+                grades[assignment.id] = values / assignment.max_score
+                batch.extend(
+                    Submission(assignment=assignment, student=student, file='submissions/bench.pdf', grade=int(grade))
+                    for student, grade in zip(students, values)
+                )
+            Submission.objects.bulk_create(batch, batch_size=10000)
+            self.stdout.write(f"{len(batch)} soumissions notées, {len(assignments)} devoirs")
+
+            cache.delete_many([course_stats_key(course.id)]
+                              + [assignment_stats_key(assignment.id) for assignment in assignments])
+            timings = []
+            for label in ('sans cache', 'avec cache'):
+                request = factory.get(f"/api/courses/{course.id}/grade_stats/", HTTP_HOST='localhost')
+                force_authenticate(request, user=staff)
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    response = grade_stats(request, pk=course.id)
+                    elapsed = time.perf_counter() - start
+                if response.status_code != 200:
+                    raise CommandError(f"Statistiques refusées : {response.status_code}")
+                timings.append(elapsed)
+                self.stdout.write(f"{label} : {elapsed * 1000:.1f} ms, {len(queries)} requêtes SQL")
+            data = response.data
+            cache.delete_many([course_stats_key(course.id)]
+                              + [assignment_stats_key(assignment.id) for assignment in assignments])
+            transaction.set_rollback(True)
+
+        # Comparaison avec le calcul de référence de NumPy
+        for entry in data['assignments']:
+            values = grades[entry['assignment']]
+            expected = np.percentile(values, PERCENTILES)
+            computed = [entry['percentiles'][f"p{p}"] for p in PERCENTILES]
+            if entry['count'] != len(values) or not np.allclose(computed, expected, atol=1e-4) \
+                    or abs(entry['mean'] - values.mean()) > 1e-4 or abs(entry['std'] - values.std()) > 1e-4:
+                raise CommandError(f"Statistiques incorrectes pour le devoir {entry['assignment']}")
+        overall = np.concatenate(list(grades.values()))
+        if data['course']['count'] != len(overall) or abs(data['course']['median'] - np.median(overall)) > 1e-4:
+            raise CommandError("Statistiques du cours incorrectes")
+        if timings[0] >= 1:
+            raise CommandError(f"Calcul sans cache trop lent : {timings[0]:.2f} s")
+        self.stdout.write(self.style.SUCCESS("Statistiques conformes à NumPy, calcul sous la seconde."))
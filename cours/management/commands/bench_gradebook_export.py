@@ -0,0 +1,111 @@
+import csv
+import io
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from datetime import timedelta
+from xml.etree import ElementTree
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from cours.models import Assignment, Course, CourseModule, Lesson, Submission
+from cours.views import CourseViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure l'export en flux du carnet de notes d'un cours (CSV et XLSX) : délai "
+        "jusqu'au premier octet, durée totale et pic mémoire pendant l'envoi. Les données "
+        "de test sont créées dans une transaction annulée à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000)
+        parser.add_argument('--assignments', type=int, default=100)
+
+    def handle(self, *args, **options):
+        gradebook = CourseViewSet.as_view({'get': 'gradebook'}, **CourseViewSet.gradebook.kwargs)
+        factory = APIRequestFactory()
+
+        with transaction.atomic():
+            staff = User.objects.create(username='bench-gradebook-staff', is_staff=True)
+            students = User.objects.bulk_create(
+                User(username=f"bench-gradebook-{i}", email=f"bench-gradebook-{i}@example.com")
+                for i in range(options['students'])
+            )
+            course = Course.objects.create(level='beginner', thumbnail='courses/bench.png')
+            course.students.add(*students)
+            module = CourseModule.objects.create(course=course, title='Module', description='', order=1)
+            lesson = Lesson.objects.create(module=module, title='Leçon', content='', order=1)
+            due = timezone.now() + timedelta(days=7)
+            assignments = Assignment.objects.bulk_create(
+                Assignment(lesson=lesson, title=f"Devoir {i}", description='', due_date=due, max_score=20)
+                for i in range(options['assignments'])
+            )
+            batch = []
+            created = 0
+            for student in students:
+                for index, assignment in enumerate(assignments):
+                    batch.append(Submission(
+                        assignment=assignment, student=student, file='submissions/bench.pdf',
+                        grade=(student.id + index) % 21,
+                    ))
+                if len(batch) >= 10000:
+                    Submission.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            Submission.objects.bulk_create(batch)
+            created += len(batch)
+            self.stdout.write(f"{created} soumissions, {len(students)} étudiants, {len(assignments)} devoirs")
+
+            results = {}
+            for output in ('csv', 'xlsx'):
+                request = factory.get(f"/api/courses/{course.id}/gradebook/", {'output': output},
+                                      HTTP_HOST='localhost')
+                force_authenticate(request, user=staff)
+
+                tracemalloc.start()
+                start = time.perf_counter()
+                response = gradebook(request, pk=course.id)
+                if response.status_code != 200:
+                    raise CommandError(f"Export {output} refusé : {response.status_code}")
+                chunks = iter(response.streaming_content)
+                first = next(chunks)
+                first_byte = time.perf_counter() - start
+                # Copie sur disque pour la vérification : elle n'entre pas dans le pic mesuré
+                with tempfile.TemporaryFile() as content:
+                    content.write(first)
+                    for chunk in chunks:
+                        content.write(chunk)
+                    total = time.perf_counter() - start
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    size = content.tell()
+                    content.seek(0)
+                    results[output] = content.read()
+                self.stdout.write(
+                    f"{output.upper()} : premier octet en {first_byte * 1000:.1f} ms, "
+                    f"{size / 1024 / 1024:.1f} Mo en {total:.2f} s, pic mémoire {peak / 1024 / 1024:.1f} Mo"
+                )
+
+            transaction.set_rollback(True)
+
+        rows = list(csv.reader(io.StringIO(results['csv'].decode())))
+        expected_rows = len(students) + 1
+        if len(rows) != expected_rows or len(rows[0]) != len(assignments) + 4:
+            raise CommandError(f"CSV : attendu {expected_rows} lignes, obtenu {len(rows)}")
+
+        with zipfile.ZipFile(io.BytesIO(results['xlsx'])) as archive:
+            if archive.testzip() is not None:
+                raise CommandError("XLSX : archive corrompue")
+            sheet = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+        namespace = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+        xlsx_rows = sheet.findall(f"{namespace}sheetData/{namespace}row")
+        if len(xlsx_rows) != expected_rows:
+            raise CommandError(f"XLSX : attendu {expected_rows} lignes, obtenu {len(xlsx_rows)}")
+        self.stdout.write(self.style.SUCCESS("Exports CSV et XLSX complets et lisibles."))
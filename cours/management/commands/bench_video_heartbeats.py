@@ -0,0 +1,112 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from cours.models import Course, CourseModule, Lesson, LessonCompletion, VideoProgress
+from cours.video import COMPLETION_THRESHOLD, flush_heartbeats, heartbeat_buffer
+from cours.views import LessonViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le débit soutenu des battements de cœur vidéo (battements par seconde à "
+        "travers la vue) et le coût de l'écriture groupée qui suit chaque intervalle. "
+        "Les données de test sont créées dans une transaction annulée à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--lessons', type=int, default=5)
+        parser.add_argument('--intervals', type=int, default=5,
+                            help="Nombre d'intervalles d'écriture simulés")
+        parser.add_argument('--beats', type=int, default=2,
+                            help="Battements par (utilisateur, leçon) et par intervalle")
+
+    def handle(self, *args, **options):
+        # Les écritures sont déclenchées ici, dans la transaction du test
+        heartbeat_buffer.flush_interval = 0
+        duration = 600.0
+        heartbeat = LessonViewSet.as_view({'post': 'heartbeat'}, **LessonViewSet.heartbeat.kwargs)
+        factory = APIRequestFactory()
+
+        with transaction.atomic():
+            users = User.objects.bulk_create(
+                User(username=f"bench-video-{i}") for i in range(options['users'])
+            )
+            course = Course.objects.create(level='beginner', thumbnail='courses/bench.png')
+            course.students.add(*users)
+            module = CourseModule.objects.create(course=course, title='Module', description='', order=1)
+            lessons = [
+                Lesson.objects.create(module=module, title=f"Leçon {i}", content='', order=i)
+                for i in range(options['lessons'])
+            ]
+            tokens = {user.id: f"Bearer {AccessToken.for_user(user)}" for user in users}
+
+            received = 0
+            beat_time = 0.0
+            beat_queries = 0
+            flush_time = 0.0
+            written = 0
+            completed = 0
+            intervals = options['intervals']
+            for interval in range(intervals):
+                # Dernier intervalle : chacun dépasse le seuil de visionnage
+                end = duration * (COMPLETION_THRESHOLD + 0.05) if interval == intervals - 1 else \
+                    duration * (interval + 1) / (intervals + 1)
+                for beat in range(options['beats']):
+                    position = end * (beat + 1) / options['beats']
+                    requests = [
+                        (factory.post(f"/api/lessons/{lesson.id}/heartbeat/",
+                                      {'position': position, 'duration': duration}, format='json',
+                                      HTTP_HOST='localhost', HTTP_AUTHORIZATION=tokens[user.id]),
+                         lesson.id)
+                        for user in users for lesson in lessons
+                    ]
+                    with CaptureQueriesContext(connection) as queries:
+                        start = time.perf_counter()
+                        for request, lesson_id in requests:
+                            response = heartbeat(request, pk=lesson_id)
+                            if response.status_code != 204:
+                                raise CommandError(f"Battement refusé : {response.status_code} {response.data}")
+                        beat_time += time.perf_counter() - start
+                    beat_queries += len(queries)
+                    received += len(requests)
+
+                start = time.perf_counter()
+                stats = flush_heartbeats(heartbeat_buffer)
+                elapsed = time.perf_counter() - start
+                flush_time += elapsed
+                written += stats['written']
+                completed += stats['completed']
+                self.stdout.write(
+                    f"Intervalle {interval + 1} : {stats['buffered']} positions en tampon, "
+                    f"{stats['written']} écrites en {elapsed * 1000:.1f} ms, "
+                    f"{stats['completed']} leçons terminées"
+                )
+
+            expected_rows = len(users) * len(lessons)
+            rows = VideoProgress.objects.filter(lesson__in=lessons).count()
+            completions = LessonCompletion.objects.filter(lesson__in=lessons).count()
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f"{received} battements en {beat_time:.2f} s : {received / beat_time:.0f} battements/s, "
+            f"{beat_queries} requêtes SQL"
+        )
+        self.stdout.write(
+            f"{written} lignes écrites pour {received} battements "
+            f"(x{received / max(written, 1):.0f}), écriture totale {flush_time * 1000:.0f} ms"
+        )
+        if beat_queries:
+            raise CommandError("Les battements de cœur ne doivent faire aucune requête SQL.")
+        if rows != expected_rows or completions != expected_rows or completed != expected_rows:
+            raise CommandError(
+                f"Attendu {expected_rows} positions et complétions, obtenu {rows} positions, "
+                f"{completions} complétions"
+            )
+        self.stdout.write(self.style.SUCCESS("Aucune requête par battement, positions et complétions cohérentes."))
@@ -0,0 +1,38 @@
+import csv
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cours.enrollment import bulk_enroll, read_identifiers
+from cours.models import Course
+
+
+class Command(BaseCommand):
+    help = "Inscrit en masse à un cours les étudiants listés (id ou email) dans un fichier CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_id', type=int)
+        parser.add_argument('csv_file')
+        parser.add_argument('--report', help="Chemin du rapport CSV ligne par ligne")
+
+    def handle(self, *args, **options):
+        try:
+            course = Course.objects.get(pk=options['course_id'])
+        except Course.DoesNotExist:
+            raise CommandError(f"Cours {options['course_id']} introuvable.")
+
+        with open(options['csv_file'], newline='', encoding='utf-8-sig') as source:
+            identifiers = read_identifiers(source)
+
+        report = bulk_enroll(course, identifiers)
+
+        if options['report']:
+            with open(options['report'], 'w', newline='', encoding='utf-8') as target:
+                writer = csv.DictWriter(target, fieldnames=['input', 'user_id', 'status'])
+                writer.writeheader()
+                writer.writerows(report)
+
+        summary = Counter(row['status'] for row in report)
+        self.stdout.write(self.style.SUCCESS(
+            ', '.join(f"{status}: {count}" for status, count in sorted(summary.items()))
+        ))
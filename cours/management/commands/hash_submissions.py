@@ -0,0 +1,53 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from cours.blobs import store_blob
+from cours.models import Submission
+
+
+class Command(BaseCommand):
+    help = (
+        "Range dans le stockage adressé par le contenu les soumissions enregistrées avant "
+        "son introduction (empreinte vide) : calcul de l'empreinte en lecture continue, "
+        "un seul exemplaire par contenu, suppression des anciens fichiers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        storage = Submission._meta.get_field('file').storage
+        pending = Submission.objects.filter(sha256='').exclude(file='').order_by('id')
+        stored = shared = missing = 0
+        last_id = 0
+
+        while True:
+            batch = list(
+                pending.filter(id__gt=last_id).only('id', 'file', 'original_filename')[:options['batch_size']]
+            )
+            if not batch:
+                break
+            for submission in batch:
+                last_id = submission.id
+                old_name = submission.file.name
+                if not storage.exists(old_name):
+                    missing += 1
+                    continue
+                with storage.open(old_name, 'rb') as content:
+                    blob, created = store_blob(content, old_name)
+                Submission.objects.filter(pk=submission.pk).update(
+                    file=blob.file.name,
+                    sha256=blob.sha256,
+                    original_filename=submission.original_filename or os.path.basename(old_name),
+                )
+                if not created:
+                    shared += 1
+                stored += 1
+                # L'ancien fichier peut encore être désigné par une soumission non traitée
+                if blob.file.name != old_name and not Submission.objects.filter(file=old_name).exists():
+                    storage.delete(old_name)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{stored} soumissions rangées ({shared} contenus déjà stockés), {missing} fichiers introuvables."
+        ))
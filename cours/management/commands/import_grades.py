@@ -0,0 +1,46 @@
+import csv
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from cours.grading import bulk_grade, read_grades
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe des notes depuis un fichier CSV (submission_id, grade, feedback) : validation "
+        "contre le barème de chaque devoir, application en une transaction, notifications en masse. "
+        "Réservée à l'équipe : toutes les soumissions peuvent être notées, quel que soit le cours."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file')
+        parser.add_argument('--report', help="Chemin du rapport CSV ligne par ligne")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Valider le fichier et produire le rapport sans rien enregistrer")
+
+    def handle(self, *args, **options):
+        with open(options['csv_file'], newline='', encoding='utf-8-sig') as source:
+            rows = read_grades(source)
+
+        with transaction.atomic():
+            # Aucune restriction par cours : l'API passe par grading_scope, pas la ligne de commande
+            summary = bulk_grade(rows)
+            if options['dry_run']:
+                transaction.set_rollback(True)
+
+        if options['report']:
+            with open(options['report'], 'w', newline='', encoding='utf-8') as target:
+                writer = csv.DictWriter(target, fieldnames=['index', 'submission_id', 'status', 'detail'])
+                writer.writeheader()
+                writer.writerows(summary['results'])
+
+        for result in summary['results']:
+            if result.get('detail'):
+                self.stdout.write(f"Ligne {result['index'] + 1} : {result['status']} - {result['detail']}")
+        counts = Counter(result['status'] for result in summary['results'])
+        self.stdout.write(self.style.SUCCESS(
+            ', '.join(f"{status}: {count}" for status, count in sorted(counts.items()))
+            + (" (simulation, rien n'a été enregistré)" if options['dry_run'] else "")
+        ))
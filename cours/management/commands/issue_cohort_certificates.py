@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cours.certificates import eligible_students, issue_cohort_certificates
+from cours.models import Course
+
+
+class Command(BaseCommand):
+    help = (
+        "Délivre les certificats de tous les inscrits d'un cours qui en ont terminé toutes les leçons. "
+        "Les PDF sont ensuite rendus par render_certificates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_id', type=int)
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Afficher le nombre d'étudiants éligibles sans rien délivrer")
+
+    def handle(self, *args, **options):
+        try:
+            course = Course.objects.get(pk=options['course_id'])
+        except Course.DoesNotExist:
+            raise CommandError(f"Cours {options['course_id']} introuvable.")
+
+        if options['dry_run']:
+            self.stdout.write(f"{len(eligible_students(course))} étudiants éligibles pour {course}")
+            return
+
+        created = issue_cohort_certificates(course)
+        self.stdout.write(self.style.SUCCESS(
+            f"{created} certificats délivrés pour {course}, en attente de rendu"
+        ))
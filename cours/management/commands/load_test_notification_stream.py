@@ -0,0 +1,160 @@
+import asyncio
+import json
+import random
+import resource
+import statistics
+import time
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from cours.models import Notification
+from cours.streaming import get_broker
+
+
+class Command(BaseCommand):
+    help = (
+        "Test de charge du flux SSE des notifications : ouvre des milliers de connexions "
+        "sur l'application ASGI dans une seule boucle (un seul worker), les garde inactives, "
+        "puis crée des notifications et mesure leur latence de livraison. "
+        "Les utilisateurs de test sont supprimés à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--idle', type=float, default=5.0, help="Durée d'inactivité en secondes")
+        parser.add_argument('--events', type=int, default=100)
+
+    def handle(self, *args, **options):
+        if options['users'] > options['connections']:
+            options['users'] = options['connections']
+        users = User.objects.bulk_create(
+            User(username=f"sse-load-{i}") for i in range(options['users'])
+        )
+        try:
+            asyncio.run(self._run(users, options))
+        finally:
+            User.objects.filter(username__startswith='sse-load-').delete()
+
+    async def _run(self, users, options):
+        from elearning.asgi import application
+
+        tokens = [str(AccessToken.for_user(user)) for user in users]
+        disconnect = asyncio.Event()
+        opened = asyncio.Semaphore(0)
+        sent_at = {}
+        latencies = []
+        statuses = []
+        delivered = asyncio.Event()
+        expected = {'count': 0}
+
+        def connect(index):
+            user_index = index % len(users)
+            request_sent = False
+
+            async def receive():
+                nonlocal request_sent
+                if not request_sent:
+                    request_sent = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await disconnect.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+                    opened.release()
+                    return
+                for block in message.get('body', b'').decode().split('\n\n'):
+                    if 'event: notification' not in block:
+                        continue
+                    data = json.loads(block.split('data: ', 1)[1])
+                    latencies.append(time.perf_counter() - sent_at[data['title']])
+                    if len(latencies) >= expected['count']:
+                        delivered.set()
+
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': 'GET',
+                'scheme': 'https',
+                'path': '/api/notifications/stream/',
+                'raw_path': b'/api/notifications/stream/',
+                'query_string': f"token={tokens[user_index]}".encode(),
+                'root_path': '',
+                'headers': [(b'host', b'localhost')],
+                'client': ('127.0.0.1', 10000 + index),
+                'server': ('localhost', 443),
+            }
+            return asyncio.create_task(application(scope, receive, send))
+
+        broker = get_broker()
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        start = time.perf_counter()
+        tasks = [connect(index) for index in range(options['connections'])]
+        for _ in tasks:
+            await opened.acquire()
+        elapsed = time.perf_counter() - start
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if set(statuses) != {200}:
+            raise CommandError(f"Réponses inattendues : {sorted(set(statuses))}")
+        self.stdout.write(
+            f"{broker.connection_count()} connexions ouvertes en {elapsed:.2f} s "
+            f"(≈ {(rss_after - rss_before) / max(len(tasks), 1):.1f} Ko de RSS par connexion)"
+        )
+
+        # Retard de la boucle pendant l'inactivité : elle doit rester disponible
+        lags = []
+        deadline = time.perf_counter() + options['idle']
+        while time.perf_counter() < deadline:
+            tick = time.perf_counter()
+            await asyncio.sleep(0.1)
+            lags.append(time.perf_counter() - tick - 0.1)
+        self.stdout.write(
+            f"Inactivité {options['idle']:.0f} s : retard de boucle max {max(lags) * 1000:.1f} ms"
+        )
+
+        # Création des notifications depuis un autre thread, comme le ferait le worker
+        connections_per_user = [0] * len(users)
+        for index in range(options['connections']):
+            connections_per_user[index % len(users)] += 1
+        targets = [random.randrange(len(users)) for _ in range(options['events'])]
+        expected['count'] = sum(connections_per_user[target] for target in targets)
+
+        def create_notifications():
+            for number, target in enumerate(targets):
+                title = f"charge-{number}"
+                sent_at[title] = time.perf_counter()
+                Notification.objects.create(user=users[target], type='system', title=title, message='')
+
+        start = time.perf_counter()
+        await sync_to_async(create_notifications, thread_sensitive=False)()
+        try:
+            await asyncio.wait_for(delivered.wait(), timeout=30)
+        except asyncio.TimeoutError:
+            pass
+        elapsed = time.perf_counter() - start
+
+        if latencies:
+            latencies.sort()
+            self.stdout.write(
+                f"{len(latencies)}/{expected['count']} événements livrés en {elapsed:.2f} s — "
+                f"latence médiane {statistics.median(latencies) * 1000:.1f} ms, "
+                f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms, "
+                f"max {latencies[-1] * 1000:.1f} ms"
+            )
+        else:
+            self.stdout.write("Aucun événement livré.")
+
+        disconnect.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.stdout.write(f"Après déconnexion : {broker.connection_count()} connexions restantes")
+        if len(latencies) < expected['count']:
+            raise CommandError(
+                "Événements perdus (avec InProcessBroker, le test et le serveur doivent partager le processus)."
+            )
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from cours.notifications import run_worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Vide la boîte d'envoi des notifications par lots : création en masse des notifications "
+        "et distribution aux backends de NOTIFICATION_BACKENDS, avec nouvelles tentatives."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Attente en secondes lorsque la boîte est vide")
+        parser.add_argument('--once', action='store_true',
+                            help="S'arrêter dès que la boîte ne contient plus d'entrée due")
+
+    def handle(self, *args, **options):
+        def on_batch(stats, elapsed):
+            if options['verbosity'] >= 2:
+                rate = stats['processed'] / elapsed if elapsed else 0
+                self.stdout.write(
+                    f"Lot : {stats['processed']} traitées, {stats['delivered']} distribuées, "
+                    f"{stats['retried']} à réessayer, {stats['failed']} abandonnées "
+                    f"({elapsed * 1000:.0f} ms, {rate:.0f}/s)"
+                )
+
+        try:
+            totals = run_worker(
+                batch_size=options['batch_size'],
+                poll_interval=options['poll_interval'],
+                once=options['once'],
+                on_batch=on_batch,
+            )
+        except KeyboardInterrupt:
+            return
+
+        rate = totals['processed'] / totals['elapsed'] if totals['elapsed'] else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{totals['processed']} notifications traitées en {totals['batches']} lots "
+            f"({totals['delivered']} distribuées, {totals['retried']} à réessayer, "
+            f"{totals['failed']} abandonnées) — {rate:.0f} notifications/s"
+        ))
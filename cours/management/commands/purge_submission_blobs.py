@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from cours.blobs import purge_unused_blobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime les contenus de soumission qui ne sont plus référencés par aucune "
+        "soumission (SubmissionBlob.ref_count = 0). À lancer périodiquement (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        purged = purge_unused_blobs(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{purged} contenus supprimés."))
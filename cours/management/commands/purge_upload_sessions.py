@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from cours.uploads import UPLOAD_SESSION_TTL, purge_sessions
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime les envois de fichiers de soumission inactifs depuis SUBMISSION_UPLOAD_TTL "
+        "secondes et leurs fichiers partiels. À lancer périodiquement (cron)."
+    )
+
+    def handle(self, *args, **options):
+        count = purge_sessions()
+        self.stdout.write(self.style.SUCCESS(
+            f"{count} envois supprimés (inactifs depuis plus de {UPLOAD_SESSION_TTL} s)."
+        ))
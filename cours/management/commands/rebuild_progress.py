@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from cours.progress import rebuild_progress
+
+
+class Command(BaseCommand):
+    help = "Reconstruit les tables ModuleProgress et CourseProgress à partir des leçons complétées."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, nargs='+', dest='course_ids',
+                            help="Limiter la reconstruction à ces cours")
+
+    def handle(self, *args, **options):
+        modules, courses = rebuild_progress(options['course_ids'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{modules} progressions de modules et {courses} progressions de cours reconstruites."
+        ))
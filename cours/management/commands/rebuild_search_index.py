@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cours.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche plein texte des cours."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        backend = get_search_backend(options['database'])
+        if backend is None:
+            raise CommandError("Cette base de données ne propose pas de recherche plein texte.")
+        backend.index()
+        self.stdout.write(self.style.SUCCESS("Index de recherche reconstruit."))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from cours.certificates import run_render_worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Traite la file de rendu des certificats : PDF rendus par lots dans un pool de processus, "
+        "rangés sous un nom dérivé de leur empreinte, puis certificats passés à « issued »."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Nombre de processus de rendu (par défaut : nombre de cœurs)")
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Attente en secondes lorsque la file est vide")
+        parser.add_argument('--once', action='store_true',
+                            help="S'arrêter dès que la file ne contient plus de rendu dû")
+
+    def handle(self, *args, **options):
+        def on_batch(stats, elapsed):
+            if options['verbosity'] >= 2:
+                rate = stats['processed'] / elapsed if elapsed else 0
+                self.stdout.write(
+                    f"Lot : {stats['rendered']} rendus, {stats['retried']} à réessayer, "
+                    f"{stats['failed']} abandonnés ({elapsed * 1000:.0f} ms, {rate:.1f}/s)"
+                )
+
+        try:
+            totals = run_render_worker(
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+                poll_interval=options['poll_interval'],
+                once=options['once'],
+                on_batch=on_batch,
+            )
+        except KeyboardInterrupt:
+            return
+
+        rate = totals['rendered'] / totals['elapsed'] if totals['elapsed'] else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{totals['rendered']} certificats rendus en {totals['batches']} lots "
+            f"({totals['retried']} à réessayer, {totals['failed']} abandonnés) — {rate:.1f} certificats/s"
+        ))
@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from cours.enrollment import EnrollmentError, enroll_student
+from cours.models import Course
+
+
+class Command(BaseCommand):
+    help = (
+        "Test de charge des inscriptions : de nombreux threads s'inscrivent en même temps "
+        "à un cours à places limitées, puis on vérifie que la limite n'est jamais dépassée. "
+        "À lancer sur une base locale (PostgreSQL de préférence) ; les données sont supprimées à la fin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=500)
+        parser.add_argument('--limit', type=int, default=50)
+        parser.add_argument('--threads', type=int, default=32)
+        parser.add_argument('--rounds', type=int, default=3)
+
+    def handle(self, *args, **options):
+        users = User.objects.bulk_create(
+            User(username=f"stress-enroll-{i}") for i in range(options['students'])
+        )
+        course = Course.objects.create(
+            level='beginner', thumbnail='courses/stress.png', enrollment_limit=options['limit']
+        )
+
+        try:
+            for round_number in range(1, options['rounds'] + 1):
+                self._run_round(course, users, options, round_number)
+        finally:
+            course.delete()
+            User.objects.filter(username__startswith='stress-enroll-').delete()
+
+    def _run_round(self, course, users, options, round_number):
+        course.students.clear()
+        Course.objects.filter(pk=course.pk).update(seats_taken=0)
+
+        barrier = threading.Barrier(options['threads'])
+        results = Counter()
+        lock = threading.Lock()
+
+        def worker(chunk):
+            try:
+                barrier.wait()
+                for user in chunk:
+                    try:
+                        enroll_student(course, user)
+                        outcome = 'inscrit'
+                    except EnrollmentError as e:
+                        outcome = type(e).__name__
+                    except Exception as e:  # verrous SQLite, etc.
+                        outcome = f"erreur: {type(e).__name__}"
+                    with lock:
+                        results[outcome] += 1
+            finally:
+                connections.close_all()
+
+        chunks = [users[i::options['threads']] for i in range(options['threads'])]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+            list(executor.map(worker, chunks))
+        elapsed = time.perf_counter() - start
+
+        course.refresh_from_db()
+        enrolled = course.students.count()
+        self.stdout.write(
+            f"Tour {round_number} ({connection.vendor}) : {dict(results)} en {elapsed:.2f} s — "
+            f"{enrolled} inscrits, seats_taken={course.seats_taken}, limite={course.enrollment_limit}"
+        )
+        if enrolled > course.enrollment_limit or course.seats_taken != enrolled:
+            raise CommandError("Limite d'inscription dépassée ou compteur de places incohérent.")
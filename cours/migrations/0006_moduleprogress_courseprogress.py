@@ -0,0 +1,72 @@
+# Generated by Django 5.1.7 on 2026-10-17 05:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_progress(apps, schema_editor):
+    CourseModule = apps.get_model('cours', 'CourseModule')
+    LessonCompletion = apps.get_model('cours', 'LessonCompletion')
+    ModuleProgress = apps.get_model('cours', 'ModuleProgress')
+    CourseProgress = apps.get_model('cours', 'CourseProgress')
+
+    module_totals = dict(CourseModule.objects.annotate(total=Count('lessons')).values_list('id', 'total'))
+    course_totals = dict(
+        CourseModule.objects.values('course_id').annotate(total=Count('lessons')).values_list('course_id', 'total')
+    )
+    ModuleProgress.objects.bulk_create([
+        ModuleProgress(user_id=row['user_id'], module_id=row['lesson__module'],
+                       completed_lessons=row['completed'], total_lessons=module_totals[row['lesson__module']])
+        for row in LessonCompletion.objects.values('user_id', 'lesson__module').annotate(completed=Count('id')).order_by()
+    ], batch_size=1000)
+    CourseProgress.objects.bulk_create([
+        CourseProgress(user_id=row['user_id'], course_id=row['lesson__module__course'],
+                       completed_lessons=row['completed'], total_lessons=course_totals[row['lesson__module__course']])
+        for row in LessonCompletion.objects.values('user_id', 'lesson__module__course').annotate(completed=Count('id')).order_by()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cours', '0005_rename_linkedin_url_userprofile_social_links'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed_lessons', models.PositiveIntegerField(default=0)),
+                ('total_lessons', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_records', to='cours.course')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_progress', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Progression dans un cours',
+                'verbose_name_plural': 'Progressions dans les cours',
+                'unique_together': {('user', 'course')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ModuleProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed_lessons', models.PositiveIntegerField(default=0)),
+                ('total_lessons', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('module', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress_records', to='cours.coursemodule')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='module_progress', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Progression dans un module',
+                'verbose_name_plural': 'Progressions dans les modules',
+                'unique_together': {('user', 'module')},
+            },
+        ),
+        migrations.RunPython(populate_progress, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.7 on 2026-10-17 06:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+PATH_SEGMENT_WIDTH = 10
+
+
+def populate_paths(apps, schema_editor):
+    Comment = apps.get_model('cours', 'Comment')
+    # Racines d'abord, puis chaque niveau dont les parents ont déjà un chemin
+    level = list(Comment.objects.filter(parent__isnull=True))
+    while level:
+        for comment in level:
+            parent = comment.parent if comment.parent_id else None
+            comment.path = f"{parent.path if parent else ''}{comment.pk:0{PATH_SEGMENT_WIDTH}d}/"
+            comment.depth = parent.depth + 1 if parent else 0
+        Comment.objects.bulk_update(level, ['path', 'depth'], batch_size=1000)
+        level = list(
+            Comment.objects.filter(path='', parent__isnull=False)
+            .exclude(parent__path='')
+            .select_related('parent')
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cours', '0007_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=500),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['lesson', 'path'], name='comment_lesson_path_idx'),
+        ),
+        migrations.RunPython(populate_paths, migrations.RunPython.noop),
+    ]
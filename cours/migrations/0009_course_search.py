@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-17 06:02
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from cours.search import get_search_backend
+
+    backend = get_search_backend(schema_editor.connection.alias)
+    if backend is not None:
+        backend.install()
+
+
+def uninstall_search_index(apps, schema_editor):
+    from cours.search import get_search_backend
+
+    backend = get_search_backend(schema_editor.connection.alias)
+    if backend is not None:
+        backend.uninstall()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cours', '0008_comment_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-17 06:07
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_seats_taken(apps, schema_editor):
+    Course = apps.get_model('cours', 'Course')
+    enrollments = (
+        Course.students.through.objects.filter(course_id=OuterRef('pk'))
+        .order_by()
+        .values('course_id')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    Course.objects.update(seats_taken=Coalesce(Subquery(enrollments), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cours', '0009_course_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='seats_taken',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_seats_taken, migrations.RunPython.noop),
+    ]
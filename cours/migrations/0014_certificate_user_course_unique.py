@@ -0,0 +1,56 @@
+# Generated by Django 5.1.7 on 2026-10-17 06:18
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+# Nombre maximal de doublons détaillés dans le rapport
+REPORT_LIMIT = 50
+
+
+def check_duplicate_certificates(apps, schema_editor):
+    """
+    Refuse d'appliquer la contrainte tant que des doublons existent : chaque
+    numéro a pu être communiqué et doit rester vérifiable, aucun certificat
+    n'est donc supprimé ici. Les doublons sont listés pour être fusionnés à la main.
+    """
+    Certificate = apps.get_model('cours', 'Certificate')
+    duplicates = list(
+        Certificate.objects.order_by('user_id', 'course_id')
+        .values('user_id', 'course_id')
+        .annotate(total=Count('id'))
+        .filter(total__gt=1)
+    )
+    if not duplicates:
+        return
+
+    lines = []
+    for row in duplicates[:REPORT_LIMIT]:
+        numbers = (
+            Certificate.objects.filter(user_id=row['user_id'], course_id=row['course_id'])
+            .order_by('id')
+            .values_list('certificate_number', flat=True)
+        )
+        lines.append(f"  étudiant {row['user_id']}, cours {row['course_id']} : {', '.join(numbers)}")
+    if len(duplicates) > REPORT_LIMIT:
+        lines.append(f"  ... et {len(duplicates) - REPORT_LIMIT} autres")
+    raise RuntimeError(
+        f"{len(duplicates)} couples (étudiant, cours) ont plusieurs certificats ; "
+        "fusionnez-les avant d'appliquer la contrainte d'unicité :\n" + "\n".join(lines)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cours', '0013_notification_inbox_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_certificates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='certificate',
+            constraint=models.UniqueConstraint(fields=('user', 'course'), name='certificate_user_course_unique'),
+        ),
+    ]
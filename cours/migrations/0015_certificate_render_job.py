@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-17 06:19
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def enqueue_missing_renders(apps, schema_editor):
+    # Certificats déjà délivrés sans PDF : ils entrent dans la file de rendu
+    Certificate = apps.get_model('cours', 'Certificate')
+    CertificateRenderJob = apps.get_model('cours', 'CertificateRenderJob')
+    CertificateRenderJob.objects.bulk_create(
+        [CertificateRenderJob(certificate_id=pk) for pk in Certificate.objects.filter(pdf_file='').values_list('pk', flat=True)],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cours', '0014_certificate_user_course_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CertificateRenderJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('certificate', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='render_job', to='cours.certificate')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'available_at', 'id'], name='render_job_pending_idx')],
+            },
+        ),
+        migrations.RunPython(enqueue_missing_renders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-17 06:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cours', '0017_upload_session'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('file', models.FileField(max_length=255, upload_to='submissions/blobs/')),
+                ('size', models.BigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Contenu de soumission',
+                'verbose_name_plural': 'Contenus de soumissions',
+            },
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['assignment', 'sha256'], name='submission_assignment_sha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submissionblob',
+            index=models.Index(condition=models.Q(('ref_count', 0)), fields=['ref_count'], name='submission_blob_unused_idx'),
+        ),
+    ]
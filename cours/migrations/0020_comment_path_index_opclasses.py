@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-17 06:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cours', '0019_grading_queue'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='comment_lesson_path_idx',
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['lesson', 'path'], name='comment_lesson_path_idx', opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ),
+    ]
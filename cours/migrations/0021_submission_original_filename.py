@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-17 06:55
+
+import os
+
+from django.db import migrations, models
+
+
+def populate_original_filenames(apps, schema_editor):
+    # Fichiers pas encore rangés par empreinte : leur nom est encore celui de l'envoi.
+    # Ceux déjà rangés n'ont plus de nom d'origine (le téléchargement retombe sur l'empreinte).
+    Submission = apps.get_model('cours', 'Submission')
+    pending = Submission.objects.exclude(file='').exclude(file__startswith='submissions/blobs/').only('id', 'file')
+    batch = []
+    for submission in pending.iterator(chunk_size=1000):
+        submission.original_filename = os.path.basename(submission.file.name)[:255]
+        batch.append(submission)
+        if len(batch) == 1000:
+            Submission.objects.bulk_update(batch, ['original_filename'])
+            batch = []
+    Submission.objects.bulk_update(batch, ['original_filename'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cours', '0020_comment_path_index_opclasses'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='original_filename',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.RunPython(populate_original_filenames, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,9 @@
-from django.db import models
+import uuid
+
+from django.db import models, transaction
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models import Count, Exists, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -20,8 +25,52 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+def _count_subquery(queryset, outer_field):
+    """
+    Sous-requête scalaire qui compte les lignes de `queryset` liées à la ligne externe.
+    """
+    counted = (
+        queryset.filter(**{outer_field: OuterRef('pk')})
+        .order_by()
+        .values(outer_field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+class CourseQuerySet(models.QuerySet):
+    def with_stats(self, user=None):
+        """
+        Annote chaque cours avec son nombre de leçons et, pour un utilisateur
+        authentifié, son inscription et ses leçons complétées (lues dans
+        CourseProgress). Tout est calculé en sous-requêtes : le nombre de requêtes ne dépend pas
+        du nombre de cours.
+        """
+        queryset = self.annotate(
+            num_lessons=_count_subquery(Lesson.objects.all(), 'module__course'),
+        )
+        if user is not None and user.is_authenticated:
+            queryset = queryset.annotate(
+                user_enrolled=Exists(
+                    Course.students.through.objects.filter(course_id=OuterRef('pk'), user_id=user.id)
+                ),
+                num_completed=Coalesce(
+                    Subquery(
+                        CourseProgress.objects.filter(user=user, course=OuterRef('pk'))
+                        .values('completed_lessons')[:1],
+                        output_field=IntegerField(),
+                    ),
+                    Value(0),
+                ),
+            )
+        return queryset
+
+
 class Course(models.Model):
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True)
+    instructor = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='taught_courses',
+                                   on_delete=models.SET_NULL, null=True, blank=True)
     students = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='enrolled_courses', blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     is_featured = models.BooleanField(default=False)
@@ -37,9 +86,24 @@ class Course(models.Model):
     duration_hours = models.PositiveIntegerField(default=0)
     duration_minutes = models.PositiveIntegerField(default=0)
     enrollment_limit = models.IntegerField(null=True, blank=True)
+    # Nombre d'inscrits, maintenu par cours.enrollment
+    seats_taken = models.PositiveIntegerField(default=0, editable=False)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Maintenu par cours.search (PostgreSQL uniquement, index GIN créé par migration)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = CourseQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Pagination par curseur de my_courses
+            models.Index(fields=['-created_at', '-id'], name='course_created_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"Cours #{self.pk}"
 
 class CourseModule(models.Model):
     course = models.ForeignKey(Course, related_name='modules', on_delete=models.CASCADE)
@@ -79,11 +143,30 @@ class Submission(models.Model):
     student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     submitted_at = models.DateTimeField(auto_now_add=True)
     file = models.FileField(upload_to='submissions/')
+    # Empreinte du contenu : le fichier est celui du SubmissionBlob correspondant (cours.blobs)
+    sha256 = models.CharField(max_length=64, blank=True)
+    # Nom du fichier envoyé par l'étudiant, rendu au téléchargement (le stockage le remplace par l'empreinte)
+    original_filename = models.CharField(max_length=255, blank=True)
     grade = models.IntegerField(null=True, blank=True)
     feedback = models.TextField(blank=True)
+    # Réservation dans la file de correction (cours.grading.claim_submissions)
+    claimed_by = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='claimed_submissions',
+                                   on_delete=models.SET_NULL, null=True, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Pagination par curseur de my_submissions
+            models.Index(fields=['student', '-created_at', '-id'], name='submission_student_created_idx'),
+            # Soumissions non notées d'un devoir par ordre d'arrivée (file filtrée sur un devoir, pending_counts)
+            models.Index(fields=['assignment', 'submitted_at', 'id'], name='submission_grading_queue_idx',
+                         condition=models.Q(grade__isnull=True)),
+            # Soumissions identiques d'un même devoir (SubmissionViewSet.duplicates)
+            models.Index(fields=['assignment', 'sha256'], name='submission_assignment_sha_idx'),
+        ]
+
 class Certificate(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
@@ -96,12 +179,91 @@ class Certificate(models.Model):
         ('revoked', 'Revoked')
     ], default='pending')
 
+    class Meta:
+        constraints = [
+            # Un seul certificat par étudiant et par cours, même en cas de demandes concurrentes
+            models.UniqueConstraint(fields=['user', 'course'], name='certificate_user_course_unique'),
+        ]
+
+class CertificateRenderJob(models.Model):
+    """
+    Rendu PDF d'un certificat à effectuer, créé à la délivrance et traité par
+    la commande render_certificates. Le certificat reste « pending » jusqu'au rendu.
+    """
+    PENDING = 'pending'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    certificate = models.OneToOneField(Certificate, related_name='render_job', on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=[
+        (PENDING, 'Pending'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ], default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at', 'id'], name='render_job_pending_idx'),
+        ]
+
 class Comment(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE)
+    # Chemin matérialisé : identifiants des ancêtres puis du commentaire, sur
+    # PATH_SEGMENT_WIDTH chiffres chacun. Trier par chemin donne l'ordre du fil.
+    # Au plus MAX_DEPTH + 1 segments : le chemin tient toujours dans max_length.
+    path = models.CharField(max_length=500, blank=True, default='', editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    PATH_SEGMENT_WIDTH = 10
+    MAX_DEPTH = 40
+    _parent_path = ''
+
+    class Meta:
+        indexes = [
+            # Pagination par curseur de CommentViewSet
+            models.Index(fields=['-created_at', '-id'], name='comment_created_id_idx'),
+            # Fil de discussion d'une leçon ou d'un sous-arbre en une requête ;
+            # varchar_pattern_ops pour que le filtre par préfixe (LIKE 'x/%')
+            # utilise l'index quelle que soit la collation de la base
+            models.Index(fields=['lesson', 'path'], name='comment_lesson_path_idx',
+                         opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ]
+
+    def save(self, *args, **kwargs):
+        creating = self._state.adding
+        with transaction.atomic(using=kwargs.get('using')):
+            if creating and not self.path and self.parent_id:
+                self._attach_to_parent()
+            super().save(*args, **kwargs)
+            if creating and not self.path:
+                self.path = f"{self._parent_path}{self.pk:0{self.PATH_SEGMENT_WIDTH}d}/"
+                Comment.objects.filter(pk=self.pk).update(path=self.path, depth=self.depth)
+
+    def _attach_to_parent(self):
+        """
+        Calcule la profondeur à partir du parent. Au-delà de MAX_DEPTH, la
+        réponse est rattachée à l'ancêtre de profondeur MAX_DEPTH - 1 : le
+        fil continue à plat au lieu de dépasser la taille du chemin. L'API
+        refuse ces réponses (CommentSerializer) ; ce repli ne vaut que pour
+        les créations directes.
+        """
+        parent_path, parent_depth = Comment.objects.filter(pk=self.parent_id).values_list('path', 'depth').get()
+        if parent_depth >= self.MAX_DEPTH:
+            segment = self.PATH_SEGMENT_WIDTH + 1
+            parent_path = parent_path[:self.MAX_DEPTH * segment]
+            parent_depth = self.MAX_DEPTH - 1
+            self.parent_id = int(parent_path[-segment:-1])
+        self._parent_path = parent_path
+        self.depth = parent_depth + 1
 
 class UserProfile(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -112,20 +274,66 @@ class UserProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+NOTIFICATION_TYPES = [
+    ('assignment', 'New Assignment'),
+    ('grade', 'New Grade'),
+    ('comment', 'New Comment'),
+    ('certificate', 'New Certificate'),
+    ('enrollment', 'Enrollment'),
+    ('progression', 'Progression'),
+    ('achievement', 'Achievement'),
+]
+
+
 class Notification(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
-    type = models.CharField(max_length=20, choices=[
-        ('assignment', 'New Assignment'),
-        ('grade', 'New Grade'),
-        ('comment', 'New Comment'),
-        ('certificate', 'New Certificate'),
-    ])
+    type = models.CharField(max_length=20, choices=NOTIFICATION_TYPES)
     title = models.CharField(max_length=200)
     message = models.TextField()
     read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Boîte de réception paginée par curseur
+            models.Index(fields=['user', '-created_at', '-id'], name='notification_user_created_idx'),
+            # Non lues d'un utilisateur : liste filtrée, recomptage et marquage en masse
+            models.Index(fields=['user', 'read', '-created_at', '-id'], name='notification_user_read_idx'),
+        ]
+
+
+class NotificationOutbox(models.Model):
+    """
+    Notification à créer et distribuer, écrite dans la même transaction que
+    l'événement qui la déclenche, puis traitée par la commande process_notifications.
+    """
+    PENDING = 'pending'
+    DELIVERED = 'delivered'
+    FAILED = 'failed'
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    type = models.CharField(max_length=20, choices=NOTIFICATION_TYPES)
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    idempotency_key = models.CharField(max_length=200, unique=True)
+    status = models.CharField(max_length=20, choices=[
+        (PENDING, 'Pending'),
+        (DELIVERED, 'Delivered'),
+        (FAILED, 'Failed'),
+    ], default=PENDING)
+    notification = models.OneToOneField(Notification, null=True, blank=True, on_delete=models.SET_NULL)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at', 'id'], name='outbox_pending_idx'),
+        ]
+
 
 class LessonCompletion(models.Model):
     """
@@ -142,4 +350,128 @@ class LessonCompletion(models.Model):
         verbose_name_plural = 'Leçons complétées'
     
     def __str__(self):
-        return f"{self.user.username} - {self.lesson.title}"
\ No newline at end of file
+        return f"{self.user.username} - {self.lesson.title}"
+
+class ModuleProgress(models.Model):
+    """
+    Progression dénormalisée d'un utilisateur dans un module, maintenue par cours.progress.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='module_progress')
+    module = models.ForeignKey(CourseModule, on_delete=models.CASCADE, related_name='progress_records')
+    completed_lessons = models.PositiveIntegerField(default=0)
+    total_lessons = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'module')
+        verbose_name = 'Progression dans un module'
+        verbose_name_plural = 'Progressions dans les modules'
+
+    @property
+    def is_completed(self):
+        return self.total_lessons > 0 and self.completed_lessons >= self.total_lessons
+
+
+class CourseProgress(models.Model):
+    """
+    Progression dénormalisée d'un utilisateur dans un cours, maintenue par cours.progress.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='course_progress')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='progress_records')
+    completed_lessons = models.PositiveIntegerField(default=0)
+    total_lessons = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'course')
+        verbose_name = 'Progression dans un cours'
+        verbose_name_plural = 'Progressions dans les cours'
+
+    @property
+    def is_completed(self):
+        return self.total_lessons > 0 and self.completed_lessons >= self.total_lessons
+
+    @property
+    def percentage(self):
+        if not self.total_lessons:
+            return 0
+        return round((self.completed_lessons / self.total_lessons) * 100, 1)
+
+
+class VideoProgress(models.Model):
+    """
+    Position de lecture de la vidéo d'une leçon, écrite par lots depuis le
+    tampon des battements de cœur du lecteur (cours.video).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='video_progress')
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='video_progress')
+    position = models.FloatField(default=0)
+    # Point le plus avancé atteint, qui sert au seuil de complétion automatique
+    max_position = models.FloatField(default=0)
+    duration = models.FloatField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('user', 'lesson')
+        verbose_name = 'Progression vidéo'
+        verbose_name_plural = 'Progressions vidéo'
+
+    @property
+    def watched_ratio(self):
+        return min(self.max_position / self.duration, 1.0) if self.duration else 0.0
+
+
+class UploadSession(models.Model):
+    """
+    Envoi reprenable, par morceaux, d'un fichier de soumission (cours.uploads).
+    `offset` est le nombre d'octets reçus et vérifiés ; la soumission est
+    créée à la réception du dernier morceau.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    # Empreinte SHA-256 (hexadécimale) du fichier complet annoncée par le client, facultative
+    sha256 = models.CharField(max_length=64, blank=True)
+    submission = models.OneToOneField(Submission, on_delete=models.SET_NULL, null=True, blank=True,
+                                      related_name='upload_session')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Envoi de fichier'
+        verbose_name_plural = 'Envois de fichiers'
+        indexes = [
+            # Purge des envois expirés (purge_upload_sessions)
+            models.Index(fields=['updated_at'], name='upload_session_updated_idx'),
+        ]
+
+    @property
+    def is_complete(self):
+        return self.submission_id is not None
+
+
+class SubmissionBlob(models.Model):
+    """
+    Contenu unique d'un ou plusieurs fichiers de soumission, rangé sous son
+    empreinte SHA-256. `ref_count` compte les soumissions qui le désignent ;
+    un contenu qui n'est plus référencé est supprimé par purge_submission_blobs.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    file = models.FileField(upload_to='submissions/blobs/', max_length=255)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Contenu de soumission'
+        verbose_name_plural = 'Contenus de soumissions'
+        indexes = [
+            models.Index(fields=['ref_count'], name='submission_blob_unused_idx',
+                         condition=models.Q(ref_count=0)),
+        ]
+
+    def __str__(self):
+        return self.sha256
@@ -0,0 +1,326 @@
+"""
+Boîte d'envoi transactionnelle des notifications.
+
+Les vues n'écrivent plus de Notification directement : elles déposent une
+entrée NotificationOutbox dans la transaction de l'événement (inscription,
+leçon terminée...). La commande process_notifications vide ensuite la boîte
+par lots : création en masse des Notification, puis remise aux backends de
+distribution configurés dans NOTIFICATION_BACKENDS, avec nouvelles tentatives
+et délai exponentiel en cas d'échec.
+
+Le nombre de notifications non lues de chaque utilisateur est servi depuis un
+compteur en cache (partagé entre processus, voir CACHES), décrémenté au marquage
+comme lu et supprimé par le worker quand il crée des notifications : il est alors
+recalculé à la lecture suivante.
+"""
+import json
+import logging
+import sys
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Notification, NotificationOutbox
+from .streaming import publish_on_commit
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5)
+RETRY_BASE_DELAY = getattr(settings, 'NOTIFICATION_RETRY_BASE_DELAY', 30)
+RETRY_MAX_DELAY = getattr(settings, 'NOTIFICATION_RETRY_MAX_DELAY', 60 * 60)
+# Durée pendant laquelle un lot réservé par un worker est invisible pour les autres
+CLAIM_TIMEOUT = getattr(settings, 'NOTIFICATION_CLAIM_TIMEOUT', 5 * 60)
+# Le compteur expire régulièrement pour corriger une éventuelle dérive
+UNREAD_CACHE_TIMEOUT = getattr(settings, 'NOTIFICATION_UNREAD_CACHE_TIMEOUT', 24 * 60 * 60)
+
+
+def enqueue_notification(user, type, title, message, idempotency_key=None):
+    enqueue_notifications([{
+        'user_id': user.pk,
+        'type': type,
+        'title': title,
+        'message': message,
+        'idempotency_key': idempotency_key,
+    }])
+
+
+def enqueue_notifications(entries, batch_size=1000):
+    """
+    Dépose des notifications dans la boîte d'envoi. Une entrée dont la clé
+    d'idempotence existe déjà est ignorée : rejouer un événement ne notifie
+    pas deux fois.
+    """
+    NotificationOutbox.objects.bulk_create(
+        [
+            NotificationOutbox(
+                user_id=entry['user_id'],
+                type=entry['type'],
+                title=entry['title'],
+                message=entry['message'],
+                idempotency_key=entry.get('idempotency_key') or uuid.uuid4().hex,
+            )
+            for entry in entries
+        ],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+
+
+# ---------------------------
+# Compteur de notifications non lues
+# ---------------------------
+def unread_cache_key(user_id):
+    return f"notifications_unread:{user_id}"
+
+
+def get_unread_count(user):
+    """
+    Nombre de notifications non lues de `user`. Le COUNT n'est exécuté que
+    lorsque le compteur est absent du cache.
+    """
+    key = unread_cache_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(user_id=user.pk, read=False).count()
+        if not cache.add(key, count, UNREAD_CACHE_TIMEOUT):
+            # Compteur initialisé entre-temps : il a pu être ajusté depuis notre COUNT
+            count = cache.get(key, count)
+    return count
+
+
+def _shift_unread(deltas):
+    """
+    Ajuste les compteurs présents en cache ({user_id: delta}). Un compteur
+    absent sera recalculé à la prochaine lecture.
+    """
+    for user_id, delta in deltas.items():
+        if not delta:
+            continue
+        try:
+            if delta > 0:
+                cache.incr(unread_cache_key(user_id), delta)
+            else:
+                cache.decr(unread_cache_key(user_id), -delta)
+        except ValueError:
+            pass
+
+
+def shift_unread_on_commit(deltas):
+    deltas = dict(deltas)
+    transaction.on_commit(lambda: _shift_unread(deltas))
+
+
+def invalidate_unread_on_commit(user_ids):
+    keys = [unread_cache_key(user_id) for user_id in set(user_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def mark_read(user, ids=None):
+    """
+    Marque comme lues toutes les notifications de `user`, ou celles de `ids`,
+    en un seul UPDATE. Retourne le nombre de notifications marquées.
+    """
+    queryset = Notification.objects.filter(user_id=user.pk, read=False)
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+    updated = queryset.update(read=True, updated_at=timezone.now())
+    if updated:
+        shift_unread_on_commit({user.pk: -updated})
+    return updated
+
+
+@receiver([post_save, post_delete], sender=Notification)
+def notification_changed(sender, instance, created=False, **kwargs):
+    # Écritures unitaires (administration, scripts) : le compteur sera recalculé
+    transaction.on_commit(lambda: cache.delete(unread_cache_key(instance.user_id)))
+    if created:
+        publish_on_commit([instance])
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE_DELAY * 2 ** max(attempts - 1, 0), RETRY_MAX_DELAY))
+
+
+# ---------------------------
+# Backends de distribution
+# ---------------------------
+class BaseNotificationBackend:
+    """
+    Canal de distribution des notifications (email, push...). `send` reçoit
+    la notification et sa clé d'idempotence, et lève une exception en cas d'échec.
+    """
+
+    def send(self, notification, idempotency_key):
+        raise NotImplementedError
+
+    def send_many(self, items):
+        """
+        Distribue une liste de (notification, clé) ; retourne {clé: exception} pour les échecs.
+        """
+        failures = {}
+        for notification, idempotency_key in items:
+            try:
+                self.send(notification, idempotency_key)
+            except Exception as e:
+                failures[idempotency_key] = e
+        return failures
+
+
+class ConsoleBackend(BaseNotificationBackend):
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, notification, idempotency_key):
+        self.stream.write(f"[{notification.type}] {notification.user_id} — {notification.title}: {notification.message}\n")
+
+
+class FileBackend(BaseNotificationBackend):
+    """
+    Ajoute chaque notification en JSON, une par ligne, au fichier NOTIFICATION_FILE_PATH.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or getattr(settings, 'NOTIFICATION_FILE_PATH', 'notifications.jsonl')
+
+    def send_many(self, items):
+        with open(self.path, 'a', encoding='utf-8') as output:
+            for notification, idempotency_key in items:
+                output.write(json.dumps({
+                    'idempotency_key': idempotency_key,
+                    'id': notification.id,
+                    'user': notification.user_id,
+                    'type': notification.type,
+                    'title': notification.title,
+                    'message': notification.message,
+                }, ensure_ascii=False) + '\n')
+        return {}
+
+
+def get_backends():
+    return [import_string(path)() for path in getattr(settings, 'NOTIFICATION_BACKENDS', [])]
+
+
+# ---------------------------
+# Traitement de la boîte d'envoi
+# ---------------------------
+def _claim_batch(batch_size):
+    """
+    Réserve un lot d'entrées dues et crée leurs Notification en masse, dans une
+    seule transaction. Les entrées réservées restent invisibles pendant CLAIM_TIMEOUT.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        queryset = NotificationOutbox.objects.filter(
+            status=NotificationOutbox.PENDING,
+            available_at__lte=now,
+        ).order_by('available_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        entries = list(queryset[:batch_size])
+        if not entries:
+            return []
+
+        to_store = [entry for entry in entries if entry.notification_id is None]
+        notifications = Notification.objects.bulk_create([
+            Notification(user_id=entry.user_id, type=entry.type, title=entry.title, message=entry.message)
+            for entry in to_store
+        ])
+        for entry, notification in zip(to_store, notifications):
+            entry.notification = notification
+        NotificationOutbox.objects.bulk_update(to_store, ['notification'])
+        # bulk_create n'envoie pas de signal : les compteurs des destinataires sont
+        # supprimés plutôt qu'incrémentés, la lecture suivante les recalcule en base
+        invalidate_unread_on_commit(entry.user_id for entry in to_store)
+        publish_on_commit(notifications)
+
+        NotificationOutbox.objects.filter(id__in=[entry.id for entry in entries]).update(
+            attempts=F('attempts') + 1,
+            available_at=now + timedelta(seconds=CLAIM_TIMEOUT),
+        )
+        for entry in entries:
+            entry.attempts += 1
+
+    notifications_by_id = {
+        notification.id: notification
+        for notification in Notification.objects.filter(id__in=[entry.notification_id for entry in entries])
+    }
+    for entry in entries:
+        entry.notification = notifications_by_id.get(entry.notification_id)
+    return entries
+
+
+def process_batch(batch_size=500, backends=None):
+    """
+    Traite un lot de la boîte d'envoi. Retourne les compteurs du lot.
+    """
+    backends = get_backends() if backends is None else backends
+    entries = _claim_batch(batch_size)
+    stats = {'processed': len(entries), 'delivered': 0, 'retried': 0, 'failed': 0}
+    if not entries:
+        return stats
+
+    items = [(entry.notification, entry.idempotency_key) for entry in entries if entry.notification]
+    errors = {}
+    for backend in backends:
+        for key, error in backend.send_many(items).items():
+            errors.setdefault(key, f"{type(backend).__name__}: {error}")
+
+    now = timezone.now()
+    delivered = [entry.id for entry in entries if entry.idempotency_key not in errors]
+    NotificationOutbox.objects.filter(id__in=delivered).update(
+        status=NotificationOutbox.DELIVERED, processed_at=now, last_error=''
+    )
+    stats['delivered'] = len(delivered)
+
+    for entry in entries:
+        error = errors.get(entry.idempotency_key)
+        if error is None:
+            continue
+        if entry.attempts >= MAX_ATTEMPTS:
+            NotificationOutbox.objects.filter(id=entry.id).update(
+                status=NotificationOutbox.FAILED, processed_at=now, last_error=error
+            )
+            stats['failed'] += 1
+            logger.error(f"Notification {entry.idempotency_key} abandonnée après {entry.attempts} tentatives: {error}")
+        else:
+            NotificationOutbox.objects.filter(id=entry.id).update(
+                available_at=now + retry_delay(entry.attempts), last_error=error
+            )
+            stats['retried'] += 1
+    return stats
+
+
+def run_worker(batch_size=500, poll_interval=1.0, once=False, on_batch=None):
+    """
+    Vide la boîte d'envoi en continu (ou une seule fois avec `once`).
+    Retourne les compteurs cumulés.
+    """
+    backends = get_backends()
+    totals = {'processed': 0, 'delivered': 0, 'retried': 0, 'failed': 0, 'batches': 0}
+    started = time.perf_counter()
+    while True:
+        batch_started = time.perf_counter()
+        stats = process_batch(batch_size, backends)
+        elapsed = time.perf_counter() - batch_started
+        if stats['processed']:
+            totals['batches'] += 1
+            for key in ('processed', 'delivered', 'retried', 'failed'):
+                totals[key] += stats[key]
+            if on_batch:
+                on_batch(stats, elapsed)
+            continue
+        if once:
+            break
+        time.sleep(poll_interval)
+    totals['elapsed'] = time.perf_counter() - started
+    return totals
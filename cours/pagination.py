@@ -0,0 +1,161 @@
+"""
+Pagination par curseur (keyset) sur un tuple de colonnes, par défaut (created_at, id).
+
+Contrairement à la pagination par numéro de page, aucune requête COUNT ni
+aucun OFFSET n'est exécuté : chaque page reprend après la dernière ligne de la
+page précédente, grâce à un index composite sur les colonnes de tri.
+"""
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def estimate_count(queryset):
+    """
+    Nombre de lignes estimé par le planificateur PostgreSQL, sans COUNT.
+    Les autres bases de données n'exposent pas d'estimation : on compte.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pagination keyset avec curseurs opaques.
+
+    Les vues peuvent définir `keyset_ordering` pour changer les colonnes de tri
+    (chemins ORM acceptés, ex. 'assignment__due_date'). La dernière colonne doit
+    être unique (généralement 'id'). `?count=estimate` ajoute un total estimé,
+    `?count=exact` un total exact.
+    """
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = "Curseur invalide."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = tuple(getattr(view, 'keyset_ordering', self.ordering))
+        self.page_size = self.get_page_size(request)
+        self.count = self.get_count(queryset, request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self._after(position))
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'estimate':
+            return estimate_count(queryset)
+        if mode == 'exact':
+            return queryset.count()
+        return None
+
+    def _fields(self):
+        return [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+    def _after(self, position):
+        """
+        Condition « strictement après `position` » dans l'ordre de tri :
+        (a > x) OU (a = x ET b > y) OU ...
+        """
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self._fields(), position):
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def _model_field(self, model, path):
+        field = None
+        for part in path.split('__'):
+            field = model._meta.get_field(part)
+            if field.is_relation:
+                model = field.related_model
+        return field
+
+    def _instance_value(self, instance, path):
+        value = instance
+        for part in path.split('__'):
+            value = getattr(value, part)
+        return value
+
+    def encode_cursor(self, instance):
+        position = []
+        for name, _ in self._fields():
+            value = self._instance_value(instance, name)
+            position.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        data = json.dumps(position, default=str).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            fields = self._fields()
+            if not isinstance(position, list) or len(position) != len(fields):
+                raise ValueError
+            return [
+                self._model_field(model, name).to_python(value)
+                for (name, _), value in zip(fields, position)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        response = OrderedDict([('next', self.get_next_link())])
+        if self.count is not None:
+            response['count'] = self.count
+        response['results'] = data
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        properties = {
+            'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+            'count': {'type': 'integer'},
+            'results': schema,
+        }
+        return {'type': 'object', 'required': ['results'], 'properties': properties}
+
@@ -66,7 +66,9 @@ class IsEnrolledInCourse(permissions.BasePermission):
         # Déterminer le cours associé selon le type d'objet
         course = None
         
-        if hasattr(obj, 'course'):
+        if isinstance(obj, Course):
+            course = obj
+        elif hasattr(obj, 'course'):
             course = obj.course
         elif hasattr(obj, 'module') and hasattr(obj.module, 'course'):
             course = obj.module.course
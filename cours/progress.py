@@ -0,0 +1,247 @@
+"""
+Maintenance incrémentale des tables de progression (ModuleProgress, CourseProgress).
+
+Chaque création de LessonCompletion incrémente les compteurs de l'utilisateur,
+chaque ajout ou suppression de leçon ajuste les totaux de tous les utilisateurs
+concernés. Les lectures de progression deviennent ainsi de simples lookups.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import CourseModule, CourseProgress, Lesson, LessonCompletion, ModuleProgress
+
+
+def _increment(model, lookup, completed_lessons, total_lessons):
+    """
+    Incrémente la ligne de progression désignée par `lookup`, en la créant à
+    partir des compteurs fournis (appelables) si elle n'existe pas encore.
+    """
+    updated = model.objects.filter(**lookup).update(completed_lessons=F('completed_lessons') + 1)
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(
+                completed_lessons=completed_lessons(),
+                total_lessons=total_lessons(),
+                **lookup
+            )
+    except IntegrityError:
+        # Une requête concurrente a créé la ligne entre-temps
+        model.objects.filter(**lookup).update(completed_lessons=F('completed_lessons') + 1)
+
+
+def record_completion(user, lesson):
+    """
+    Comptabilise une nouvelle leçon complétée dans la progression du module et du cours.
+    """
+    module_id = lesson.module_id
+    course_id = CourseModule.objects.filter(id=module_id).values_list('course_id', flat=True).get()
+
+    with transaction.atomic():
+        _increment(
+            ModuleProgress,
+            {'user': user, 'module_id': module_id},
+            lambda: LessonCompletion.objects.filter(user=user, lesson__module_id=module_id).count(),
+            lambda: Lesson.objects.filter(module_id=module_id).count(),
+        )
+        _increment(
+            CourseProgress,
+            {'user': user, 'course_id': course_id},
+            lambda: LessonCompletion.objects.filter(user=user, lesson__module__course_id=course_id).count(),
+            lambda: Lesson.objects.filter(module__course_id=course_id).count(),
+        )
+
+
+def _shift_lesson(lesson_id, module_id, delta, include_completions):
+    """
+    Applique `delta` au total de leçons de toutes les progressions du module et
+    du cours, et, si demandé, au nombre de leçons complétées des utilisateurs
+    ayant complété la leçon.
+    """
+    course_id = CourseModule.objects.filter(id=module_id).values_list('course_id', flat=True).first()
+    if course_id is None:
+        # Module supprimé en cascade : ses progressions disparaissent avec lui
+        return
+
+    with transaction.atomic():
+        if include_completions:
+            completers = LessonCompletion.objects.filter(lesson_id=lesson_id).values('user_id')
+            ModuleProgress.objects.filter(module_id=module_id, user__in=completers).update(
+                completed_lessons=F('completed_lessons') + delta
+            )
+            CourseProgress.objects.filter(course_id=course_id, user__in=completers).update(
+                completed_lessons=F('completed_lessons') + delta
+            )
+        ModuleProgress.objects.filter(module_id=module_id).update(total_lessons=F('total_lessons') + delta)
+        CourseProgress.objects.filter(course_id=course_id).update(total_lessons=F('total_lessons') + delta)
+        if include_completions and delta > 0:
+            # Leçon déplacée là où certains de ses complétants n'ont encore aucune progression
+            _create_missing(ModuleProgress, 'module', module_id, lesson_id, Lesson.objects.filter(module_id=module_id))
+            _create_missing(CourseProgress, 'course', course_id, lesson_id,
+                            Lesson.objects.filter(module__course_id=course_id))
+
+
+def _create_missing(model, target_field, target_id, lesson_id, lessons):
+    """
+    Crée, en valeurs absolues, les lignes de progression de `target_id` qui
+    manquent aux utilisateurs ayant complété la leçon `lesson_id`.
+    """
+    existing = model.objects.filter(**{f"{target_field}_id": target_id}).values('user_id')
+    missing = LessonCompletion.objects.filter(lesson_id=lesson_id).exclude(user_id__in=existing).values('user_id')
+    completed = (
+        LessonCompletion.objects.filter(user_id__in=missing, lesson__in=lessons).order_by()
+        .values('user_id').annotate(total=Count('id')).values_list('user_id', 'total')
+    )
+    total = lessons.count()
+    model.objects.bulk_create(
+        [model(user_id=user_id, completed_lessons=count, total_lessons=total, **{f"{target_field}_id": target_id})
+         for user_id, count in completed],
+        ignore_conflicts=True,
+    )
+
+
+def _refresh(model, target_field, user, target_ids, completed, totals):
+    existing = {
+        getattr(row, f"{target_field}_id"): row
+        for row in model.objects.filter(user=user, **{f"{target_field}_id__in": target_ids})
+    }
+    to_update = []
+    to_create = []
+    for target_id in target_ids:
+        values = {'completed_lessons': completed.get(target_id, 0), 'total_lessons': totals.get(target_id, 0)}
+        row = existing.get(target_id)
+        if row is None:
+            to_create.append(model(user=user, **{f"{target_field}_id": target_id}, **values))
+        else:
+            row.completed_lessons = values['completed_lessons']
+            row.total_lessons = values['total_lessons']
+            to_update.append(row)
+    model.objects.bulk_update(to_update, ['completed_lessons', 'total_lessons'])
+    # Une ligne créée entre-temps par une requête concurrente a les mêmes compteurs absolus
+    model.objects.bulk_create(to_create, ignore_conflicts=True)
+
+
+def refresh_user_progress(user, module_ids, course_ids):
+    """
+    Recalcule en valeurs absolues la progression de `user` dans les modules et
+    cours donnés, en requêtes groupées. Utilisé après des insertions en masse
+    de LessonCompletion, qui n'envoient pas de signal.
+    """
+    module_ids = list(module_ids)
+    course_ids = list(course_ids)
+    completions = LessonCompletion.objects.filter(user=user).order_by()
+
+    with transaction.atomic():
+        _refresh(
+            ModuleProgress, 'module', user, module_ids,
+            dict(completions.filter(lesson__module_id__in=module_ids)
+                 .values('lesson__module_id').annotate(total=Count('id'))
+                 .values_list('lesson__module_id', 'total')),
+            dict(Lesson.objects.filter(module_id__in=module_ids).order_by()
+                 .values('module_id').annotate(total=Count('id'))
+                 .values_list('module_id', 'total')),
+        )
+        _refresh(
+            CourseProgress, 'course', user, course_ids,
+            dict(completions.filter(lesson__module__course_id__in=course_ids)
+                 .values('lesson__module__course_id').annotate(total=Count('id'))
+                 .values_list('lesson__module__course_id', 'total')),
+            dict(Lesson.objects.filter(module__course_id__in=course_ids).order_by()
+                 .values('module__course_id').annotate(total=Count('id'))
+                 .values_list('module__course_id', 'total')),
+        )
+
+
+def rebuild_progress(course_ids=None):
+    """
+    Reconstruit entièrement les progressions à partir des LessonCompletion.
+    Retourne le nombre de lignes (modules, cours) recréées.
+    """
+    modules = CourseModule.objects.all()
+    completions = LessonCompletion.objects.all()
+    if course_ids:
+        modules = modules.filter(course_id__in=course_ids)
+        completions = completions.filter(lesson__module__course_id__in=course_ids)
+
+    module_totals = dict(
+        modules.annotate(total=Count('lessons')).values_list('id', 'total')
+    )
+    course_totals = {}
+    for course_id, total in modules.values('course_id').annotate(total=Count('lessons')).values_list('course_id', 'total'):
+        course_totals[course_id] = total
+
+    module_rows = [
+        ModuleProgress(user_id=row['user_id'], module_id=row['lesson__module'],
+                       completed_lessons=row['completed'], total_lessons=module_totals[row['lesson__module']])
+        for row in completions.values('user_id', 'lesson__module').annotate(completed=Count('id')).order_by()
+    ]
+    course_rows = [
+        CourseProgress(user_id=row['user_id'], course_id=row['lesson__module__course'],
+                       completed_lessons=row['completed'], total_lessons=course_totals[row['lesson__module__course']])
+        for row in completions.values('user_id', 'lesson__module__course').annotate(completed=Count('id')).order_by()
+    ]
+
+    with transaction.atomic():
+        module_progress = ModuleProgress.objects.all()
+        course_progress = CourseProgress.objects.all()
+        if course_ids:
+            module_progress = module_progress.filter(module__course_id__in=course_ids)
+            course_progress = course_progress.filter(course_id__in=course_ids)
+        module_progress.delete()
+        course_progress.delete()
+        ModuleProgress.objects.bulk_create(module_rows, batch_size=1000)
+        CourseProgress.objects.bulk_create(course_rows, batch_size=1000)
+
+    return len(module_rows), len(course_rows)
+
+
+@receiver(post_save, sender=LessonCompletion)
+def completion_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record_completion(instance.user, instance.lesson)
+
+
+@receiver(post_delete, sender=LessonCompletion)
+def completion_deleted(sender, instance, **kwargs):
+    module_id = Lesson.objects.filter(id=instance.lesson_id).values_list('module_id', flat=True).first()
+    if module_id is None:
+        return
+    with transaction.atomic():
+        ModuleProgress.objects.filter(user_id=instance.user_id, module_id=module_id).update(
+            completed_lessons=F('completed_lessons') - 1
+        )
+        CourseProgress.objects.filter(user_id=instance.user_id, course__modules=module_id).update(
+            completed_lessons=F('completed_lessons') - 1
+        )
+
+
+@receiver(pre_save, sender=Lesson)
+def lesson_pre_save(sender, instance, raw=False, **kwargs):
+    # Mémoriser l'ancien module pour détecter un déplacement de leçon
+    instance._previous_module_id = None
+    if instance.pk and not raw:
+        instance._previous_module_id = (
+            Lesson.objects.filter(pk=instance.pk).values_list('module_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Lesson)
+def lesson_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        _shift_lesson(instance.pk, instance.module_id, 1, include_completions=False)
+        return
+    previous_module_id = getattr(instance, '_previous_module_id', None)
+    if previous_module_id and previous_module_id != instance.module_id:
+        _shift_lesson(instance.pk, previous_module_id, -1, include_completions=True)
+        _shift_lesson(instance.pk, instance.module_id, 1, include_completions=True)
+
+
+@receiver(post_delete, sender=Lesson)
+def lesson_deleted(sender, instance, **kwargs):
+    # Les complétions supprimées en cascade ont déjà été décomptées par completion_deleted
+    _shift_lesson(instance.pk, instance.module_id, -1, include_completions=False)
@@ -0,0 +1,259 @@
+"""
+Recherche plein texte classée dans le catalogue de cours.
+
+Deux implémentations partagent la même interface :
+
+* PostgreSQL : colonne tsvector pondérée `Course.search_vector` et index GIN ;
+* SQLite : table virtuelle FTS5 (utilisée en développement et dans les tests).
+
+Le document indexé d'un cours est composé, par poids décroissant, de ce que
+l'on y apprend, du nom de sa catégorie, de ses prérequis et de son niveau.
+Chaque terme de la requête est recherché comme préfixe (saisie semi-automatique).
+"""
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework import filters
+
+from .models import Category, Course
+
+SEARCH_CONFIG = getattr(settings, 'COURSE_SEARCH_CONFIG', 'french')
+INDEX_BATCH_SIZE = 500
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(query):
+    return _TOKEN_RE.findall(query.lower())
+
+
+class BaseCourseSearch:
+    """
+    Interface commune des moteurs de recherche de cours.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.course_table = Course._meta.db_table
+        self.category_table = Category._meta.db_table
+
+    def install(self):
+        """Crée les structures d'index (appelé par la migration)."""
+        raise NotImplementedError
+
+    def uninstall(self):
+        raise NotImplementedError
+
+    def index(self, course_ids=None):
+        """Met à jour l'index des cours donnés, ou de tous les cours."""
+        if course_ids is None:
+            self._index_where('', [])
+            return
+        course_ids = list(course_ids)
+        for start in range(0, len(course_ids), INDEX_BATCH_SIZE):
+            batch = course_ids[start:start + INDEX_BATCH_SIZE]
+            placeholders = ', '.join(['%s'] * len(batch))
+            self._index_where(f"WHERE c.id IN ({placeholders})", batch)
+
+    def remove(self, course_ids):
+        pass
+
+    def search(self, queryset, query):
+        """
+        Filtre `queryset` sur la requête et l'annote d'un score `search_rank`,
+        trié par pertinence décroissante.
+        """
+        raise NotImplementedError
+
+    def _index_where(self, where, params):
+        raise NotImplementedError
+
+    def _execute(self, sql, params=()):
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+
+class PostgresCourseSearch(BaseCourseSearch):
+    index_name = 'course_search_vector_idx'
+
+    def install(self):
+        self._execute(
+            f"CREATE INDEX IF NOT EXISTS {self.index_name} ON {self.course_table} USING gin (search_vector)"
+        )
+        self.index()
+
+    def uninstall(self):
+        self._execute(f"DROP INDEX IF EXISTS {self.index_name}")
+
+    def _json_text(self, column):
+        return (
+            f"CASE WHEN jsonb_typeof(c.{column}) = 'array' THEN "
+            f"(SELECT string_agg(value, ' ') FROM jsonb_array_elements_text(c.{column})) END"
+        )
+
+    def _weighted(self, expression, weight):
+        return f"setweight(to_tsvector(%s::regconfig, coalesce({expression}, '')), '{weight}')"
+
+    def _index_where(self, where, params):
+        vector = ' || '.join([
+            self._weighted(self._json_text('what_you_learn'), 'A'),
+            self._weighted(f"(SELECT name FROM {self.category_table} WHERE id = c.category_id)", 'B'),
+            self._weighted(self._json_text('requirements'), 'C'),
+            self._weighted('c.level', 'D'),
+        ])
+        self._execute(
+            f"UPDATE {self.course_table} AS c SET search_vector = {vector} {where}",
+            [SEARCH_CONFIG] * 4 + list(params),
+        )
+
+    def search(self, queryset, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return queryset
+        search_query = SearchQuery(
+            ' & '.join(f"{token}:*" for token in tokens),
+            search_type='raw',
+            config=SEARCH_CONFIG,
+        )
+        return (
+            queryset.filter(search_vector=search_query)
+            .annotate(search_rank=SearchRank(F('search_vector'), search_query))
+            .order_by('-search_rank', '-id')
+        )
+
+
+class SqliteCourseSearch(BaseCourseSearch):
+    fts_table = 'cours_course_fts'
+    # Poids bm25 des colonnes, dans l'ordre de la table FTS5
+    weights = '4.0, 3.0, 2.0, 1.0'
+
+    def install(self):
+        self._execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.fts_table} USING fts5("
+            "what_you_learn, category, requirements, level, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        self.index()
+
+    def uninstall(self):
+        self._execute(f"DROP TABLE IF EXISTS {self.fts_table}")
+
+    def _json_text(self, column):
+        return (
+            f"CASE WHEN json_type(c.{column}) = 'array' THEN "
+            f"(SELECT group_concat(value, ' ') FROM json_each(c.{column})) END"
+        )
+
+    def _index_where(self, where, params):
+        if where:
+            self._execute(
+                f"DELETE FROM {self.fts_table} WHERE rowid IN (SELECT c.id FROM {self.course_table} AS c {where})",
+                params,
+            )
+        else:
+            self._execute(f"DELETE FROM {self.fts_table}")
+        self._execute(
+            f"INSERT INTO {self.fts_table} (rowid, what_you_learn, category, requirements, level) "
+            f"SELECT c.id, {self._json_text('what_you_learn')}, "
+            f"(SELECT name FROM {self.category_table} WHERE id = c.category_id), "
+            f"{self._json_text('requirements')}, c.level "
+            f"FROM {self.course_table} AS c {where}",
+            params,
+        )
+
+    def remove(self, course_ids):
+        course_ids = list(course_ids)
+        if course_ids:
+            placeholders = ', '.join(['%s'] * len(course_ids))
+            self._execute(f"DELETE FROM {self.fts_table} WHERE rowid IN ({placeholders})", course_ids)
+
+    def search(self, queryset, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return queryset
+        expression = ' '.join(f'"{token}"*' for token in tokens)
+        # Jointure sur la table FTS5 : bm25() n'est disponible que dans le contexte du MATCH
+        return (
+            queryset.extra(
+                select={'search_rank': f"-bm25({self.fts_table}, {self.weights})"},
+                tables=[self.fts_table],
+                where=[
+                    f"{self.fts_table}.rowid = {self.course_table}.id",
+                    f"{self.fts_table} MATCH %s",
+                ],
+                params=[expression],
+            )
+            .order_by('-search_rank', '-id')
+        )
+
+
+SEARCH_BACKENDS = {
+    'postgresql': PostgresCourseSearch,
+    'sqlite': SqliteCourseSearch,
+}
+
+
+def get_search_backend(using='default'):
+    """
+    Moteur de recherche de la base `using`, ou None si elle n'en propose pas.
+    """
+    connection = connections[using]
+    backend_class = SEARCH_BACKENDS.get(connection.vendor)
+    return backend_class(connection) if backend_class else None
+
+
+class CourseSearchFilter(filters.BaseFilterBackend):
+    """
+    Remplace SearchFilter pour les cours : recherche plein texte classée par pertinence.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        backend = get_search_backend(queryset.db)
+        if backend is None:
+            return queryset.filter(category__name__icontains=query)
+        return backend.search(queryset, query)
+
+
+def _index(using, course_ids):
+    backend = get_search_backend(using)
+    if backend is not None:
+        backend.index(course_ids)
+
+
+@receiver(post_save, sender=Course)
+def course_saved(sender, instance, raw=False, using='default', **kwargs):
+    if not raw:
+        _index(using, [instance.pk])
+
+
+@receiver(post_delete, sender=Course)
+def course_deleted(sender, instance, using='default', **kwargs):
+    backend = get_search_backend(using)
+    if backend is not None:
+        backend.remove([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, raw=False, using='default', **kwargs):
+    if not created and not raw:
+        _index(using, Course.objects.using(using).filter(category=instance).values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Category)
+def category_deleting(sender, instance, using='default', **kwargs):
+    # Les cours passent à category=NULL sans signal : on les réindexe après la suppression
+    instance._course_ids = list(Course.objects.using(using).filter(category=instance).values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, using='default', **kwargs):
+    _index(using, getattr(instance, '_course_ids', []))
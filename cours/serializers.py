@@ -1,10 +1,51 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.db.models import Count
+from django.db.models.manager import BaseManager
 from .models import (      
     Category, Course, CourseModule, Lesson, Assignment,
     Submission, Certificate, Comment, UserProfile, Notification,
-    LessonCompletion
+    LessonCompletion, CourseProgress, UploadSession
 )
+from .facets import get_category_course_counts
+from .uploads import submission_file_error
+
+class BatchListSerializer(serializers.ListSerializer):
+    """
+    ListSerializer qui laisse le serializer enfant précharger, en une requête
+    pour toute la page, les valeurs calculées par ligne (indicateurs de
+    l'utilisateur, compteurs). L'enfant implémente `prefetch_batch(instances)`
+    et range les résultats dans le contexte partagé, où ses méthodes `get_*` les lisent.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, BaseManager) else data
+        instances = list(iterable)
+        if instances:
+            self.child.prefetch_batch(instances)
+        return [self.child.to_representation(item) for item in instances]
+
+
+def _grouped_counts(queryset, group_field, ids):
+    """
+    Compte les lignes de `queryset` par valeur de `group_field` pour les ids donnés, en une requête.
+    """
+    counts = dict(
+        queryset.filter(**{f"{group_field}__in": ids})
+        .order_by()
+        .values(group_field)
+        .annotate(total=Count('pk'))
+        .values_list(group_field, 'total')
+    )
+    return {obj_id: counts.get(obj_id, 0) for obj_id in ids}
+
+
+def _current_user(context):
+    request = context.get('request')
+    if request and request.user.is_authenticated:
+        return request.user
+    return None
+
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -19,9 +60,17 @@ class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name', 'description', 'slug', 'icon', 'order', 'created_at', 'course_count']
+        list_serializer_class = BatchListSerializer
+    
+    def prefetch_batch(self, instances):
+        self.context['course_counts'] = get_category_course_counts()
     
     def get_course_count(self, obj):
-        return obj.course_set.count()
+        # Compteurs lus dans les facettes du catalogue, mises en cache
+        course_counts = self.context.get('course_counts')
+        if course_counts is None:
+            course_counts = get_category_course_counts()
+        return course_counts.get(obj.id, 0)
 
 class CourseSerializer(serializers.ModelSerializer):
     instructor = UserSerializer(read_only=True)
@@ -42,11 +91,15 @@ class CourseSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at', 'student_count', 'is_enrolled', 'progress']
     
     def get_student_count(self, obj):
-        return obj.students.count()
+        # Compteur dénormalisé maintenu par cours.enrollment
+        return obj.seats_taken
     
     def get_is_enrolled(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
+            user_enrolled = getattr(obj, 'user_enrolled', None)
+            if user_enrolled is not None:
+                return user_enrolled
             return obj.students.filter(id=request.user.id).exists()
         return False
     
@@ -58,15 +111,19 @@ class CourseSerializer(serializers.ModelSerializer):
         user = request.user
         
         # Obtenir le nombre total de leçons dans le cours
-        lesson_count = Lesson.objects.filter(module__course=obj).count()
+        lesson_count = getattr(obj, 'num_lessons', None)
+        if lesson_count is None:
+            lesson_count = Lesson.objects.filter(module__course=obj).count()
         if lesson_count == 0:
             return 0
             
         # Obtenir le nombre de leçons complétées par l'utilisateur
-        completed_count = LessonCompletion.objects.filter(
-            user=user,
-            lesson__module__course=obj
-        ).count()
+        completed_count = getattr(obj, 'num_completed', None)
+        if completed_count is None:
+            completed_count = CourseProgress.objects.filter(
+                user=user,
+                course=obj
+            ).values_list('completed_lessons', flat=True).first() or 0
         
         return round((completed_count / lesson_count) * 100, 1)
     
@@ -78,8 +135,20 @@ class CourseModuleSerializer(serializers.ModelSerializer):
         model = CourseModule
         fields = ['id', 'course', 'title', 'description', 'order', 'created_at', 'updated_at', 'lesson_count']
         read_only_fields = ['id', 'created_at', 'updated_at', 'lesson_count']
+        list_serializer_class = BatchListSerializer
+    
+    def prefetch_batch(self, instances):
+        missing = [obj.id for obj in instances if getattr(obj, 'num_lessons', None) is None]
+        if missing:
+            self.context['lesson_counts'] = _grouped_counts(Lesson.objects.all(), 'module_id', missing)
     
     def get_lesson_count(self, obj):
+        num_lessons = getattr(obj, 'num_lessons', None)
+        if num_lessons is not None:
+            return num_lessons
+        lesson_counts = self.context.get('lesson_counts')
+        if lesson_counts is not None and obj.id in lesson_counts:
+            return lesson_counts[obj.id]
         return obj.lessons.count()
 
 class LessonSerializer(serializers.ModelSerializer):
@@ -94,10 +163,24 @@ class LessonSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at', 'is_completed'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'is_completed']
+        list_serializer_class = BatchListSerializer
+    
+    def prefetch_batch(self, instances):
+        user = _current_user(self.context)
+        if user is not None:
+            self.context['completed_lesson_ids'] = set(
+                LessonCompletion.objects.filter(
+                    user=user,
+                    lesson__in=[obj.id for obj in instances]
+                ).values_list('lesson_id', flat=True)
+            )
     
     def get_is_completed(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
+            completed_lesson_ids = self.context.get('completed_lesson_ids')
+            if completed_lesson_ids is not None:
+                return obj.id in completed_lesson_ids
             return LessonCompletion.objects.filter(
                 user=request.user,
                 lesson=obj
@@ -124,10 +207,24 @@ class AssignmentSerializer(serializers.ModelSerializer):
             'updated_at', 'has_submitted'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'has_submitted']
+        list_serializer_class = BatchListSerializer
+    
+    def prefetch_batch(self, instances):
+        user = _current_user(self.context)
+        if user is not None:
+            self.context['submitted_assignment_ids'] = set(
+                Submission.objects.filter(
+                    student=user,
+                    assignment__in=[obj.id for obj in instances]
+                ).values_list('assignment_id', flat=True)
+            )
     
     def get_has_submitted(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
+            submitted_assignment_ids = self.context.get('submitted_assignment_ids')
+            if submitted_assignment_ids is not None:
+                return obj.id in submitted_assignment_ids
             return Submission.objects.filter(
                 assignment=obj,
                 student=request.user
@@ -158,16 +255,10 @@ class SubmissionSerializer(serializers.ModelSerializer):
         return None
     
     def validate_file(self, value):
-        # Vérifier la taille du fichier (10 Mo max)
-        if value.size > 10 * 1024 * 1024:
-            raise serializers.ValidationError("Le fichier ne doit pas dépasser 10 Mo.")
-        
-        # Vérifier l'extension du fichier
-        allowed_extensions = ['.pdf', '.doc', '.docx', '.ppt', '.pptx', '.zip', '.py', '.java', '.js', '.html', '.css']
-        import os
-        ext = os.path.splitext(value.name)[1].lower()
-        if ext not in allowed_extensions:
-            raise serializers.ValidationError(f"L'extension du fichier n'est pas autorisée. Extensions autorisées: {', '.join(allowed_extensions)}")
+        # Taille et extension : mêmes limites que l'envoi par morceaux (cours.uploads)
+        error = submission_file_error(value.name, value.size)
+        if error:
+            raise serializers.ValidationError(error)
         
         return value
 
@@ -179,9 +270,11 @@ class CertificateSerializer(serializers.ModelSerializer):
         model = Certificate
         fields = [
             'id', 'user', 'user_name', 'course', 'course_title', 
-            'certificate_number', 'issued_date', 'pdf_file'
+            'certificate_number', 'issued_date', 'pdf_file', 'status'
         ]
-        read_only_fields = ['id', 'certificate_number', 'issue_date', 'user_name', 'course_title']
+        # pdf_file et status sont renseignés par le rendu asynchrone (render_certificates)
+        read_only_fields = ['id', 'certificate_number', 'issue_date', 'user_name', 'course_title',
+                            'pdf_file', 'status']
     
     def get_user_name(self, obj):
         return f"{obj.user.first_name} {obj.user.last_name}" if obj.user.first_name else obj.user.username
@@ -189,23 +282,59 @@ class CertificateSerializer(serializers.ModelSerializer):
 class CommentSerializer(serializers.ModelSerializer):
     user = serializers.SerializerMethodField()
     parent = serializers.SerializerMethodField()
+    # Commentaire auquel on répond ; 'parent' n'en donne que l'extrait
+    parent_id = serializers.PrimaryKeyRelatedField(
+        source='parent', queryset=Comment.objects.only('id', 'lesson_id', 'depth'),
+        required=False, allow_null=True
+    )
     
     class Meta:
         model = Comment
         fields = [
-            'id', 'user', 'lesson', 'parent', 
+            'id', 'user', 'lesson', 'parent', 'parent_id',
              'content', 'created_at', 
            
         ]
         read_only_fields = ['id', 'created_at', 'user', 'parent']
     
+    def validate(self, attrs):
+        parent = attrs.get('parent')
+        if self.instance is not None:
+            # Le chemin matérialisé est fixé à la création
+            if 'parent' in attrs and parent != self.instance.parent:
+                raise serializers.ValidationError({'parent_id': "Le parent d'un commentaire ne peut pas être modifié."})
+            return attrs
+        if parent is None:
+            return attrs
+        if parent.lesson_id != attrs['lesson'].id:
+            raise serializers.ValidationError({'parent_id': "Le parent doit appartenir à la même leçon."})
+        if parent.depth >= Comment.MAX_DEPTH:
+            raise serializers.ValidationError(
+                {'parent_id': f"Un fil compte au plus {Comment.MAX_DEPTH} niveaux de réponses."}
+            )
+        return attrs
+    
     def get_user(self, obj):
-        return f"{obj.user.first_name} {obj.user.last_name}" if obj.user.first_name else obj.user.user
+        return f"{obj.user.first_name} {obj.user.last_name}" if obj.user.first_name else obj.user.username
     
     def get_parent(self, obj):
-        if obj.parent:
-            return obj.parent.content[:50] + '...' if len(obj.parent.content) > 50 else obj.parent.content
-        return None
+        if not obj.parent_id:
+            return None
+        # Début du parent annoté par CommentViewSet (51 caractères), sans charger le parent
+        parent_content = getattr(obj, 'parent_excerpt', None)
+        if parent_content is None:
+            parent_content = obj.parent.content
+        return parent_content[:50] + '...' if len(parent_content) > 50 else parent_content
+
+
+class CommentThreadSerializer(CommentSerializer):
+    """
+    Nœud d'un fil de discussion : le parent est implicite dans l'imbrication.
+    """
+    class Meta:
+        model = Comment
+        fields = ['id', 'user', 'lesson', 'content', 'created_at', 'depth']
+        read_only_fields = fields
 
 class UserProfileSerializer(serializers.ModelSerializer):
     user = UserSerializer()
@@ -233,10 +362,10 @@ class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
         fields = [
-            'id', 'user', 'title', 'message', 'notification_type', 
-            'read', 'created_at', 'link'
+            'id', 'user', 'title', 'message', 'type',
+            'read', 'created_at'
         ]
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = ['id', 'user', 'title', 'message', 'type', 'created_at']
 
 
 class SubmissionSerializer(serializers.ModelSerializer):
@@ -248,10 +377,28 @@ class SubmissionSerializer(serializers.ModelSerializer):
         model = Submission
         fields = [
             'id', 'assignment', 'assignment_title', 'student', 'student_name',
-            'submitted_at', 'submitted_at_formatted', 'file', 'grade', 'feedback',
-            'created_at', 'updated_at'
+            'submitted_at', 'submitted_at_formatted', 'file', 'original_filename', 'sha256', 'grade', 'feedback',
+            'claimed_by', 'claimed_at', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'submitted_at', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'submitted_at', 'original_filename', 'sha256', 'claimed_by', 'claimed_at',
+                            'created_at', 'updated_at']
     
     def get_submitted_at_formatted(self, obj):
-        return obj.submitted_at.strftime('%d %b %Y, %H:%M')
\ No newline at end of file
+        return obj.submitted_at.strftime('%d %b %Y, %H:%M')
+    
+    def validate_file(self, value):
+        # Taille et extension : mêmes limites que l'envoi par morceaux (cours.uploads)
+        error = submission_file_error(value.name, value.size)
+        if error:
+            raise serializers.ValidationError(error)
+        return value
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'assignment', 'filename', 'size', 'offset', 'sha256',
+            'submission', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'offset', 'submission', 'created_at', 'updated_at']
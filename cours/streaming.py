@@ -0,0 +1,224 @@
+"""
+Diffusion des notifications en temps réel (server-sent events).
+
+Chaque utilisateur connecté garde une connexion ouverte sur le flux
+/api/notifications/stream/ servi par l'application ASGI. Les nouvelles
+Notification sont publiées sur un broker dès la validation de la transaction
+qui les crée, puis poussées aux connexions de leur destinataire.
+
+Deux brokers partagent la même interface (réglage NOTIFICATION_BROKER) :
+
+* InProcessBroker : publication/abonnement en mémoire, limité au processus
+  courant (développement, worker unique) ;
+* PostgresBroker : LISTEN/NOTIFY PostgreSQL, qui relie les processus web et le
+  worker process_notifications sans service supplémentaire.
+
+Sans réglage explicite, PostgresBroker est utilisé dès que la base est
+PostgreSQL : les notifications créées par le worker atteignent ainsi les flux
+ouverts dans les processus web.
+
+Le flux n'est servi que par l'application ASGI (elearning.asgi) : sous WSGI,
+chaque connexion ouverte bloquerait un thread du serveur.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils.module_loading import import_string
+
+from .models import Notification
+from .serializers import NotificationSerializer
+
+logger = logging.getLogger(__name__)
+
+# Taille de la file d'un abonné : au-delà, les événements sont ignorés et le
+# client les récupère à la reconnexion grâce à Last-Event-ID
+QUEUE_SIZE = getattr(settings, 'NOTIFICATION_STREAM_QUEUE_SIZE', 100)
+KEEPALIVE_INTERVAL = getattr(settings, 'NOTIFICATION_STREAM_KEEPALIVE', 15)
+RETRY_INTERVAL = getattr(settings, 'NOTIFICATION_STREAM_RETRY', 5000)
+BACKLOG_LIMIT = 100
+
+
+class InProcessBroker:
+    """
+    Broker en mémoire. `publish` peut être appelé depuis n'importe quel thread
+    (vues synchrones, signaux) : l'événement est remis dans la boucle asyncio
+    de chaque abonné.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, user_id, payload):
+        self._dispatch(user_id, payload)
+
+    def _dispatch(self, user_id, payload):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._put, queue, payload)
+            except RuntimeError:
+                # Boucle fermée : l'abonnement sera retiré par son propriétaire
+                pass
+
+    def _put(self, queue, payload):
+        try:
+            queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            logger.warning(f"File de notifications pleine, événement {payload.get('id')} ignoré")
+
+    @asynccontextmanager
+    async def subscribe(self, user_id):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(maxsize=QUEUE_SIZE))
+        with self._lock:
+            self._subscribers[user_id].add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                self._subscribers[user_id].discard(subscriber)
+                if not self._subscribers[user_id]:
+                    del self._subscribers[user_id]
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+class PostgresBroker(InProcessBroker):
+    """
+    Broker inter-processus par LISTEN/NOTIFY. Chaque processus web ouvre une
+    seule connexion d'écoute, partagée par tous ses abonnés.
+    """
+    channel = 'cours_notifications'
+    # Limite de NOTIFY (8000 octets) : les messages longs sont tronqués dans l'événement
+    max_message_length = 1000
+
+    def __init__(self, using='default'):
+        super().__init__()
+        self.using = using
+        self._listeners = {}
+
+    def publish(self, user_id, payload):
+        payload = dict(payload, message=payload.get('message', '')[:self.max_message_length])
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_notify(%s, %s)",
+                [self.channel, json.dumps({'user': user_id, 'payload': payload}, default=str)],
+            )
+
+    def _conninfo(self):
+        params = connections[self.using].settings_dict
+        return {
+            'dbname': params['NAME'],
+            'user': params['USER'],
+            'password': params['PASSWORD'],
+            'host': params['HOST'],
+            'port': params['PORT'],
+        }
+
+    async def _listen(self):
+        import psycopg
+
+        while True:
+            try:
+                conninfo = {key: value for key, value in self._conninfo().items() if value}
+                async with await psycopg.AsyncConnection.connect(autocommit=True, **conninfo) as listener:
+                    await listener.execute(f"LISTEN {self.channel}")
+                    async for notify in listener.notifies():
+                        data = json.loads(notify.payload)
+                        self._dispatch(data['user'], data['payload'])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Connexion d'écoute des notifications perdue, reconnexion")
+                await asyncio.sleep(1)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id):
+        loop = asyncio.get_running_loop()
+        listener = self._listeners.get(loop)
+        if listener is None or listener.done():
+            self._listeners[loop] = loop.create_task(self._listen())
+        async with super().subscribe(user_id) as queue:
+            yield queue
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def default_broker_path(using='default'):
+    if connections[using].vendor == 'postgresql':
+        return 'cours.streaming.PostgresBroker'
+    return 'cours.streaming.InProcessBroker'
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'NOTIFICATION_BROKER', '') or default_broker_path()
+                _broker = import_string(path)()
+    return _broker
+
+
+def publish_notifications(notifications):
+    broker = get_broker()
+    for notification in notifications:
+        broker.publish(notification.user_id, NotificationSerializer(notification).data)
+
+
+def publish_on_commit(notifications):
+    notifications = list(notifications)
+    if notifications:
+        transaction.on_commit(lambda: publish_notifications(notifications))
+
+
+# ---------------------------
+# Flux server-sent events
+# ---------------------------
+def format_event(payload):
+    data = json.dumps(payload, default=str, ensure_ascii=False)
+    return f"id: {payload['id']}\nevent: notification\ndata: {data}\n\n"
+
+
+async def notification_events(user, last_event_id=None):
+    """
+    Générateur asynchrone du flux SSE de `user`. À la reconnexion, les
+    notifications postérieures à `last_event_id` sont renvoyées avant le direct.
+    """
+    async with get_broker().subscribe(user.pk) as queue:
+        # Abonnement avant la lecture du rattrapage : aucun événement ne peut être perdu
+        yield f"retry: {RETRY_INTERVAL}\n\n"
+        last_sent = 0
+        if last_event_id is not None:
+            last_sent = last_event_id
+            backlog = Notification.objects.filter(user_id=user.pk, id__gt=last_event_id).order_by('id')
+            async for notification in backlog[:BACKLOG_LIMIT]:
+                last_sent = notification.id
+                yield format_event(NotificationSerializer(notification).data)
+
+        # Django ne ferme la connexion à la base qu'à la fin de la requête : une
+        # connexion inactive ne doit pas garder la sienne ouverte pendant des heures
+        await sync_to_async(connections.close_all)()
+
+        while True:
+            try:
+                payload = await asyncio.wait_for(queue.get(), KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if payload['id'] <= last_sent:
+                continue
+            last_sent = payload['id']
+            yield format_event(payload)
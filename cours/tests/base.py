@@ -0,0 +1,76 @@
+"""
+Outils communs aux tests de l'application cours.
+"""
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from cours.models import Assignment, Course, CourseModule, Lesson, Submission
+
+
+def make_user(username, **kwargs):
+    kwargs.setdefault('email', f"{username}@example.com")
+    return User.objects.create(username=username, **kwargs)
+
+
+def make_course(**kwargs):
+    kwargs.setdefault('level', 'beginner')
+    kwargs.setdefault('thumbnail', 'courses/test.png')
+    return Course.objects.create(**kwargs)
+
+
+def make_module(course, order=1, **kwargs):
+    kwargs.setdefault('title', f"Module {order}")
+    kwargs.setdefault('description', '')
+    return CourseModule.objects.create(course=course, order=order, **kwargs)
+
+
+def make_lesson(module, order=1, **kwargs):
+    kwargs.setdefault('title', f"Leçon {order}")
+    kwargs.setdefault('content', '')
+    return Lesson.objects.create(module=module, order=order, **kwargs)
+
+
+def make_assignment(lesson, **kwargs):
+    kwargs.setdefault('title', 'Devoir')
+    kwargs.setdefault('description', '')
+    kwargs.setdefault('due_date', timezone.now() + timedelta(days=7))
+    return Assignment.objects.create(lesson=lesson, **kwargs)
+
+
+def make_submission(assignment, student, **kwargs):
+    kwargs.setdefault('file', 'submissions/test.pdf')
+    return Submission.objects.create(assignment=assignment, student=student, **kwargs)
+
+
+class APITestCase(TestCase):
+    """
+    Tests à travers l'API : pas de redirection HTTPS, fichiers dans un
+    répertoire temporaire, cache vidé avant chaque test.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls._overridden = override_settings(SECURE_SSL_REDIRECT=False, MEDIA_ROOT=cls.media_root)
+        cls._overridden.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._overridden.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def login(self, user):
+        self.client.force_authenticate(user=user)
@@ -0,0 +1,48 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from cours.models import LessonCompletion
+
+from .base import (APITestCase, make_assignment, make_course, make_lesson, make_module,
+                   make_submission, make_user)
+
+
+class BatchFlagTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user('alice')
+        self.other = make_user('bob')
+        self.course = make_course()
+        self.course.students.add(self.user, self.other)
+        self.module = make_module(self.course)
+        self.lessons = [make_lesson(self.module, order=i) for i in range(1, 4)]
+        self.assignments = [make_assignment(lesson) for lesson in self.lessons]
+        self.login(self.user)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_is_completed_is_per_user(self):
+        LessonCompletion.objects.create(user=self.user, lesson=self.lessons[1])
+        LessonCompletion.objects.create(user=self.other, lesson=self.lessons[2])
+        response = self.client.get(f"/api/lessons/?module_id={self.module.id}")
+        self.assertEqual([lesson['is_completed'] for lesson in response.data], [False, True, False])
+
+    def test_has_submitted_is_per_user(self):
+        make_submission(self.assignments[0], self.user)
+        make_submission(self.assignments[2], self.other)
+        response = self.client.get("/api/assignments/")
+        flags = {item['id']: item['has_submitted'] for item in response.data}
+        self.assertEqual(flags, {self.assignments[0].id: True, self.assignments[1].id: False,
+                                 self.assignments[2].id: False})
+
+    def test_query_count_does_not_grow_with_rows(self):
+        lessons_before = self.count_queries("/api/lessons/")
+        assignments_before = self.count_queries("/api/assignments/")
+        for order in range(4, 10):
+            make_assignment(make_lesson(self.module, order=order))
+        self.assertEqual(self.count_queries("/api/lessons/"), lessons_before)
+        self.assertEqual(self.count_queries("/api/assignments/"), assignments_before)
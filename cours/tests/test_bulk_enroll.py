@@ -0,0 +1,87 @@
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from cours.enrollment import Enrollment
+from cours.models import Course, NotificationOutbox
+
+from .base import APITestCase, make_course, make_user
+
+
+class BulkEnrollTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.instructor = make_user('prof')
+        self.course = make_course(instructor=self.instructor)
+        self.url = f"/api/courses/{self.course.id}/bulk_enroll/"
+        self.login(self.instructor)
+
+    def statuses(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [row['status'] for row in response.data['results']]
+
+    def test_statuses(self):
+        alice, bob, carol = make_user('alice'), make_user('bob'), make_user('carol')
+        self.course.students.add(carol)
+        response = self.client.post(self.url, {'students': [
+            str(alice.id), 'BOB@example.com', str(alice.id), 'inconnu@example.com', '999999', str(carol.id),
+        ]}, format='json')
+        self.assertEqual(self.statuses(response),
+                         ['enrolled', 'enrolled', 'duplicate', 'not_found', 'not_found', 'already_enrolled'])
+        self.assertEqual(response.data['enrolled'], 2)
+        self.assertEqual(Course.objects.get(pk=self.course.pk).seats_taken, 3)
+        self.assertEqual(NotificationOutbox.objects.filter(type='enrollment').count(), 2)
+
+    def test_enrollment_committed_before_the_lock(self):
+        alice, bob = make_user('alice'), make_user('bob')
+        select_for_update = Course.objects.select_for_update
+
+        def enroll_alice_first():
+            # Inscription concurrente validée après la résolution des utilisateurs
+            Enrollment.objects.create(course_id=self.course.pk, user_id=alice.pk)
+            return select_for_update()
+
+        with mock.patch.object(Course.objects, 'select_for_update', side_effect=enroll_alice_first):
+            response = self.client.post(self.url, {'students': [alice.id, bob.id]}, format='json')
+        self.assertEqual(self.statuses(response), ['already_enrolled', 'enrolled'])
+        self.assertEqual(response.data['enrolled'], 1)
+        self.assertEqual(Course.objects.get(pk=self.course.pk).seats_taken, 2)
+
+    def test_notification_keyed_on_enrollment(self):
+        alice = make_user('alice')
+        for _ in range(2):
+            self.client.post(self.url, {'students': [alice.id]}, format='json')
+        enrollment = Enrollment.objects.get(course_id=self.course.pk, user_id=alice.pk)
+        self.assertEqual(
+            list(NotificationOutbox.objects.filter(type='enrollment').values_list('idempotency_key', flat=True)),
+            [f"enrollment:{enrollment.pk}"],
+        )
+
+        # Une réinscription est une nouvelle inscription : elle est notifiée
+        self.course.students.remove(alice)
+        response = self.client.post(self.url, {'students': [alice.id]}, format='json')
+        self.assertEqual(self.statuses(response), ['enrolled'])
+        self.assertEqual(NotificationOutbox.objects.filter(type='enrollment', user=alice).count(), 2)
+
+    def test_course_full(self):
+        self.course.enrollment_limit = 2
+        self.course.save()
+        users = [make_user(f"user{i}") for i in range(3)]
+        response = self.client.post(self.url, {'students': [u.id for u in users]}, format='json')
+        self.assertEqual(self.statuses(response), ['enrolled', 'enrolled', 'course_full'])
+        self.assertEqual(Course.objects.get(pk=self.course.pk).seats_taken, 2)
+
+    def test_csv_file_with_header(self):
+        make_user('alice')
+        upload = SimpleUploadedFile('cohorte.csv', b"email\r\nalice@example.com\r\n\r\n", content_type='text/csv')
+        response = self.client.post(self.url, {'file': upload}, format='multipart')
+        self.assertEqual(self.statuses(response), ['enrolled'])
+
+    def test_requires_a_list(self):
+        response = self.client.post(self.url, {'students': 'alice'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_only_the_instructor(self):
+        self.login(make_user('eve'))
+        response = self.client.post(self.url, {'students': ['1']}, format='json')
+        self.assertEqual(response.status_code, 403)
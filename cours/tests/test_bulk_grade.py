@@ -0,0 +1,86 @@
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from cours.models import NotificationOutbox, Submission
+
+from .base import (APITestCase, make_assignment, make_course, make_lesson, make_module, make_submission,
+                   make_user)
+
+
+class BulkGradeTests(APITestCase):
+    url = '/api/submissions/bulk_grade/'
+
+    def setUp(self):
+        super().setUp()
+        self.instructor = make_user('enseignant')
+        assignment = make_assignment(make_lesson(make_module(make_course(instructor=self.instructor))), max_score=20)
+        self.students = [make_user(f"etudiant{i}") for i in range(3)]
+        self.submissions = [make_submission(assignment, student) for student in self.students]
+        self.login(make_user('prof', is_staff=True))
+
+    def grade(self, rows):
+        response = self.client.post(self.url, {'grades': rows}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_statuses(self):
+        first, second, third = (submission.id for submission in self.submissions)
+        data = self.grade([
+            {'submission_id': first, 'grade': 15, 'feedback': 'Bien'},
+            {'submission_id': first, 'grade': 12},
+            {'submission_id': second, 'grade': 25},
+            {'submission_id': third, 'grade': '14.5'},
+            {'submission_id': 999999, 'grade': 10},
+            {'submission_id': 'x', 'grade': 10},
+        ])
+        self.assertEqual([result['status'] for result in data['results']],
+                         ['graded', 'duplicate', 'out_of_range', 'invalid', 'not_found', 'invalid'])
+        self.assertEqual(data['graded'], 1)
+        graded = Submission.objects.get(pk=first)
+        self.assertEqual((graded.grade, graded.feedback), (15, 'Bien'))
+        self.assertEqual(NotificationOutbox.objects.filter(type='grade').count(), 1)
+
+    def test_replay_is_unchanged(self):
+        rows = [{'submission_id': submission.id, 'grade': 10} for submission in self.submissions]
+        self.grade(rows)
+        data = self.grade(rows)
+        self.assertEqual([result['status'] for result in data['results']], ['unchanged'] * 3)
+        self.assertEqual(NotificationOutbox.objects.filter(type='grade').count(), 3)
+
+    def test_csv_upload(self):
+        csv = f"submission_id,grade,feedback\n{self.submissions[0].id},18.0,Très bien\n".encode()
+        response = self.client.post(self.url, {'file': SimpleUploadedFile('notes.csv', csv)}, format='multipart')
+        self.assertEqual(response.data['results'][0]['status'], 'graded')
+        self.assertEqual(Submission.objects.get(pk=self.submissions[0].id).feedback, 'Très bien')
+
+    def test_requires_grader(self):
+        self.login(self.students[0])
+        response = self.client.post(self.url, {'grades': [{'submission_id': self.submissions[0].id, 'grade': 20}]},
+                                    format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertIsNone(Submission.objects.get(pk=self.submissions[0].id).grade)
+
+    def test_requires_rows(self):
+        self.assertEqual(self.client.post(self.url, {'grades': []}, format='json').status_code, 400)
+
+    def test_course_instructor(self):
+        self.login(self.instructor)
+        data = self.grade([{'submission_id': self.submissions[0].id, 'grade': 16}])
+        self.assertEqual(data['results'][0]['status'], 'graded')
+        self.assertEqual(Submission.objects.get(pk=self.submissions[0].id).grade, 16)
+
+    def test_instructor_of_another_course(self):
+        other = make_user('autre-prof')
+        make_course(instructor=other)
+        self.login(other)
+        data = self.grade([{'submission_id': self.submissions[0].id, 'grade': 16}])
+        self.assertEqual(data['results'][0]['status'], 'not_found')
+        self.assertIsNone(Submission.objects.get(pk=self.submissions[0].id).grade)
+
+    def test_student_cannot_grade_own_submission(self):
+        # Enseignant d'un autre cours : autorisé à noter, mais pas sa propre soumission
+        student = self.students[0]
+        make_course(instructor=student)
+        self.login(student)
+        data = self.grade([{'submission_id': self.submissions[0].id, 'grade': 20}])
+        self.assertEqual(data['results'][0]['status'], 'not_found')
+        self.assertIsNone(Submission.objects.get(pk=self.submissions[0].id).grade)
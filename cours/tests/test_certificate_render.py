@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from cours import certificate_pdf
+from cours.certificates import issue_certificate, process_render_batch
+from cours.models import Certificate, CertificateRenderJob
+
+from .base import APITestCase, make_course, make_user
+
+
+class CertificateRenderTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(self.executor.shutdown)
+        self.course = make_course()
+        self.certificates = [
+            issue_certificate(make_user(name, first_name=name.capitalize()), self.course)[0]
+            for name in ('alice', 'élodie')
+        ]
+
+    def test_render_is_deterministic(self):
+        data = {'student': 'Élodie', 'course': 'Cours #1', 'number': 'CERT-1', 'issued_at': '2026-01-02T10:00:00+00:00'}
+        digest, content = certificate_pdf.render_certificate(data)
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertEqual(certificate_pdf.render_certificate(data)[0], digest)
+        self.assertNotEqual(certificate_pdf.render_certificate(dict(data, number='CERT-2'))[0], digest)
+
+    def test_batch_renders_and_issues(self):
+        stats = process_render_batch(self.executor)
+        self.assertEqual((stats['processed'], stats['rendered']), (2, 2))
+        for certificate in Certificate.objects.all():
+            self.assertEqual(certificate.status, 'issued')
+            self.assertRegex(certificate.pdf_file.name, r'^certificates/[0-9a-f]{2}/[0-9a-f]{64}\.pdf$')
+            self.assertTrue(certificate.pdf_file.storage.exists(certificate.pdf_file.name))
+        self.assertFalse(CertificateRenderJob.objects.exclude(status=CertificateRenderJob.DONE).exists())
+        self.assertEqual(process_render_batch(self.executor)['processed'], 0)
+
+    def test_revoked_before_render_stays_revoked(self):
+        Certificate.objects.filter(pk=self.certificates[0].pk).update(status='revoked')
+        process_render_batch(self.executor)
+        self.assertEqual(Certificate.objects.get(pk=self.certificates[0].pk).status, 'revoked')
+
+    def test_failed_render_is_retried(self):
+        with mock.patch.object(certificate_pdf, 'render_certificate', side_effect=ValueError("police absente")):
+            stats = process_render_batch(self.executor)
+        self.assertEqual(stats['retried'], 2)
+        job = CertificateRenderJob.objects.first()
+        self.assertEqual(job.status, CertificateRenderJob.PENDING)
+        self.assertIn('police absente', job.last_error)
+        self.assertFalse(Certificate.objects.exclude(status='pending').exists())
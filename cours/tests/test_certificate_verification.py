@@ -0,0 +1,53 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from cours.certificates import issue_certificate, verification_cache_key
+
+from .base import APITestCase, make_course, make_user
+
+
+class CertificateVerificationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.certificate, _ = issue_certificate(make_user('alice'), make_course())
+        self.url = f"/api/certificates/verify/{self.certificate.certificate_number}/"
+
+    def test_valid_certificate(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'valid')
+        self.assertTrue(response.data['signature'])
+        self.assertIn('max-age=300', response['Cache-Control'])
+
+    def test_server_cache_outlives_http_cache(self):
+        # Invalidé à chaque écriture du certificat : l'entrée peut vivre longtemps
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            self.client.get(self.url)
+        key, _, timeout = cache_set.call_args.args
+        self.assertEqual(key, verification_cache_key(self.certificate.certificate_number))
+        self.assertGreaterEqual(timeout, 24 * 60 * 60)
+
+    def test_conditional_request(self):
+        etag = self.client.get(self.url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(any('"cours_certificate"' in query['sql'] for query in queries.captured_queries))
+
+    def test_unknown_number(self):
+        self.assertEqual(self.client.get('/api/certificates/verify/CERT-0-0-0/').status_code, 404)
+
+    def test_revocation_is_visible_immediately(self):
+        etag = self.client.get(self.url)['ETag']
+        self.login(make_user('admin', is_staff=True))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"/api/certificates/{self.certificate.id}/revoke/")
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'revoked')
+        self.assertNotEqual(response['ETag'], etag)
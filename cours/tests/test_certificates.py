@@ -0,0 +1,85 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+
+from cours.certificates import eligible_students, is_course_completed, issue_certificate, issue_cohort_certificates
+from cours.models import Certificate, CertificateRenderJob, LessonCompletion
+
+from .base import APITestCase, make_course, make_lesson, make_module, make_user
+
+
+class EligibilityTests(TestCase):
+    def setUp(self):
+        self.course = make_course()
+        module = make_module(self.course)
+        self.lessons = [make_lesson(module, order=i) for i in range(3)]
+        self.done, self.partial, self.outsider = make_user('alice'), make_user('bob'), make_user('eve')
+        self.course.students.add(self.done, self.partial)
+        for lesson in self.lessons:
+            LessonCompletion.objects.create(user=self.done, lesson=lesson)
+            LessonCompletion.objects.create(user=self.outsider, lesson=lesson)
+        LessonCompletion.objects.create(user=self.partial, lesson=self.lessons[0])
+
+    def test_is_course_completed(self):
+        self.assertTrue(is_course_completed(self.done, self.course))
+        self.assertFalse(is_course_completed(self.partial, self.course))
+        self.assertFalse(is_course_completed(self.done, make_course()))
+
+    def test_eligible_students_are_enrolled_and_done(self):
+        self.assertEqual(eligible_students(self.course), [self.done.id])
+
+    def test_issue_certificate_once(self):
+        certificate, created = issue_certificate(self.done, self.course)
+        self.assertTrue(created)
+        self.assertEqual(certificate.status, 'pending')
+        self.assertTrue(CertificateRenderJob.objects.filter(certificate=certificate).exists())
+        self.assertEqual(issue_certificate(self.done, self.course), (certificate, False))
+
+    def test_cohort(self):
+        self.assertEqual(issue_cohort_certificates(self.course), 1)
+        self.assertEqual(issue_cohort_certificates(self.course), 0)
+        self.assertEqual(Certificate.objects.get().user, self.done)
+
+
+class GenerateTests(APITestCase):
+    def test_requires_every_lesson(self):
+        user = make_user('alice')
+        course = make_course()
+        lesson = make_lesson(make_module(course))
+        self.login(user)
+        url = '/api/certificates/generate/'
+        self.assertEqual(self.client.post(url, {'course_id': course.id}).status_code, 403)
+        LessonCompletion.objects.create(user=user, lesson=lesson)
+        response = self.client.post(url, {'course_id': course.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.post(url, {'course_id': course.id}).data['id'], response.data['id'])
+
+
+class UniqueCertificateMigrationTests(TransactionTestCase):
+    before = [('cours', '0013_notification_inbox_indexes')]
+    after = [('cours', '0014_certificate_user_course_unique')]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicates_abort_without_deleting(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        apps = executor.loader.project_state(self.before).apps
+        User = apps.get_model('auth', 'User')
+        Course = apps.get_model('cours', 'Course')
+        Certificate = apps.get_model('cours', 'Certificate')
+        user = User.objects.create(username='alice')
+        course = Course.objects.create(level='beginner', thumbnail='c.png')
+        for number in ('CERT-A', 'CERT-B'):
+            Certificate.objects.create(user=user, course=course, certificate_number=number)
+
+        executor = MigrationExecutor(connection)
+        with self.assertRaisesMessage(RuntimeError, 'CERT-A, CERT-B'):
+            executor.migrate(self.after)
+        self.assertEqual(Certificate.objects.count(), 2)
+
+        Certificate.objects.filter(certificate_number='CERT-B').delete()
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
@@ -0,0 +1,101 @@
+from unittest import mock
+
+from django.db import DatabaseError
+
+from cours.models import Comment
+
+from .base import APITestCase, make_course, make_lesson, make_module, make_user
+
+
+class CommentThreadTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user('alice')
+        self.lesson = make_lesson(make_module(make_course()))
+        self.login(self.user)
+
+    def comment(self, parent=None, content='...'):
+        return Comment.objects.create(user=self.user, lesson=self.lesson, parent=parent, content=content)
+
+    def test_path_and_depth(self):
+        root = self.comment()
+        reply = self.comment(parent=root)
+        reply.refresh_from_db()
+        self.assertEqual(reply.depth, 1)
+        self.assertEqual(reply.path, f"{root.pk:010d}/{reply.pk:010d}/")
+
+    def test_thread_is_nested_with_counts(self):
+        first = self.comment(content='a')
+        reply = self.comment(parent=first, content='a.1')
+        self.comment(parent=reply, content='a.1.1')
+        self.comment(parent=first, content='a.2')
+        second = self.comment(content='b')
+        Comment.objects.create(user=self.user, lesson=make_lesson(self.lesson.module, order=2), content='ailleurs')
+
+        response = self.client.get(f"/api/comments/thread/?lesson={self.lesson.id}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([node['id'] for node in response.data], [first.id, second.id])
+        node = response.data[0]
+        self.assertEqual((node['reply_count'], node['descendant_count']), (2, 3))
+        self.assertEqual([child['content'] for child in node['replies']], ['a.1', 'a.2'])
+        self.assertEqual(node['replies'][0]['replies'][0]['content'], 'a.1.1')
+
+    def test_subtree(self):
+        first = self.comment()
+        reply = self.comment(parent=first)
+        self.comment(parent=reply)
+        self.comment()
+        response = self.client.get(f"/api/comments/thread/?lesson={self.lesson.id}&root={reply.id}")
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['id'], reply.id)
+        self.assertEqual(response.data[0]['descendant_count'], 1)
+
+    def test_lesson_is_required(self):
+        self.assertEqual(self.client.get("/api/comments/thread/").status_code, 400)
+
+    def test_depth_is_capped(self):
+        parent = self.comment()
+        for _ in range(Comment.MAX_DEPTH + 5):
+            parent = self.comment(parent=parent)
+        deepest = Comment.objects.order_by('-depth', '-path').first()
+        self.assertEqual(deepest.depth, Comment.MAX_DEPTH)
+        self.assertLessEqual(len(deepest.path), Comment._meta.get_field('path').max_length)
+        # Les réponses au-delà de la limite sont rattachées au dernier niveau autorisé
+        self.assertEqual(Comment.objects.filter(depth=Comment.MAX_DEPTH).count(), 6)
+        self.assertEqual(Comment.objects.filter(depth=Comment.MAX_DEPTH).values('parent').distinct().count(), 1)
+
+    def test_insert_is_rolled_back_if_path_update_fails(self):
+        root = self.comment()
+        with mock.patch('django.db.models.query.QuerySet.update', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.comment(parent=root)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_reply_through_api(self):
+        root = self.comment(content='question')
+        response = self.client.post('/api/comments/', {
+            'lesson': self.lesson.id, 'parent_id': root.id, 'content': 'réponse',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['parent_id'], root.id)
+        reply = Comment.objects.get(id=response.data['id'])
+        self.assertEqual((reply.user, reply.depth), (self.user, 1))
+
+    def test_reply_beyond_max_depth_is_refused(self):
+        parent = self.comment()
+        for _ in range(Comment.MAX_DEPTH):
+            parent = self.comment(parent=parent)
+        self.assertEqual(parent.depth, Comment.MAX_DEPTH)
+        response = self.client.post('/api/comments/', {
+            'lesson': self.lesson.id, 'parent_id': parent.id, 'content': 'trop profond',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('parent_id', response.data)
+        self.assertFalse(Comment.objects.filter(content='trop profond').exists())
+
+    def test_parent_from_another_lesson_is_refused(self):
+        other = Comment.objects.create(user=self.user, lesson=make_lesson(self.lesson.module, order=2), content='x')
+        response = self.client.post('/api/comments/', {
+            'lesson': self.lesson.id, 'parent_id': other.id, 'content': 'réponse',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
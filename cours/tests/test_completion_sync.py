@@ -0,0 +1,57 @@
+from cours.models import Certificate, CourseProgress, LessonCompletion, NotificationOutbox
+
+from .base import APITestCase, make_course, make_lesson, make_module, make_user
+
+
+class CompletionSyncTests(APITestCase):
+    url = '/api/lessons/sync/'
+
+    def setUp(self):
+        super().setUp()
+        self.user = make_user('alice')
+        self.course = make_course()
+        self.course.students.add(self.user)
+        module = make_module(self.course)
+        self.lessons = [make_lesson(module, order=i) for i in range(2)]
+        self.other = make_lesson(make_module(make_course()))
+        self.login(self.user)
+
+    def sync(self, events):
+        response = self.client.post(self.url, {'events': events}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_statuses(self):
+        data = self.sync([
+            {'lesson_id': self.lessons[0].id, 'completed_at': '2026-01-01T10:00:00Z'},
+            {'lesson_id': self.lessons[0].id},
+            {'lesson_id': 'x'},
+            {'lesson_id': 999999},
+            {'lesson_id': self.other.id},
+            {'lesson_id': self.lessons[1].id, 'completed_at': 'hier'},
+        ])
+        self.assertEqual([result['status'] for result in data['results']],
+                         ['completed', 'duplicate', 'invalid', 'not_found', 'not_enrolled', 'invalid'])
+        completion = LessonCompletion.objects.get(user=self.user)
+        self.assertEqual(completion.completed_at.isoformat(), '2026-01-01T10:00:00+00:00')
+        self.assertEqual(CourseProgress.objects.get(user=self.user, course=self.course).completed_lessons, 1)
+
+    def test_finishing_the_course_issues_a_certificate(self):
+        data = self.sync([{'lesson_id': lesson.id} for lesson in self.lessons])
+        self.assertEqual(data['completed_courses'], [self.course.id])
+        self.assertEqual(len(data['completed_modules']), 1)
+        self.assertEqual(data['certificates'], [Certificate.objects.get(user=self.user).certificate_number])
+        self.assertEqual(NotificationOutbox.objects.filter(user=self.user).count(), 2)
+
+    def test_replay_changes_nothing(self):
+        events = [{'lesson_id': lesson.id} for lesson in self.lessons]
+        self.sync(events)
+        data = self.sync(events)
+        self.assertEqual([result['status'] for result in data['results']], ['already_completed'] * 2)
+        self.assertEqual(data['certificates'], [])
+        self.assertEqual(Certificate.objects.count(), 1)
+        self.assertEqual(NotificationOutbox.objects.count(), 2)
+
+    def test_invalid_payload(self):
+        self.assertEqual(self.client.post(self.url, {'events': []}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(self.url, {'events': 'x'}, format='json').status_code, 400)
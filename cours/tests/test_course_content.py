@@ -0,0 +1,48 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from cours.models import LessonCompletion
+
+from .base import APITestCase, make_course, make_lesson, make_module, make_user
+
+
+class CourseContentTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user('alice')
+        self.course = make_course()
+        self.course.students.add(self.user)
+        self.first = make_module(self.course, order=1)
+        self.second = make_module(self.course, order=2)
+        self.lessons = [make_lesson(self.first, order=2), make_lesson(self.first, order=1),
+                        make_lesson(self.second, order=1)]
+        self.url = f"/api/courses/{self.course.id}/content/"
+        self.login(self.user)
+
+    def test_outline_with_completion_flags(self):
+        LessonCompletion.objects.create(user=self.user, lesson=self.lessons[0])
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry['module']['id'] for entry in response.data], [self.first.id, self.second.id])
+        lessons = response.data[0]['lessons']
+        self.assertEqual([lesson['id'] for lesson in lessons], [self.lessons[1].id, self.lessons[0].id])
+        self.assertEqual([lesson['is_completed'] for lesson in lessons], [False, True])
+
+    def test_outline_is_cached_then_invalidated(self):
+        def reads_lessons(queries):
+            return any('"cours_lesson"."content"' in query['sql'] for query in queries.captured_queries)
+
+        with CaptureQueriesContext(connection) as first:
+            self.client.get(self.url)
+        with CaptureQueriesContext(connection) as cached:
+            self.client.get(self.url)
+        self.assertTrue(reads_lessons(first))
+        self.assertFalse(reads_lessons(cached))
+
+        make_lesson(self.second, order=2, title='Nouvelle leçon')
+        response = self.client.get(self.url)
+        self.assertEqual([lesson['title'] for lesson in response.data[1]['lessons']], ['Leçon 1', 'Nouvelle leçon'])
+
+    def test_not_enrolled_is_forbidden(self):
+        self.login(make_user('bob'))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
@@ -0,0 +1,46 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from cours.models import LessonCompletion
+
+from .base import APITestCase, make_course, make_lesson, make_module, make_user
+
+
+class CourseListStatsTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user('alice')
+        self.course = make_course()
+        module = make_module(self.course)
+        self.lessons = [make_lesson(module, order=i) for i in range(4)]
+        self.course.students.add(self.user)
+        self.login(self.user)
+
+    def results(self):
+        response = self.client.get('/api/courses/')
+        self.assertEqual(response.status_code, 200)
+        return {course['id']: course for course in response.data['results']}
+
+    def test_enrollment_and_progress(self):
+        LessonCompletion.objects.create(user=self.user, lesson=self.lessons[0])
+        other = make_course()
+
+        results = self.results()
+        self.assertTrue(results[self.course.id]['is_enrolled'])
+        self.assertEqual(results[self.course.id]['progress'], 25.0)
+        self.assertFalse(results[other.id]['is_enrolled'])
+        self.assertEqual(results[other.id]['progress'], 0)
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        self.results()
+        with CaptureQueriesContext(connection) as few:
+            self.results()
+        for _ in range(5):
+            course = make_course()
+            make_lesson(make_module(course))
+            course.students.add(self.user)
+        # Facettes du catalogue recalculées une fois après l'ajout des cours
+        self.results()
+        with CaptureQueriesContext(connection) as many:
+            self.results()
+        self.assertEqual(len(few), len(many))
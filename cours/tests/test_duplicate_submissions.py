@@ -0,0 +1,39 @@
+from .base import APITestCase, make_assignment, make_course, make_lesson, make_module, make_submission, make_user
+
+SHA = 'a' * 64
+
+
+class DuplicateSubmissionTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.instructor = make_user('prof')
+        self.assignment = make_assignment(make_lesson(make_module(make_course(instructor=self.instructor))))
+        self.original = make_submission(self.assignment, make_user('alice'), sha256=SHA)
+        self.copy = make_submission(self.assignment, make_user('bob'), sha256=SHA)
+        make_submission(self.assignment, make_user('carol'), sha256='b' * 64)
+        self.url = f"/api/submissions/duplicates/?assignment={self.assignment.id}"
+
+    def test_course_instructor(self):
+        self.login(self.instructor)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        group = response.data[0]
+        self.assertEqual(group['original'], self.original.id)
+        self.assertEqual([item['id'] for item in group['submissions']], [self.original.id, self.copy.id])
+
+    def test_instructor_of_another_course(self):
+        other = make_user('autre-prof')
+        make_course(instructor=other)
+        self.login(other)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [])
+
+    def test_student_is_refused(self):
+        self.login(self.original.student)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_assignment_is_required(self):
+        self.login(self.instructor)
+        self.assertEqual(self.client.get('/api/submissions/duplicates/').status_code, 400)
@@ -0,0 +1,59 @@
+from cours.models import Course, NotificationOutbox
+
+from .base import APITestCase, make_course, make_user
+
+
+class EnrollTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user('alice')
+        self.course = make_course(enrollment_limit=2)
+        self.login(self.user)
+
+    def enroll(self, course=None):
+        return self.client.post(f"/api/courses/{(course or self.course).id}/enroll/")
+
+    def test_enroll_reserves_a_seat_and_notifies(self):
+        response = self.enroll()
+        self.assertEqual(response.status_code, 200)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.seats_taken, 1)
+        self.assertTrue(self.course.students.filter(pk=self.user.pk).exists())
+        self.assertEqual(NotificationOutbox.objects.filter(user=self.user, type='enrollment').count(), 1)
+
+    def test_enroll_twice(self):
+        self.enroll()
+        response = self.enroll()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['detail'], "Vous êtes déjà inscrit à ce cours.")
+        self.assertEqual(Course.objects.get(pk=self.course.pk).seats_taken, 1)
+
+    def test_full_course(self):
+        self.course.students.add(make_user('bob'), make_user('carol'))
+        response = self.enroll()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['detail'], "La limite d'inscription a été atteinte.")
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.seats_taken, 2)
+        self.assertFalse(NotificationOutbox.objects.filter(user=self.user).exists())
+
+    def test_no_limit(self):
+        course = make_course()
+        course.students.add(*[make_user(f"user{i}") for i in range(5)])
+        self.assertEqual(self.enroll(course).status_code, 200)
+        self.assertEqual(Course.objects.get(pk=course.pk).seats_taken, 6)
+
+    def test_unenroll_frees_the_seat(self):
+        self.enroll()
+        response = self.client.post(f"/api/courses/{self.course.id}/unenroll/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Course.objects.get(pk=self.course.pk).seats_taken, 0)
+        self.assertEqual(self.client.post(f"/api/courses/{self.course.id}/unenroll/").status_code, 400)
+
+    def test_direct_changes_to_students_keep_the_counter(self):
+        bob, carol = make_user('bob'), make_user('carol')
+        self.course.students.add(bob, carol)
+        self.course.students.remove(bob)
+        self.assertEqual(Course.objects.get(pk=self.course.pk).seats_taken, 1)
+        carol.enrolled_courses.clear()
+        self.assertEqual(Course.objects.get(pk=self.course.pk).seats_taken, 0)
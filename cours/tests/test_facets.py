@@ -0,0 +1,54 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from cours.facets import compute_course_facets, get_course_facets
+from cours.models import Category, Course
+
+from .base import APITestCase, make_course, make_user
+
+
+def counts(facet):
+    return {entry['value']: entry['count'] for entry in facet}
+
+
+class CourseFacetTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.web = Category.objects.create(name='Web', description='', slug='web', icon='w.png')
+        self.data = Category.objects.create(name='Data', description='', slug='data', icon='d.png')
+        make_course(category=self.web, price=Decimal('0'), is_featured=True)
+        make_course(category=self.web, price=Decimal('49.90'), level='advanced')
+        make_course(category=self.data, price=Decimal('10'))
+        make_course(price=Decimal('0'))
+
+    def test_counts_per_dimension(self):
+        facets = compute_course_facets(Course.objects.all())
+        self.assertEqual([(c['name'], c['count']) for c in facets['category']], [('Web', 2), ('Data', 1)])
+        self.assertEqual(counts(facets['level']), {'advanced': 1, 'beginner': 3})
+        self.assertEqual(counts(facets['price']), {'free': 2, 'paid': 2})
+        self.assertEqual(counts(facets['is_featured']), {True: 1, False: 3})
+
+    def test_single_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            compute_course_facets(Course.objects.filter(price__gt=0))
+        self.assertEqual(len(queries), 1)
+
+    def test_cached_catalog_is_invalidated_on_write(self):
+        get_course_facets()
+        with CaptureQueriesContext(connection) as queries:
+            get_course_facets()
+        self.assertFalse(any('"cours_course"' in query['sql'] for query in queries.captured_queries))
+
+        make_course(category=self.data)
+        self.assertEqual(get_course_facets()['category'][0]['count'], 2)
+        self.web.name = 'Développement web'
+        self.web.save()
+        self.assertIn('Développement web', [c['name'] for c in get_course_facets()['category']])
+
+    def test_category_list_course_count(self):
+        self.login(make_user('alice'))
+        response = self.client.get('/api/categories/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({c['slug']: c['course_count'] for c in response.data}, {'web': 2, 'data': 1})
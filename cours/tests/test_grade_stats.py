@@ -0,0 +1,85 @@
+import numpy as np
+
+from cours.grade_stats import HISTOGRAM_BINS, PERCENTILES
+from cours.models import Submission
+
+from .base import APITestCase, make_assignment, make_course, make_lesson, make_module, make_submission, make_user
+
+GRADES = [3, 7, 9, 11, 11, 13, 17, 19, 20]
+
+
+class GradeStatsTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.instructor = make_user('prof', is_staff=True)
+        self.course = make_course(instructor=self.instructor)
+        module = make_module(self.course)
+        self.assignment = make_assignment(make_lesson(module, order=1), max_score=20)
+        self.other = make_assignment(make_lesson(module, order=2), max_score=10)
+        self.students = [make_user(f"etudiant{index}") for index in range(len(GRADES))]
+        for student, grade in zip(self.students, GRADES):
+            # Seule la dernière soumission notée compte
+            make_submission(self.assignment, student, grade=0)
+            make_submission(self.assignment, student, grade=grade)
+        make_submission(self.assignment, make_user('en-attente'))
+        make_submission(self.other, self.students[0], grade=5)
+        self.login(self.instructor)
+
+    def assert_matches_numpy(self, stats, values):
+        values = np.array(values, dtype=np.float64)
+        self.assertEqual(stats['count'], len(values))
+        self.assertAlmostEqual(stats['mean'], values.mean(), places=4)
+        self.assertAlmostEqual(stats['std'], values.std(), places=4)
+        self.assertAlmostEqual(stats['min'], values.min(), places=4)
+        self.assertAlmostEqual(stats['max'], values.max(), places=4)
+        self.assertAlmostEqual(stats['median'], np.median(values), places=4)
+        for p, expected in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+            self.assertAlmostEqual(stats['percentiles'][f"p{p}"], expected, places=4)
+        histogram, _ = np.histogram(values, bins=HISTOGRAM_BINS, range=(0, 1))
+        self.assertEqual(stats['histogram'], histogram.tolist())
+
+    def test_assignment_stats(self):
+        response = self.client.get(f"/api/assignments/{self.assignment.id}/grade_stats/")
+        self.assertEqual(response.status_code, 200)
+        stats = response.data
+        self.assertEqual(stats['median'], 0.55)
+        self.assertEqual(stats['percentiles']['p25'], 0.45)
+        self.assert_matches_numpy(stats, [grade / 20 for grade in GRADES])
+
+    def test_course_stats(self):
+        response = self.client.get(f"/api/courses/{self.course.id}/grade_stats/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['course']['assignments'], 2)
+        self.assert_matches_numpy(response.data['course'], [grade / 20 for grade in GRADES] + [0.5])
+        by_assignment = {stats['assignment']: stats for stats in response.data['assignments']}
+        self.assert_matches_numpy(by_assignment[self.other.id], [0.5])
+
+    def test_assignment_without_grades(self):
+        empty = make_assignment(self.assignment.lesson, max_score=20)
+        stats = self.client.get(f"/api/assignments/{empty.id}/grade_stats/").data
+        self.assertEqual(stats['count'], 0)
+        self.assertIsNone(stats['median'])
+        self.assertEqual(stats['histogram'], [0] * HISTOGRAM_BINS)
+
+    def test_bulk_grade_invalidates_stats(self):
+        url = f"/api/courses/{self.course.id}/grade_stats/"
+        assignment_url = f"/api/assignments/{self.assignment.id}/grade_stats/"
+        # Statistiques mises en cache avant la notation
+        self.assertEqual(self.client.get(url).data['course']['count'], len(GRADES) + 1)
+        self.assertEqual(self.client.get(assignment_url).data['count'], len(GRADES))
+        pending = Submission.objects.get(student__username='en-attente')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/submissions/bulk_grade/', {
+                'grades': [{'submission_id': pending.id, 'grade': 20}],
+            }, format='json')
+        self.assertEqual(response.data['graded'], 1)
+
+        stats = self.client.get(url).data
+        self.assertEqual(stats['course']['count'], len(GRADES) + 2)
+        by_assignment = {item['assignment']: item for item in stats['assignments']}
+        self.assert_matches_numpy(by_assignment[self.assignment.id], [grade / 20 for grade in GRADES] + [1.0])
+        self.assertEqual(self.client.get(assignment_url).data['count'], len(GRADES) + 1)
+
+    def test_only_the_instructor(self):
+        self.login(self.students[0])
+        self.assertEqual(self.client.get(f"/api/courses/{self.course.id}/grade_stats/").status_code, 403)
@@ -0,0 +1,61 @@
+import csv
+import io
+import zipfile
+
+from cours.gradebook import gradebook_rows
+
+from .base import (APITestCase, make_assignment, make_course, make_lesson, make_module, make_submission,
+                   make_user)
+
+
+class GradebookTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.instructor = make_user('prof')
+        self.course = make_course(instructor=self.instructor)
+        module = make_module(self.course)
+        self.first = make_assignment(make_lesson(module, order=1), title='TP 1', max_score=10)
+        self.second = make_assignment(make_lesson(module, order=2), title='TP 2', max_score=20)
+        self.alice, self.bob, self.carol = make_user('alice'), make_user('bob'), make_user('carol')
+        self.course.students.add(self.alice, self.bob)
+        make_submission(self.first, self.alice, grade=4)
+        make_submission(self.first, self.alice, grade=8)
+        make_submission(self.second, self.alice)
+        # Étudiante désinscrite depuis : sa soumission reste au carnet
+        make_submission(self.second, self.carol, grade=15)
+        self.url = f"/api/courses/{self.course.id}/gradebook/"
+        self.login(self.instructor)
+
+    def test_rows(self):
+        rows = list(gradebook_rows(self.course, chunk_size=1))
+        self.assertEqual(rows[0], ['student_id', 'username', 'email', 'TP 1 (/10)', 'TP 2 (/20)', 'total (/30)'])
+        self.assertEqual([row[1:] for row in rows[1:]], [
+            ['alice', 'alice@example.com', 8, None, 8],
+            ['bob', 'bob@example.com', None, None, 0],
+            ['carol', 'carol@example.com', None, 15, 15],
+        ])
+
+    def test_csv_export(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="notes-cours-{self.course.id}.csv"')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1][3:], ['8', '', '8'])
+
+    def test_xlsx_export(self):
+        response = self.client.get(self.url, {'output': 'xlsx'})
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(archive.testzip())
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(sheet.count('<row>'), 4)
+        self.assertIn('<t xml:space="preserve">TP 1 (/10)</t>', sheet)
+
+    def test_invalid_output(self):
+        self.assertEqual(self.client.get(self.url, {'output': 'pdf'}).status_code, 400)
+
+    def test_only_the_instructor(self):
+        self.login(self.alice)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
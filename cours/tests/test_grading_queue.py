@@ -0,0 +1,111 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.utils import timezone
+
+from cours import grading
+from cours.models import Submission
+
+from .base import APITestCase, make_assignment, make_course, make_lesson, make_module, make_submission, make_user
+
+
+class GradingQueueTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.instructor = make_user('prof')
+        self.other = make_user('assistant', is_staff=True)
+        course = make_course(instructor=self.instructor)
+        module = make_module(course)
+        now = timezone.now()
+        self.later = make_assignment(make_lesson(module, order=1), title='Tard', due_date=now + timedelta(days=9))
+        self.soon = make_assignment(make_lesson(module, order=2), title='Tôt', due_date=now + timedelta(days=2))
+        self.submissions = []
+        for index in range(3):
+            for assignment in (self.later, self.soon):
+                submission = make_submission(assignment, make_user(f"s{assignment.id}-{index}"))
+                # Rendus dans l'ordre inverse de création
+                Submission.objects.filter(id=submission.id).update(submitted_at=now - timedelta(hours=index))
+                self.submissions.append(submission)
+        make_submission(self.soon, make_user('note'), grade=12)
+        self.login(self.instructor)
+
+    def queue(self, **params):
+        response = self.client.get('/api/submissions/pending_grading/', params)
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data['results']]
+
+    def claim(self, count, **data):
+        response = self.client.post('/api/submissions/claim/', {'count': count, **data}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data]
+
+    def test_queue_order(self):
+        expected = list(
+            Submission.objects.filter(grade__isnull=True)
+            .order_by('assignment__due_date', 'submitted_at', 'id').values_list('id', flat=True)
+        )
+        self.assertEqual(self.queue(), expected)
+        # Échéance la plus proche d'abord, puis le rendu le plus ancien
+        first = Submission.objects.get(id=expected[0])
+        self.assertEqual(first.assignment, self.soon)
+        self.assertEqual(first.student.username, f"s{self.soon.id}-2")
+
+    def test_claims_are_exclusive(self):
+        mine = self.claim(4)
+        self.login(self.other)
+        theirs = self.claim(4)
+        self.assertEqual(len(mine), 4)
+        self.assertEqual(len(theirs), 2)
+        self.assertFalse(set(mine) & set(theirs))
+        self.assertEqual(self.claim(4), theirs)
+
+        self.login(self.instructor)
+        self.assertEqual(self.queue(claimed='mine'), mine)
+        self.assertEqual(self.queue(claimed='available'), mine)
+
+    def test_release(self):
+        mine = self.claim(3)
+        response = self.client.post('/api/submissions/release/', {'submissions': mine[:1]}, format='json')
+        self.assertEqual(response.data['released'], 1)
+        self.login(self.other)
+        self.assertEqual(self.claim(1), mine[:1])
+        self.login(self.instructor)
+        response = self.client.post('/api/submissions/release/', {}, format='json')
+        self.assertEqual(response.data['released'], 2)
+        self.assertEqual(self.queue(claimed='mine'), [])
+
+    def test_claim_expires(self):
+        mine = self.claim(6)
+        self.login(self.other)
+        self.assertEqual(self.claim(6), [])
+        later = timezone.now() + timedelta(seconds=grading.CLAIM_TTL + 1)
+        with mock.patch('cours.grading.timezone.now', return_value=later):
+            self.assertEqual(sorted(self.claim(6)), sorted(mine))
+
+    def test_claim_filtered_on_assignment(self):
+        claimed = self.claim(10, assignment=self.later.id)
+        self.assertEqual(
+            set(claimed), set(Submission.objects.filter(assignment=self.later).values_list('id', flat=True))
+        )
+
+    def test_claim_count_bounds(self):
+        for count in (0, grading.CLAIM_MAX + 1, 'dix'):
+            response = self.client.post('/api/submissions/claim/', {'count': count}, format='json')
+            self.assertEqual(response.status_code, 400)
+
+    def test_invalid_claimed_filter(self):
+        response = self.client.get('/api/submissions/pending_grading/', {'claimed': 'all'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_pending_counts(self):
+        self.claim(2)
+        response = self.client.get('/api/submissions/pending_counts/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row['assignment_id'], row['pending'], row['claimed']) for row in response.data],
+            [(self.soon.id, 3, 2), (self.later.id, 3, 0)],
+        )
+
+    def test_queue_limited_to_taught_courses(self):
+        self.login(make_user('intrus'))
+        self.assertEqual(self.queue(), [])
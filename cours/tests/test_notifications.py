@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from cours.models import Notification, NotificationOutbox
+from cours.notifications import (MAX_ATTEMPTS, BaseNotificationBackend, enqueue_notification,
+                                 process_batch)
+
+from .base import make_user
+
+
+class RecordingBackend(BaseNotificationBackend):
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.sent = []
+
+    def send(self, notification, idempotency_key):
+        if self.fail:
+            raise RuntimeError("indisponible")
+        self.sent.append(idempotency_key)
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.user = make_user('alice')
+
+    def enqueue(self, key='evenement:1'):
+        enqueue_notification(self.user, type='enrollment', title='Titre', message='Message', idempotency_key=key)
+
+    def make_due(self):
+        NotificationOutbox.objects.update(available_at=timezone.now() - timedelta(seconds=1))
+
+    def test_same_key_is_enqueued_once(self):
+        self.enqueue()
+        self.enqueue()
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+
+    def test_batch_creates_and_delivers(self):
+        self.enqueue('a')
+        self.enqueue('b')
+        backend = RecordingBackend()
+        stats = process_batch(backends=[backend])
+        self.assertEqual((stats['processed'], stats['delivered']), (2, 2))
+        self.assertEqual(sorted(backend.sent), ['a', 'b'])
+        self.assertEqual(Notification.objects.filter(user=self.user).count(), 2)
+        self.assertFalse(NotificationOutbox.objects.exclude(status=NotificationOutbox.DELIVERED).exists())
+        self.assertEqual(process_batch(backends=[backend])['processed'], 0)
+
+    def test_failure_is_retried_without_duplicating_the_notification(self):
+        self.enqueue()
+        stats = process_batch(backends=[RecordingBackend(fail=True)])
+        self.assertEqual(stats['retried'], 1)
+        entry = NotificationOutbox.objects.get()
+        self.assertEqual(entry.status, NotificationOutbox.PENDING)
+        self.assertGreater(entry.available_at, timezone.now())
+        self.assertIn('indisponible', entry.last_error)
+        # Pas encore dû : le lot suivant est vide
+        self.assertEqual(process_batch(backends=[RecordingBackend()])['processed'], 0)
+
+        self.make_due()
+        backend = RecordingBackend()
+        self.assertEqual(process_batch(backends=[backend])['delivered'], 1)
+        self.assertEqual(backend.sent, ['evenement:1'])
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_gives_up_after_max_attempts(self):
+        self.enqueue()
+        for _ in range(MAX_ATTEMPTS):
+            self.make_due()
+            stats = process_batch(backends=[RecordingBackend(fail=True)])
+        self.assertEqual(stats['failed'], 1)
+        self.assertEqual(NotificationOutbox.objects.get().status, NotificationOutbox.FAILED)
@@ -0,0 +1,66 @@
+from urllib.parse import parse_qs, urlparse
+
+from django.utils import timezone
+
+from cours.models import Comment
+
+from .base import (APITestCase, make_assignment, make_course, make_lesson, make_module,
+                   make_submission, make_user)
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user('alice')
+        self.lesson = make_lesson(make_module(make_course()))
+        self.login(self.user)
+
+    def walk(self, url):
+        """Parcourt toutes les pages en suivant 'next' ; retourne les identifiants lus."""
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_comments_pages_cover_every_row_once(self):
+        comments = [Comment.objects.create(user=self.user, lesson=self.lesson, content=str(i)) for i in range(7)]
+        # Dates identiques pour une partie des lignes : l'identifiant départage
+        Comment.objects.filter(pk__in=[c.pk for c in comments[2:5]]).update(created_at=timezone.now())
+        expected = list(Comment.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(self.walk("/api/comments/?page_size=2"), expected)
+
+    def test_next_link_is_null_on_last_page(self):
+        Comment.objects.create(user=self.user, lesson=self.lesson, content='seul')
+        response = self.client.get("/api/comments/?page_size=5")
+        self.assertIsNone(response.data['next'])
+        self.assertNotIn('count', response.data)
+
+    def test_exact_count(self):
+        for i in range(3):
+            Comment.objects.create(user=self.user, lesson=self.lesson, content=str(i))
+        response = self.client.get("/api/comments/?page_size=1&count=exact")
+        self.assertEqual(response.data['count'], 3)
+        cursor = parse_qs(urlparse(response.data['next']).query)['cursor'][0]
+        self.assertTrue(cursor)
+
+    def test_invalid_cursor_is_not_found(self):
+        for cursor in ('pas-un-curseur', 'WzFd', 'WyJ4IiwgMV0'):
+            response = self.client.get(f"/api/comments/?cursor={cursor}")
+            self.assertEqual(response.status_code, 404, cursor)
+
+    def test_my_submissions_only_lists_own_rows(self):
+        assignment = make_assignment(self.lesson)
+        mine = [make_submission(assignment, self.user).id for _ in range(3)]
+        make_submission(assignment, make_user('bob'))
+        self.assertEqual(self.walk("/api/submissions/my_submissions/?page_size=2"), mine[::-1])
+
+    def test_my_courses(self):
+        courses = [make_course() for _ in range(3)]
+        for course in courses:
+            course.students.add(self.user)
+        make_course()
+        self.assertEqual(self.walk("/api/courses/my_courses/?page_size=2"),
+                         [course.id for course in reversed(courses)])
@@ -0,0 +1,74 @@
+from cours.models import CourseProgress, LessonCompletion, ModuleProgress
+from cours.progress import rebuild_progress
+
+from .base import APITestCase, make_course, make_lesson, make_module, make_user
+
+
+class ProgressMaintenanceTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user('alice')
+        self.course = make_course()
+        self.first = make_module(self.course, order=1)
+        self.second = make_module(self.course, order=2)
+        self.lessons = [make_lesson(self.first, order=i) for i in range(3)]
+        self.other_lesson = make_lesson(self.second, order=1)
+
+    def progress(self, model, **lookup):
+        return model.objects.filter(user=self.user, **lookup).values_list('completed_lessons', 'total_lessons').get()
+
+    def test_completion_increments_module_and_course(self):
+        LessonCompletion.objects.create(user=self.user, lesson=self.lessons[0])
+        LessonCompletion.objects.create(user=self.user, lesson=self.lessons[1])
+        self.assertEqual(self.progress(ModuleProgress, module=self.first), (2, 3))
+        self.assertEqual(self.progress(CourseProgress, course=self.course), (2, 4))
+
+    def test_new_lesson_increases_totals(self):
+        LessonCompletion.objects.create(user=self.user, lesson=self.lessons[0])
+        make_lesson(self.first, order=9)
+        self.assertEqual(self.progress(ModuleProgress, module=self.first), (1, 4))
+        self.assertEqual(self.progress(CourseProgress, course=self.course), (1, 5))
+
+    def test_completion_deleted(self):
+        completion = LessonCompletion.objects.create(user=self.user, lesson=self.lessons[0])
+        completion.delete()
+        self.assertEqual(self.progress(ModuleProgress, module=self.first), (0, 3))
+        self.assertEqual(self.progress(CourseProgress, course=self.course), (0, 4))
+
+    def test_moved_lesson_creates_missing_module_progress(self):
+        LessonCompletion.objects.create(user=self.user, lesson=self.lessons[0])
+        self.assertFalse(ModuleProgress.objects.filter(user=self.user, module=self.second).exists())
+
+        lesson = self.lessons[0]
+        lesson.module = self.second
+        lesson.save()
+
+        self.assertEqual(self.progress(ModuleProgress, module=self.first), (0, 2))
+        self.assertEqual(self.progress(ModuleProgress, module=self.second), (1, 2))
+        self.assertEqual(self.progress(CourseProgress, course=self.course), (1, 4))
+
+    def test_moved_lesson_to_other_course_creates_course_progress(self):
+        LessonCompletion.objects.create(user=self.user, lesson=self.lessons[0])
+        other_course = make_course()
+        target = make_module(other_course)
+        make_lesson(target, order=1)
+
+        lesson = self.lessons[0]
+        lesson.module = target
+        lesson.save()
+
+        self.assertEqual(self.progress(CourseProgress, course=self.course), (0, 3))
+        self.assertEqual(self.progress(CourseProgress, course=other_course), (1, 2))
+        self.assertEqual(self.progress(ModuleProgress, module=target), (1, 2))
+
+    def test_incremental_counters_match_rebuild(self):
+        LessonCompletion.objects.create(user=self.user, lesson=self.lessons[0])
+        LessonCompletion.objects.create(user=self.user, lesson=self.other_lesson)
+        lesson = self.lessons[1]
+        lesson.module = self.second
+        lesson.save()
+        expected = sorted(ModuleProgress.objects.values_list('module_id', 'completed_lessons', 'total_lessons'))
+        rebuild_progress()
+        self.assertEqual(
+            sorted(ModuleProgress.objects.values_list('module_id', 'completed_lessons', 'total_lessons')), expected
+        )
@@ -0,0 +1,45 @@
+from cours.models import Category
+
+from .base import APITestCase, make_course, make_user
+
+
+class CourseSearchTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.category = Category.objects.create(name='Programmation', description='', slug='prog', icon='c.png')
+        self.learn = make_course(what_you_learn=['Python avancé', 'Tests'])
+        self.requires = make_course(requirements=['Bases de Python'])
+        self.other = make_course(what_you_learn=['Aquarelle'], category=self.category)
+        self.login(make_user('alice'))
+
+    def search(self, query):
+        response = self.client.get('/api/courses/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [course['id'] for course in response.data['results']]
+
+    def test_ranked_by_field_weight(self):
+        self.assertEqual(self.search('python'), [self.learn.id, self.requires.id])
+
+    def test_prefix_and_every_term(self):
+        self.assertEqual(self.search('pyth'), [self.learn.id, self.requires.id])
+        self.assertEqual(self.search('python tests'), [self.learn.id])
+        self.assertEqual(self.search('"; DROP'), [])
+
+    def test_category_rename_is_reindexed(self):
+        self.assertEqual(self.search('programmation'), [self.other.id])
+        self.category.name = 'Dessin'
+        self.category.save()
+        self.assertEqual(self.search('programmation'), [])
+        self.assertEqual(self.search('dessin'), [self.other.id])
+
+    def test_updated_and_deleted_courses(self):
+        self.requires.requirements = []
+        self.requires.save()
+        self.assertEqual(self.search('python'), [self.learn.id])
+        self.learn.delete()
+        self.assertEqual(self.search('python'), [])
+
+    def test_facets_follow_the_search(self):
+        response = self.client.get('/api/courses/', {'search': 'aquarelle'})
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(sum(entry['count'] for entry in response.data['facets']['level']), 1)
@@ -0,0 +1,67 @@
+import asyncio
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from cours import streaming
+from cours.models import Notification
+
+from .base import make_user
+
+
+class BrokerSelectionTests(TestCase):
+    def test_default_follows_the_database(self):
+        with mock.patch.object(streaming.connections['default'], 'vendor', 'postgresql'):
+            self.assertEqual(streaming.default_broker_path(), 'cours.streaming.PostgresBroker')
+        with mock.patch.object(streaming.connections['default'], 'vendor', 'sqlite'):
+            self.assertEqual(streaming.default_broker_path(), 'cours.streaming.InProcessBroker')
+
+    def test_explicit_setting_wins(self):
+        with self.settings(NOTIFICATION_BROKER='cours.streaming.InProcessBroker'), \
+                mock.patch.object(streaming, '_broker', None), \
+                mock.patch.object(streaming, 'default_broker_path') as default:
+            self.assertIsInstance(streaming.get_broker(), streaming.InProcessBroker)
+            default.assert_not_called()
+
+
+class NotificationStreamTests(TestCase):
+    url = '/api/notifications/stream/'
+
+    def setUp(self):
+        self.user = make_user('alice')
+        self.token = str(AccessToken.for_user(self.user))
+
+    def test_refused_under_wsgi(self):
+        with self.assertLogs('cours.views', 'ERROR'):
+            response = self.client.get(self.url, {'token': self.token}, secure=True)
+        self.assertEqual(response.status_code, 501)
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get(self.url, {'token': 'invalide'}, secure=True)
+        self.assertEqual(response.status_code, 401)
+
+    async def test_backlog_then_live_events(self):
+        missed = await Notification.objects.acreate(user=self.user, type='system', title='Manquée', message='')
+        broker = streaming.InProcessBroker()
+        with mock.patch.object(streaming, '_broker', broker), \
+                mock.patch('cours.streaming.connections.close_all'):
+            response = await self.async_client.get(
+                self.url, {'token': self.token}, headers={'Last-Event-ID': str(missed.id - 1)}, secure=True,
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            events = aiter(response.streaming_content)
+            try:
+                self.assertTrue((await anext(events)).startswith(b'retry:'))
+                self.assertIn(f"id: {missed.id}\n".encode(), await anext(events))
+
+                pending = asyncio.ensure_future(anext(events))
+                await asyncio.sleep(0)
+                broker.publish(self.user.pk, {'id': missed.id, 'title': 'Doublon'})
+                broker.publish(self.user.pk, {'id': missed.id + 1, 'title': 'En direct'})
+                event = await asyncio.wait_for(pending, 5)
+                self.assertIn(f"id: {missed.id + 1}\n".encode(), event)
+                self.assertIn('En direct'.encode(), event)
+            finally:
+                await events.aclose()
@@ -0,0 +1,67 @@
+import os
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from cours.models import Submission, SubmissionBlob
+
+from .base import APITestCase, make_assignment, make_course, make_lesson, make_module, make_user
+
+CONTENT = b'%PDF-1.4 rendu'
+
+
+class SubmissionFileTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user('alice')
+        course = make_course()
+        course.students.add(self.user)
+        self.assignment = make_assignment(make_lesson(make_module(course)))
+        self.login(self.user)
+
+    def submit(self, name, content=CONTENT):
+        response = self.client.post('/api/submissions/', {
+            'assignment': self.assignment.id,
+            'student': self.user.id,
+            'file': SimpleUploadedFile(name, content, content_type='application/pdf'),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data
+
+    def download(self, submission_id):
+        response = self.client.get(f"/api/submissions/{submission_id}/download/")
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def test_original_name_is_kept_and_sent_on_download(self):
+        data = self.submit('Rapport final.pdf')
+        self.assertEqual(data['original_filename'], 'Rapport final.pdf')
+        submission = Submission.objects.get(pk=data['id'])
+        self.assertTrue(submission.file.name.startswith('submissions/blobs/'))
+
+        response, body = self.download(data['id'])
+        self.assertEqual(body, CONTENT)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="Rapport final.pdf"')
+
+    def test_shared_content_keeps_each_name(self):
+        first = self.submit('alice.pdf')
+        second = self.submit('copie.pdf')
+        self.assertEqual(SubmissionBlob.objects.get().ref_count, 2)
+        self.assertIn('alice.pdf', self.download(first['id'])[0]['Content-Disposition'])
+        self.assertIn('copie.pdf', self.download(second['id'])[0]['Content-Disposition'])
+
+    def test_chunked_upload_keeps_the_name(self):
+        with mock.patch('cours.uploads.UPLOAD_DIR', os.path.join(settings.MEDIA_ROOT, 'uploads-partial')):
+            session = self.client.post('/api/uploads/', {
+                'assignment': self.assignment.id, 'filename': 'envoi.pdf', 'size': len(CONTENT),
+            }, format='json').data
+            self.client.patch(f"/api/uploads/{session['id']}/", data=CONTENT,
+                              content_type='application/offset+octet-stream', headers={'Upload-Offset': '0'})
+        submission = Submission.objects.get(student=self.user)
+        self.assertEqual(submission.original_filename, 'envoi.pdf')
+
+    def test_other_students_cannot_download(self):
+        data = self.submit('rapport.pdf')
+        self.login(make_user('eve'))
+        self.assertEqual(self.client.get(f"/api/submissions/{data['id']}/download/").status_code, 404)
@@ -0,0 +1,39 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from cours.models import Notification
+from cours.notifications import (enqueue_notification, get_unread_count, mark_read, process_batch,
+                                 unread_cache_key)
+
+from .base import make_user
+
+
+class UnreadCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('alice')
+
+    def test_worker_drops_the_cached_counter(self):
+        self.assertEqual(get_unread_count(self.user), 0)
+        enqueue_notification(self.user, type='enrollment', title='Titre', message='Message')
+        with self.captureOnCommitCallbacks(execute=True):
+            process_batch(backends=[])
+        self.assertIsNone(cache.get(unread_cache_key(self.user.pk)))
+        self.assertEqual(get_unread_count(self.user), 1)
+
+    def test_stale_counter_is_not_incremented(self):
+        # Compteur périmé (écrit par un autre processus) : il ne doit pas servir de base
+        cache.set(unread_cache_key(self.user.pk), 7)
+        enqueue_notification(self.user, type='enrollment', title='Titre', message='Message')
+        with self.captureOnCommitCallbacks(execute=True):
+            process_batch(backends=[])
+        self.assertEqual(get_unread_count(self.user), 1)
+
+    def test_mark_read(self):
+        Notification.objects.bulk_create([
+            Notification(user=self.user, type='enrollment', title='Titre', message=str(i)) for i in range(3)
+        ])
+        self.assertEqual(get_unread_count(self.user), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(mark_read(self.user), 3)
+        self.assertEqual(get_unread_count(self.user), 0)
@@ -0,0 +1,90 @@
+import base64
+import hashlib
+import os
+from unittest import mock
+
+from django.conf import settings
+
+from cours.models import Submission, UploadSession
+
+from .base import APITestCase, make_assignment, make_course, make_lesson, make_module, make_user
+
+CONTENT = b'%PDF-1.4 ' + os.urandom(3000)
+
+
+def checksum(data):
+    return 'sha256 ' + base64.b64encode(hashlib.sha256(data).digest()).decode()
+
+
+class ChunkedUploadTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('cours.uploads.UPLOAD_DIR', os.path.join(settings.MEDIA_ROOT, 'uploads-partial'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = make_user('alice')
+        course = make_course()
+        course.students.add(self.user)
+        self.assignment = make_assignment(make_lesson(make_module(course)))
+        self.login(self.user)
+
+    def open(self, **overrides):
+        data = {'assignment': self.assignment.id, 'filename': 'rapport.pdf', 'size': len(CONTENT),
+                'sha256': hashlib.sha256(CONTENT).hexdigest()}
+        data.update(overrides)
+        return self.client.post('/api/uploads/', data, format='json')
+
+    def send(self, session_id, offset, chunk, **headers):
+        return self.client.patch(f"/api/uploads/{session_id}/", data=chunk,
+                                 content_type='application/offset+octet-stream',
+                                 headers={'Upload-Offset': str(offset), **headers})
+
+    def test_upload_in_chunks_creates_the_submission(self):
+        session_id = self.open().data['id']
+        response = self.send(session_id, 0, CONTENT[:1000], **{'Upload-Checksum': checksum(CONTENT[:1000])})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Upload-Offset'], '1000')
+        self.assertEqual(self.client.get(f"/api/uploads/{session_id}/")['Upload-Offset'], '1000')
+
+        response = self.send(session_id, 1000, CONTENT[1000:])
+        self.assertEqual(response.status_code, 200)
+        submission = Submission.objects.get(student=self.user)
+        self.assertEqual(UploadSession.objects.get(pk=session_id).submission, submission)
+        with submission.file.open('rb') as stored:
+            self.assertEqual(stored.read(), CONTENT)
+
+    def test_wrong_offset_is_a_conflict(self):
+        session_id = self.open().data['id']
+        response = self.send(session_id, 500, CONTENT[500:1000])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Upload-Offset'], '0')
+
+    def test_chunk_checksum_mismatch_is_discarded(self):
+        session_id = self.open().data['id']
+        response = self.send(session_id, 0, CONTENT[:1000], **{'Upload-Checksum': checksum(b'autre')})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['offset'], 0)
+        self.assertEqual(os.path.getsize(os.path.join(settings.MEDIA_ROOT, 'uploads-partial', f"{session_id}.part")), 0)
+        self.assertEqual(self.send(session_id, 0, CONTENT[:1000]).status_code, 200)
+
+    def test_invalid_checksum_header(self):
+        session_id = self.open().data['id']
+        self.assertEqual(self.send(session_id, 0, CONTENT[:10], **{'Upload-Checksum': 'md5 abc'}).status_code, 400)
+        self.assertEqual(self.send(session_id, 0, CONTENT[:10], **{'Upload-Checksum': 'sha256 !!'}).status_code, 400)
+
+    def test_file_checksum_mismatch_restarts(self):
+        session_id = self.open(sha256='0' * 64).data['id']
+        response = self.send(session_id, 0, CONTENT)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(UploadSession.objects.get(pk=session_id).offset, 0)
+        self.assertFalse(Submission.objects.exists())
+
+    def test_chunk_beyond_declared_size(self):
+        session_id = self.open(size=100, sha256='').data['id']
+        self.assertEqual(self.send(session_id, 0, CONTENT[:101]).status_code, 413)
+
+    def test_open_checks(self):
+        self.assertEqual(self.open(filename='script.exe').status_code, 400)
+        self.assertEqual(self.open(size=50 * 1024 * 1024).status_code, 413)
+        self.login(make_user('eve'))
+        self.assertEqual(self.open().status_code, 403)
@@ -0,0 +1,92 @@
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+
+from cours import video
+from cours.models import LessonCompletion, VideoProgress
+
+from .base import APITestCase, make_course, make_lesson, make_module, make_user
+
+
+class HeartbeatTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        # Tampon sans thread d'écriture : le test le vide lui-même
+        self.buffer = video.HeartbeatBuffer(flush_interval=0)
+        for target in ('cours.video.heartbeat_buffer', 'cours.views.heartbeat_buffer'):
+            patcher = mock.patch(target, self.buffer)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.user = make_user('alice')
+        self.course = make_course()
+        self.course.students.add(self.user)
+        self.lesson = make_lesson(make_module(self.course))
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+
+    def beat(self, position, duration=100, lesson=None):
+        return self.client.post(f"/api/lessons/{(lesson or self.lesson).id}/heartbeat/",
+                                {'position': position, 'duration': duration}, format='json')
+
+    def test_heartbeat_runs_no_query(self):
+        # Le premier battement vérifie la leçon et l'inscription, en une requête
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.beat(5).status_code, 204)
+        self.assertEqual(len(queries), 1)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.beat(12.5)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(self.buffer.get(self.user.id, self.lesson.id)['position'], 12.5)
+
+    def test_unknown_lesson(self):
+        response = self.client.post("/api/lessons/999999/heartbeat/", {'position': 1, 'duration': 10}, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(len(self.buffer), 0)
+
+    def test_not_enrolled_is_refused(self):
+        other = make_lesson(make_module(make_course()))
+        self.assertEqual(self.beat(10, lesson=other).status_code, 403)
+        self.assertEqual(len(self.buffer), 0)
+
+    def test_invalid_position(self):
+        self.assertEqual(self.beat('x').status_code, 400)
+        self.assertEqual(self.beat(120).status_code, 400)
+
+    def test_flush_keeps_the_furthest_point(self):
+        self.beat(60)
+        self.beat(20)
+        self.assertEqual(video.flush_heartbeats(self.buffer)['written'], 1)
+        progress = VideoProgress.objects.get(user=self.user, lesson=self.lesson)
+        self.assertEqual((progress.position, progress.max_position), (20, 60))
+
+        self.beat(10)
+        video.flush_heartbeats(self.buffer)
+        progress.refresh_from_db()
+        self.assertEqual((progress.position, progress.max_position), (10, 60))
+        self.assertEqual(len(self.buffer), 0)
+
+    def test_unenrolled_before_flush_is_ignored(self):
+        self.beat(10)
+        self.course.students.remove(self.user)
+        self.assertEqual(video.flush_heartbeats(self.buffer), {'buffered': 1, 'written': 0, 'completed': 0})
+
+    def test_threshold_completes_the_lesson(self):
+        self.beat(95)
+        self.assertEqual(video.flush_heartbeats(self.buffer)['completed'], 1)
+        self.assertTrue(LessonCompletion.objects.filter(user=self.user, lesson=self.lesson).exists())
+
+    def test_resume_position(self):
+        self.beat(30)
+        url = f"/api/lessons/{self.lesson.id}/video-progress/"
+        self.assertEqual(self.client.get(url).data, {'position': 30, 'duration': 100})
+        video.flush_heartbeats(self.buffer)
+        self.assertEqual(self.client.get(url).data, {'position': 30, 'duration': 100})
+
+    def test_failed_flush_is_restored(self):
+        self.beat(40)
+        with mock.patch.object(video, '_write_batch', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                video.flush_heartbeats(self.buffer)
+        self.assertEqual(self.buffer.get(self.user.id, self.lesson.id)['max_position'], 40)
@@ -0,0 +1,97 @@
+import os
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from cours.video import parse_ranges
+
+from .base import APITestCase, make_course, make_lesson, make_module, make_user
+
+CONTENT = bytes(range(256)) * 40
+
+
+class ParseRangesTests(SimpleTestCase):
+    def test_parse(self):
+        self.assertEqual(parse_ranges('bytes=0-99', 1000), [(0, 99)])
+        self.assertEqual(parse_ranges('bytes=900-', 1000), [(900, 999)])
+        self.assertEqual(parse_ranges('bytes=-100', 1000), [(900, 999)])
+        self.assertEqual(parse_ranges('bytes=0-10,5-20,100-200', 1000), [(0, 20), (100, 200)])
+        self.assertEqual(parse_ranges('bytes=2000-', 1000), [])
+        self.assertIsNone(parse_ranges('bytes=10-5', 1000))
+        self.assertIsNone(parse_ranges('items=0-1', 1000))
+        self.assertIsNone(parse_ranges('bytes=' + ','.join(f"{i * 10}-{i * 10}" for i in range(20)), 1000))
+
+
+class VideoServingTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        os.makedirs(os.path.join(settings.MEDIA_ROOT, 'videos'), exist_ok=True)
+        with open(os.path.join(settings.MEDIA_ROOT, 'videos', 'lecon.mp4'), 'wb') as output:
+            output.write(CONTENT)
+        self.user = make_user('alice')
+        self.course = make_course()
+        self.course.students.add(self.user)
+        self.lesson = make_lesson(make_module(self.course), video='videos/lecon.mp4')
+        self.login(self.user)
+
+    def video_url(self):
+        response = self.client.get(f"/api/lessons/{self.lesson.id}/video/")
+        self.assertEqual(response.status_code, 200)
+        return response.data['url']
+
+    def get(self, url, **headers):
+        response = self.client.get(url, headers=headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_url_requires_enrollment(self):
+        self.login(make_user('eve'))
+        self.assertEqual(self.client.get(f"/api/lessons/{self.lesson.id}/video/").status_code, 403)
+
+    def test_full_file(self):
+        response, body = self.get(self.video_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(int(response['Content-Length']), len(CONTENT))
+        self.assertEqual(body, CONTENT)
+
+    def test_single_range(self):
+        response, body = self.get(self.video_url(), Range='bytes=100-299')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f"bytes 100-299/{len(CONTENT)}")
+        self.assertEqual(body, CONTENT[100:300])
+
+    def test_multiple_ranges(self):
+        response, body = self.get(self.video_url(), Range='bytes=0-9,-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response['Content-Type'].startswith('multipart/byteranges'))
+        self.assertEqual(int(response['Content-Length']), len(body))
+        self.assertIn(CONTENT[:10], body)
+        self.assertIn(CONTENT[-5:], body)
+
+    def test_unsatisfiable_range(self):
+        response, _ = self.get(self.video_url(), Range=f"bytes={len(CONTENT)}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f"bytes */{len(CONTENT)}")
+
+    def test_if_range_mismatch_sends_everything(self):
+        url = self.video_url()
+        response, body = self.get(url, Range='bytes=0-9', **{'If-Range': '"ancien"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, CONTENT)
+
+    def test_etag(self):
+        url = self.video_url()
+        etag = self.get(url)[0]['ETag']
+        self.assertEqual(self.get(url, **{'If-None-Match': etag})[0].status_code, 304)
+
+    def test_invalid_token(self):
+        self.assertEqual(self.client.get('/api/videos/faux/').status_code, 404)
+
+    def test_accel_redirect(self):
+        url = self.video_url()
+        with mock.patch('cours.video.VIDEO_SENDFILE_HEADER', 'X-Accel-Redirect'):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/videos/lecon.mp4')
+        self.assertEqual(response.content, b'')
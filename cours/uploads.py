@@ -0,0 +1,260 @@
+"""
+Envoi reprenable, par morceaux, des fichiers de soumission.
+
+Protocole (inspiré de tus) :
+1. POST /api/uploads/ {assignment, filename, size, sha256} ouvre une session ;
+   l'extension et la taille annoncée sont vérifiées d'emblée.
+2. PATCH /api/uploads/<id>/ envoie un morceau brut avec les en-têtes
+   Upload-Offset (position à laquelle il commence) et, facultatif,
+   Upload-Checksum: sha256 <empreinte en base64>. Le corps est recopié par blocs
+   dans le fichier partiel sans être chargé en mémoire, et la lecture s'arrête
+   dès que la taille annoncée serait dépassée.
+3. GET /api/uploads/<id>/ donne la position atteinte pour reprendre après une coupure.
+4. Le dernier morceau déclenche l'assemblage : l'empreinte du fichier complet
+   est vérifiée, puis le fichier partiel est rattaché à une nouvelle Submission
+   et rangé par cours.blobs (simple renommage sur le même disque, ou rien du
+   tout si ce contenu est déjà stocké).
+"""
+import base64
+import binascii
+import hashlib
+import logging
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Submission, UploadSession
+
+logger = logging.getLogger(__name__)
+
+# Limites des fichiers de soumission, partagées avec SubmissionSerializer.validate_file
+SUBMISSION_MAX_SIZE = getattr(settings, 'SUBMISSION_MAX_SIZE', 10 * 1024 * 1024)
+SUBMISSION_ALLOWED_EXTENSIONS = getattr(settings, 'SUBMISSION_ALLOWED_EXTENSIONS', [
+    '.pdf', '.doc', '.docx', '.ppt', '.pptx', '.zip', '.py', '.java', '.js', '.html', '.css'
+])
+
+UPLOAD_MAX_CHUNK_SIZE = getattr(settings, 'SUBMISSION_UPLOAD_MAX_CHUNK_SIZE', 5 * 1024 * 1024)
+# Une session sans nouveau morceau pendant ce délai expire (purge_upload_sessions)
+UPLOAD_SESSION_TTL = getattr(settings, 'SUBMISSION_UPLOAD_TTL', 24 * 60 * 60)
+# Sur le même disque que MEDIA_ROOT, pour que l'assemblage soit un renommage
+UPLOAD_DIR = getattr(settings, 'SUBMISSION_UPLOAD_DIR', os.path.join(settings.MEDIA_ROOT, 'uploads-partial'))
+BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    message = "Une erreur est survenue lors de l'envoi du fichier."
+    status_code = 400
+
+    def __init__(self, message=None):
+        super().__init__(message or self.message)
+        self.message = message or self.message
+
+
+class UploadForbidden(UploadError):
+    message = "Vous devez être inscrit à ce cours pour rendre ce devoir."
+    status_code = 403
+
+
+class OffsetMismatch(UploadError):
+    message = "La position du morceau ne correspond pas à celle de l'envoi."
+    status_code = 409
+
+
+class UploadTooLarge(UploadError):
+    message = "Le morceau dépasse la taille annoncée ou la taille maximale d'un morceau."
+    status_code = 413
+
+
+class ChecksumMismatch(UploadError):
+    message = "L'empreinte du morceau ne correspond pas à son contenu."
+
+
+class UploadExpired(UploadError):
+    message = "Cet envoi a expiré ; il doit être recommencé."
+    status_code = 410
+
+
+def submission_file_error(name, size):
+    """
+    Message d'erreur si un fichier `name` de `size` octets ne peut pas être
+    rendu comme soumission, sinon None.
+    """
+    if size > SUBMISSION_MAX_SIZE:
+        return f"Le fichier ne doit pas dépasser {SUBMISSION_MAX_SIZE // (1024 * 1024)} Mo."
+    ext = os.path.splitext(name)[1].lower()
+    if ext not in SUBMISSION_ALLOWED_EXTENSIONS:
+        return (f"L'extension du fichier n'est pas autorisée. "
+                f"Extensions autorisées: {', '.join(SUBMISSION_ALLOWED_EXTENSIONS)}")
+    return None
+
+
+def part_path(session):
+    return os.path.join(UPLOAD_DIR, f"{session.pk}.part")
+
+
+def parse_checksum(header):
+    """
+    Empreinte binaire d'un en-tête Upload-Checksum ('sha256 <base64>'), ou None.
+    """
+    if not header:
+        return None
+    algorithm, _, value = header.strip().partition(' ')
+    if algorithm.lower() != 'sha256':
+        raise UploadError("Seul l'algorithme sha256 est accepté pour Upload-Checksum.")
+    try:
+        digest = base64.b64decode(value.strip(), validate=True)
+    except (binascii.Error, ValueError):
+        digest = b''
+    if len(digest) != hashlib.sha256().digest_size:
+        raise UploadError("Upload-Checksum invalide.")
+    return digest
+
+
+def open_session(user, assignment, filename, size, sha256=''):
+    """
+    Ouvre un envoi pour `assignment` après vérification de l'inscription, de
+    l'extension et de la taille annoncée.
+    """
+    filename = os.path.basename(filename or '')
+    if not filename or size <= 0:
+        raise UploadError("filename et size (positive) sont requis.")
+    error = submission_file_error(filename, size)
+    if error:
+        raise UploadTooLarge(error) if size > SUBMISSION_MAX_SIZE else UploadError(error)
+    sha256 = (sha256 or '').lower()
+    if sha256 and not re.fullmatch(r'[0-9a-f]{64}', sha256):
+        raise UploadError("sha256 doit être une empreinte hexadécimale de 64 caractères.")
+    # Import différé : cours.enrollment dépend (via les notifications) des serializers
+    from .enrollment import Enrollment
+
+    if not user.is_staff and not Enrollment.objects.filter(
+        course_id=assignment.lesson.module.course_id, user_id=user.pk
+    ).exists():
+        raise UploadForbidden()
+
+    session = UploadSession.objects.create(
+        user=user, assignment=assignment, filename=filename, size=size, sha256=sha256
+    )
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    open(part_path(session), 'wb').close()
+    return session
+
+
+def is_expired(session):
+    return session.updated_at < timezone.now() - timedelta(seconds=UPLOAD_SESSION_TTL)
+
+
+def write_chunk(session, stream, offset, length, checksum=None):
+    """
+    Écrit à `offset` les `length` octets lus par blocs dans `stream`. Au
+    dernier morceau, assemble le fichier et crée la soumission.
+    """
+    if session.is_complete:
+        raise UploadError("Cet envoi est déjà terminé.")
+    if is_expired(session):
+        raise UploadExpired()
+    if offset != session.offset:
+        raise OffsetMismatch()
+    if length > UPLOAD_MAX_CHUNK_SIZE or offset + length > session.size:
+        raise UploadTooLarge()
+
+    digest = hashlib.sha256()
+    received = 0
+    with open(part_path(session), 'r+b') as part:
+        part.seek(offset)
+        while received < length:
+            block = stream.read(min(BLOCK_SIZE, length - received))
+            if not block:
+                break
+            digest.update(block)
+            part.write(block)
+            received += len(block)
+        if received != length or (checksum is not None and digest.digest() != checksum):
+            # Le morceau est à renvoyer en entier : on oublie ce qui a été écrit
+            part.truncate(offset)
+            if received != length:
+                raise UploadError("Morceau incomplet : la connexion a été interrompue.")
+            raise ChecksumMismatch()
+
+    # Mise à jour conditionnelle : deux envois simultanés du même morceau ne comptent qu'une fois
+    updated = UploadSession.objects.filter(pk=session.pk, offset=offset).update(
+        offset=offset + length, updated_at=timezone.now()
+    )
+    if not updated:
+        raise OffsetMismatch()
+    session.offset = offset + length
+
+    if session.offset == session.size:
+        _assemble(session)
+    return session
+
+
+class PartFile(File):
+    """
+    Fichier partiel complet et son empreinte. `temporary_file_path` permet à
+    FileSystemStorage de le déplacer au lieu de le recopier.
+    """
+
+    def __init__(self, path, name, sha256):
+        super().__init__(open(path, 'rb'), name=name)
+        self.path = path
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.path
+
+
+def _assemble(session):
+    path = part_path(session)
+    # Empreinte du fichier complet, vérifiée et réutilisée par le stockage adressé par le contenu
+    digest = hashlib.sha256()
+    with open(path, 'rb') as part:
+        for block in iter(lambda: part.read(BLOCK_SIZE), b''):
+            digest.update(block)
+    sha256 = digest.hexdigest()
+    if session.sha256 and sha256 != session.sha256:
+        UploadSession.objects.filter(pk=session.pk).update(offset=0, updated_at=timezone.now())
+        session.offset = 0
+        open(path, 'wb').close()
+        raise ChecksumMismatch("L'empreinte du fichier complet ne correspond pas ; l'envoi doit être recommencé.")
+
+    with transaction.atomic(), PartFile(path, session.filename, sha256) as content:
+        submission = Submission(assignment_id=session.assignment_id, student_id=session.user_id, file=content)
+        submission.save()
+        UploadSession.objects.filter(pk=session.pk).update(submission=submission, updated_at=timezone.now())
+    session.submission = submission
+    if os.path.exists(path):
+        # Contenu déjà stocké, ou stockage autre que le système de fichiers
+        os.remove(path)
+    logger.info(f"Envoi {session.pk} assemblé : soumission {submission.pk} ({session.size} octets)")
+
+
+def abort_session(session):
+    """
+    Abandonne un envoi : le fichier partiel et la session sont supprimés.
+    """
+    try:
+        os.remove(part_path(session))
+    except FileNotFoundError:
+        pass
+    session.delete()
+
+
+def purge_sessions():
+    """
+    Supprime les envois expirés et leurs fichiers partiels. Retourne le nombre
+    de sessions supprimées.
+    """
+    expired = UploadSession.objects.filter(
+        updated_at__lt=timezone.now() - timedelta(seconds=UPLOAD_SESSION_TTL)
+    )
+    count = 0
+    for session in expired.iterator():
+        abort_session(session)
+        count += 1
+    return count
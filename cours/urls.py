@@ -24,8 +24,14 @@ router.register(r'certificates', views.CertificateViewSet)
 router.register(r'comments', views.CommentViewSet)
 router.register(r'profiles', views.UserProfileViewSet)
 router.register(r'submissions', SubmissionViewSet)
+router.register(r'notifications', views.NotificationViewSet, basename='notification')
+router.register(r'uploads', views.UploadSessionViewSet, basename='upload')
 
 urlpatterns = [
+    # Flux temps réel (ASGI), déclaré avant le routeur pour ne pas être pris pour un identifiant
+    path('api/notifications/stream/', views.notification_stream, name='notification-stream'),
+    # Vidéos des leçons : URL signée délivrée par /api/lessons/<id>/video/
+    path('api/videos/<str:token>/', views.lesson_video, name='lesson-video-file'),
     path('api/', include(router.urls)),
     
     # JWT Token URLs
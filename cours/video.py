@@ -0,0 +1,457 @@
+"""
+Suivi de la position de lecture des vidéos de leçon.
+
+Le lecteur envoie un battement de cœur toutes les quelques secondes. Le
+premier battement d'un couple (utilisateur, leçon) vérifie en une requête que
+la leçon existe et que l'utilisateur est inscrit ; les suivants ne font que
+mettre à jour, en mémoire, l'entrée du tampon du processus : aucune requête
+SQL. Un thread de fond vide le tampon
+toutes les VIDEO_PROGRESS_FLUSH_INTERVAL secondes et écrit toutes les positions
+en une insertion groupée (upsert) dans VideoProgress. Un intervalle nul désactive
+le thread ; le tampon n'est alors écrit qu'à l'arrêt du processus.
+
+Lorsqu'un étudiant franchit VIDEO_COMPLETION_THRESHOLD de la vidéo, la leçon
+est marquée comme terminée par le même chemin que la synchronisation en lot
+(cours.completions), progression, notifications et certificat compris.
+
+Chaque processus web a son propre tampon ; les écritures sont des upserts
+indépendants, sans affinité de session nécessaire.
+
+Diffusion : l'inscription est vérifiée une seule fois, à la délivrance d'une
+URL signée et limitée dans le temps. Les requêtes Range qui suivent (chaque
+déplacement du lecteur) ne touchent plus la base : le fichier est envoyé par
+tranches sans copie (os.sendfile du serveur WSGI) ou délégué au proxy
+(X-Accel-Redirect / X-Sendfile) lorsque VIDEO_SENDFILE_HEADER est défini.
+"""
+import atexit
+import logging
+import mimetypes
+import threading
+import time
+import uuid
+from urllib.parse import quote
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+from django.db.models import Exists, OuterRef
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.http import http_date, parse_etags, quote_etag
+
+from .enrollment import Enrollment
+from .models import Lesson, VideoProgress
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = getattr(settings, 'VIDEO_PROGRESS_FLUSH_INTERVAL', 10)
+COMPLETION_THRESHOLD = getattr(settings, 'VIDEO_COMPLETION_THRESHOLD', 0.9)
+FLUSH_BATCH_SIZE = 1000
+# Couples (utilisateur, leçon) vérifiés gardés en mémoire ; au-delà, la liste repart de zéro
+ACCESS_MEMO_SIZE = 10000
+
+# Durée de validité d'une URL de lecture signée
+VIDEO_URL_MAX_AGE = getattr(settings, 'VIDEO_URL_MAX_AGE', 6 * 60 * 60)
+# 'X-Accel-Redirect' (nginx) ou 'X-Sendfile' (Apache, lighttpd) ; vide : Django sert le fichier
+VIDEO_SENDFILE_HEADER = getattr(settings, 'VIDEO_SENDFILE_HEADER', '')
+VIDEO_ACCEL_REDIRECT_PREFIX = getattr(settings, 'VIDEO_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+VIDEO_URL_SALT = 'cours.video.url'
+# Au-delà, l'en-tête Range est ignoré et le fichier envoyé en entier
+MAX_RANGES = 16
+BLOCK_SIZE = 64 * 1024
+
+
+class HeartbeatBuffer:
+    """
+    Dernière position connue par (utilisateur, leçon), en attente d'écriture.
+    """
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._entries = {}
+        self._allowed = set()
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def check_access(self, user_id, lesson_id):
+        """
+        Indique si `user_id` est inscrit au cours de la leçon ; lève
+        Lesson.DoesNotExist si elle n'existe pas. Seul le premier battement
+        d'un couple interroge la base : l'écriture du tampon revérifie
+        l'inscription, une désinscription entre-temps est donc sans effet.
+        """
+        key = (user_id, lesson_id)
+        if key in self._allowed:
+            return True
+        enrolled = (
+            Lesson.objects.filter(id=lesson_id)
+            .annotate(enrolled=Exists(
+                Enrollment.objects.filter(course_id=OuterRef('module__course_id'), user_id=user_id)
+            ))
+            .values_list('enrolled', flat=True)
+            .get()
+        )
+        if enrolled:
+            with self._lock:
+                if len(self._allowed) >= ACCESS_MEMO_SIZE:
+                    self._allowed.clear()
+                self._allowed.add(key)
+        return enrolled
+
+    def record(self, user_id, lesson_id, position, duration):
+        key = (user_id, lesson_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = {
+                    'position': position,
+                    'max_position': position,
+                    'duration': duration,
+                    'at': time.time(),
+                }
+            else:
+                entry['position'] = position
+                entry['max_position'] = max(entry['max_position'], position)
+                entry['duration'] = duration
+                entry['at'] = time.time()
+        self._ensure_flusher()
+
+    def get(self, user_id, lesson_id):
+        with self._lock:
+            entry = self._entries.get((user_id, lesson_id))
+            return dict(entry) if entry else None
+
+    def drain(self):
+        with self._lock:
+            entries, self._entries = self._entries, {}
+        return entries
+
+    def restore(self, entries):
+        """
+        Remet dans le tampon des entrées dont l'écriture a échoué, sans écraser
+        les battements arrivés depuis.
+        """
+        with self._lock:
+            for key, entry in entries.items():
+                current = self._entries.get(key)
+                if current is None:
+                    self._entries[key] = entry
+                else:
+                    current['max_position'] = max(current['max_position'], entry['max_position'])
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _ensure_flusher(self):
+        # Intervalle nul : pas de thread d'écriture, l'appelant vide le tampon lui-même
+        if not self.flush_interval or (self._flusher is not None and self._flusher.is_alive()):
+            return
+        with self._lock:
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._run, name='video-progress-flush', daemon=True)
+                self._flusher.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                flush_heartbeats(self)
+            except Exception:
+                logger.exception("Échec de l'écriture des positions vidéo")
+            finally:
+                connections.close_all()
+
+
+def flush_heartbeats(buffer):
+    """
+    Écrit les positions en attente. Retourne les compteurs de l'écriture.
+    Les entrées dont la leçon n'existe pas ou dont l'utilisateur n'est pas
+    inscrit au cours sont ignorées.
+    """
+    entries = buffer.drain()
+    stats = {'buffered': len(entries), 'written': 0, 'completed': 0}
+    if not entries:
+        return stats
+    try:
+        keys = list(entries)
+        for start in range(0, len(keys), FLUSH_BATCH_SIZE):
+            batch = {key: entries[key] for key in keys[start:start + FLUSH_BATCH_SIZE]}
+            written, completed = _write_batch(batch)
+            stats['written'] += written
+            stats['completed'] += completed
+    except Exception:
+        buffer.restore(entries)
+        raise
+    return stats
+
+
+def _write_batch(entries):
+    user_ids = {user_id for user_id, _ in entries}
+    lesson_ids = {lesson_id for _, lesson_id in entries}
+
+    # Validation : leçons existantes et inscriptions, en deux requêtes pour tout le lot
+    lesson_courses = dict(
+        Lesson.objects.filter(id__in=lesson_ids).values_list('id', 'module__course_id')
+    )
+    enrolled = set(
+        Enrollment.objects.filter(user_id__in=user_ids, course_id__in=set(lesson_courses.values()))
+        .values_list('user_id', 'course_id')
+    )
+    entries = {
+        (user_id, lesson_id): entry
+        for (user_id, lesson_id), entry in entries.items()
+        if lesson_id in lesson_courses and (user_id, lesson_courses[lesson_id]) in enrolled
+    }
+    if not entries:
+        return 0, 0
+
+    # Positions déjà écrites : le point le plus avancé ne recule jamais
+    previous = {
+        (user_id, lesson_id): (max_position, duration)
+        for user_id, lesson_id, max_position, duration in VideoProgress.objects.filter(
+            user_id__in=user_ids, lesson_id__in=lesson_ids
+        ).values_list('user_id', 'lesson_id', 'max_position', 'duration')
+    }
+
+    rows = []
+    crossed = defaultdict(list)
+    for (user_id, lesson_id), entry in entries.items():
+        previous_max, previous_duration = previous.get((user_id, lesson_id), (0.0, 0.0))
+        max_position = max(entry['max_position'], previous_max)
+        rows.append(VideoProgress(
+            user_id=user_id,
+            lesson_id=lesson_id,
+            position=entry['position'],
+            max_position=max_position,
+            duration=entry['duration'],
+            updated_at=datetime.fromtimestamp(entry['at'], tz=dt_timezone.utc),
+        ))
+        was_watched = previous_duration and previous_max / previous_duration >= COMPLETION_THRESHOLD
+        if not was_watched and max_position / entry['duration'] >= COMPLETION_THRESHOLD:
+            crossed[user_id].append({
+                'lesson_id': lesson_id,
+                'completed_at': datetime.fromtimestamp(entry['at'], tz=dt_timezone.utc).isoformat(),
+            })
+
+    VideoProgress.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['user', 'lesson'],
+        update_fields=['position', 'max_position', 'duration', 'updated_at'],
+    )
+
+    completed = 0
+    if crossed:
+        from django.contrib.auth.models import User
+
+        from .completions import sync_completions
+
+        for user in User.objects.filter(id__in=list(crossed)):
+            summary = sync_completions(user, crossed[user.id])
+            completed += sum(1 for result in summary['results'] if result['status'] == 'completed')
+    return len(rows), completed
+
+
+def get_position(user, lesson_id):
+    """
+    Dernière position de `user` dans la vidéo de la leçon : tampon du
+    processus s'il contient un battement récent, sinon la table.
+    """
+    entry = heartbeat_buffer.get(user.pk, lesson_id)
+    if entry is not None:
+        return {'position': entry['position'], 'duration': entry['duration']}
+    progress = (
+        VideoProgress.objects.filter(user_id=user.pk, lesson_id=lesson_id)
+        .values('position', 'duration')
+        .first()
+    )
+    return progress or {'position': 0.0, 'duration': 0.0}
+
+
+heartbeat_buffer = HeartbeatBuffer()
+
+
+@atexit.register
+def _flush_on_exit():
+    # Arrêt du processus web : on écrit ce qui reste, au mieux
+    if len(heartbeat_buffer):
+        try:
+            flush_heartbeats(heartbeat_buffer)
+        except Exception:
+            logger.exception("Positions vidéo perdues à l'arrêt")
+
+
+# ---------------------------
+# Diffusion des vidéos (HTTP Range)
+# ---------------------------
+def video_url(request, lesson):
+    """
+    URL signée de la vidéo de `lesson`, à vérifier par l'appelant (inscription).
+    Le nom du fichier est dans la signature : la servir ne demande aucune requête SQL.
+    """
+    token = signing.dumps({'l': lesson.id, 'f': lesson.video.name}, salt=VIDEO_URL_SALT, compress=True)
+    return request.build_absolute_uri(reverse('lesson-video-file', args=[token]))
+
+
+def parse_ranges(header, size):
+    """
+    Intervalles (début, fin incluse) demandés par l'en-tête Range, triés et
+    fusionnés. Retourne None si l'en-tête est absent, invalide ou trop
+    fragmenté (réponse complète), une liste vide si rien n'est satisfiable.
+    """
+    if not header or not header.startswith('bytes='):
+        return None
+    ranges = []
+    for spec in header[len('bytes='):].split(','):
+        start, sep, end = spec.strip().partition('-')
+        if not sep or not (start or end) or not all(part.isdigit() for part in (start, end) if part):
+            return None
+        if not start:
+            # Suffixe : les N derniers octets
+            if int(end) == 0:
+                continue
+            ranges.append((max(size - int(end), 0), size - 1))
+            continue
+        start = int(start)
+        if end and int(end) < start:
+            return None
+        if start < size:
+            ranges.append((start, min(int(end), size - 1) if end else size - 1))
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    if len(merged) > MAX_RANGES:
+        return None
+    return merged
+
+
+class RangeFile:
+    """
+    Vue en lecture seule d'une tranche de fichier. Expose fileno() pour que le
+    serveur WSGI puisse utiliser os.sendfile, borné par le Content-Length.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def _multipart_body(file, ranges, headers):
+    try:
+        for (start, end), header in zip(ranges, headers):
+            yield header
+            file.seek(start)
+            remaining = end - start + 1
+            while remaining:
+                chunk = file.read(min(BLOCK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+            yield b'\r\n'
+        yield headers[-1]
+    finally:
+        file.close()
+
+
+def serve_video(request, token):
+    """
+    Sert la vidéo désignée par l'URL signée `token`, avec prise en charge des
+    requêtes Range (une ou plusieurs tranches) et de If-Range. La mémoire
+    utilisée ne dépend pas de la taille du fichier.
+    """
+    try:
+        data = signing.loads(token, salt=VIDEO_URL_SALT, max_age=VIDEO_URL_MAX_AGE)
+    except signing.BadSignature:
+        raise Http404("Lien de lecture invalide ou expiré.")
+
+    from .models import Lesson
+
+    name = data['f']
+    storage = Lesson._meta.get_field('video').storage
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    if VIDEO_SENDFILE_HEADER:
+        # Le proxy gère lui-même Range, If-Range et l'envoi sans copie
+        response = HttpResponse(content_type=content_type)
+        if VIDEO_SENDFILE_HEADER.lower() == 'x-accel-redirect':
+            response[VIDEO_SENDFILE_HEADER] = VIDEO_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + quote(name)
+        else:
+            response[VIDEO_SENDFILE_HEADER] = storage.path(name)
+        response['Cache-Control'] = f"private, max-age={VIDEO_URL_MAX_AGE}"
+        return response
+
+    try:
+        size = storage.size(name)
+        modified = storage.get_modified_time(name).timestamp()
+    except (FileNotFoundError, NotImplementedError):
+        raise Http404("Vidéo introuvable.")
+    etag = quote_etag(f"{int(modified * 1000):x}-{size:x}")
+    last_modified = http_date(modified)
+
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    ranges = parse_ranges(request.headers.get('Range'), size)
+    if_range = request.headers.get('If-Range')
+    if ranges is not None and if_range and if_range not in (etag, last_modified):
+        # Le fichier a changé depuis la première tranche : on renvoie tout
+        ranges = None
+
+    if ranges == []:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f"bytes */{size}"
+    elif ranges is None:
+        response = FileResponse(RangeFile(storage.open(name, 'rb'), 0, size), content_type=content_type)
+        response['Content-Length'] = size
+    elif len(ranges) == 1:
+        start, end = ranges[0]
+        response = FileResponse(
+            RangeFile(storage.open(name, 'rb'), start, end - start + 1), status=206, content_type=content_type
+        )
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f"bytes {start}-{end}/{size}"
+    else:
+        boundary = uuid.uuid4().hex
+        headers = [
+            (f"--{boundary}\r\nContent-Type: {content_type}\r\n"
+             f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n").encode()
+            for start, end in ranges
+        ] + [f"--{boundary}--\r\n".encode()]
+        length = sum(len(header) for header in headers) + sum(end - start + 3 for start, end in ranges)
+        response = StreamingHttpResponse(
+            _multipart_body(storage.open(name, 'rb'), ranges, headers),
+            status=206, content_type=f"multipart/byteranges; boundary={boundary}",
+        )
+        response['Content-Length'] = length
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    # URL propre à l'utilisateur : pas de cache partagé
+    response['Cache-Control'] = f"private, max-age={VIDEO_URL_MAX_AGE}"
+    return response
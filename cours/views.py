@@ -1,16 +1,25 @@
 from django.shortcuts import render
-from rest_framework import viewsets, status, filters, permissions
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import viewsets, status, filters, permissions, mixins
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from .models import Comment
 from .serializers import CommentSerializer
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from django.db.models import Q
-from django.core.paginator import Paginator
+from django.db.models.functions import Substr
+import io
 import logging
+import os
 from .models import UserProfile
 from .serializers import UserProfileSerializer
 import time
@@ -21,12 +30,13 @@ from .serializers import SubmissionSerializer
 from .models import (
     Category, Course, CourseModule, Lesson, Assignment,
     Submission, Certificate, Comment, UserProfile, Notification,
-    LessonCompletion  # Nouveau modèle ajouté
+    LessonCompletion, ModuleProgress, UploadSession
 )
 from .serializers import (
     CategorySerializer, CourseSerializer, CourseModuleSerializer, LessonSerializer,
     AssignmentSerializer, SubmissionSerializer, CertificateSerializer, CommentSerializer,
-    UserProfileSerializer, NotificationSerializer, LessonCompletionSerializer  # Nouveau serializer
+    UserProfileSerializer, NotificationSerializer, LessonCompletionSerializer,  # Nouveau serializer
+    UploadSessionSerializer
 )
 from .permissions import (
     IsInstructorOrReadOnly, IsEnrolledInCourse, IsOwnerOrReadOnly, 
@@ -34,10 +44,40 @@ from .permissions import (
 )
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from .blobs import identical_submissions
+from .certificates import get_verification, is_course_completed, issue_certificate, revoke_certificate
+from .comments import get_comment_thread
+from .completions import MAX_EVENTS as COMPLETION_SYNC_MAX_EVENTS, sync_completions
+from .content import get_course_content
+from .gradebook import gradebook_response
+from .grade_stats import get_assignment_stats, get_course_stats
+from .grading import (
+    CLAIM_MAX as GRADING_CLAIM_MAX, MAX_ROWS as GRADING_BULK_MAX_ROWS, QUEUE_ORDERING as GRADING_QUEUE_ORDERING,
+    bulk_grade, can_grade, claim_submissions, grading_queue, grading_scope, pending_counts, read_grades, release_submissions,
+)
+from .notifications import enqueue_notification, get_unread_count, mark_read as mark_notifications_read
+from .enrollment import (
+    Enrollment, EnrollmentError, NotEnrolled, bulk_enroll, enroll_student, read_identifiers, unenroll_student
+)
+from .facets import get_course_facets
+from .pagination import KeysetPagination
+from .search import CourseSearchFilter
+from .streaming import notification_events
+from .uploads import UploadError, abort_session, open_session, parse_checksum, write_chunk
+from .video import (
+    VIDEO_URL_MAX_AGE, get_position as get_video_position, heartbeat_buffer, serve_video, video_url
+)
 
 # Configuration du logger
 logger = logging.getLogger(__name__)
 
+# Durée de cache HTTP (CDN, navigateurs) de la vérification publique des certificats :
+# courte, une révocation doit être visible en quelques minutes (l'ETag évite de renvoyer le corps)
+CERTIFICATE_VERIFICATION_MAX_AGE = getattr(settings, 'CERTIFICATE_VERIFICATION_MAX_AGE', 5 * 60)
+
 
 
 class LessonViewSet(viewsets.ModelViewSet):
@@ -57,9 +97,37 @@ class LessonViewSet(viewsets.ModelViewSet):
 
         
 class CommentViewSet(viewsets.ModelViewSet):
-    queryset = Comment.objects.all().order_by('-created_at')  # Trie les commentaires par date décroissante
+    queryset = (
+        Comment.objects.select_related('user')
+        # Extrait du parent lu par jointure plutôt qu'en chargeant chaque parent
+        .annotate(parent_excerpt=Substr('parent__content', 1, 51))
+        .order_by('-created_at', '-id')  # Trie les commentaires par date décroissante
+    )
     serializer_class = CommentSerializer
-    permission_classes = [IsAuthenticatedOrReadOnly] 
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
+
+    @action(detail=False, methods=['get'])
+    def thread(self, request):
+        """
+        Retourne le fil de discussion imbriqué d'une leçon (paramètre 'lesson'),
+        ou seulement le sous-arbre d'un commentaire (paramètre 'root').
+        """
+        lesson_id = request.query_params.get('lesson')
+        if not lesson_id:
+            return Response({"detail": "Le paramètre 'lesson' est requis."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        root = None
+        root_id = request.query_params.get('root')
+        if root_id:
+            root = get_object_or_404(Comment.objects.only('path'), pk=root_id, lesson_id=lesson_id)
+            
+        return Response(get_comment_thread(lesson_id, root=root))
+
+    def perform_create(self, serializer):
+        # Une réponse trop profonde est refusée par le serializer (400)
+        serializer.save(user=self.request.user)
 
 # ---------------------------
 # Vues pour la gestion des catégories
@@ -83,10 +151,33 @@ class CourseViewSet(viewsets.ModelViewSet):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
     permission_classes = [IsInstructorOrReadOnly]  # Permission personnalisée
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['title', 'description', 'instructor__username']
+    # Recherche plein texte classée (tsvector sur PostgreSQL, FTS5 sur SQLite)
+    filter_backends = [CourseSearchFilter, filters.OrderingFilter]
     ordering_fields = ['title', 'created_at', 'start_date']
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # Les compteurs du serializer sont calculés en une seule requête pour toute la page
+        if self.action in ['list', 'retrieve', 'my_courses']:
+            queryset = queryset.select_related('category', 'instructor').with_stats(self.request.user)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """
+        Liste des cours accompagnée des facettes (catégorie, niveau, prix, mise en avant)
+        calculées pour le filtre courant.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer(queryset, many=True)
+        
+        # Sans filtre, les facettes du catalogue complet viennent du cache
+        if request.query_params.get(CourseSearchFilter.search_param):
+            facets = get_course_facets(self.filter_queryset(Course.objects.all()))
+        else:
+            facets = get_course_facets()
+            
+        return Response({'results': serializer.data, 'facets': facets})
+
     def perform_create(self, serializer):
         serializer.save(instructor=self.request.user)
         logger.info(f"Cours créé: {serializer.data.get('title')} par {self.request.user}")
@@ -95,56 +186,28 @@ class CourseViewSet(viewsets.ModelViewSet):
     def enroll(self, request, pk=None):
         """
         Permet à un utilisateur authentifié de s'inscrire à un cours.
-        Vérifie la limite d'inscription si définie et les prérequis.
+        Vérifie la limite d'inscription si définie.
         """
         course = self.get_object()
         user = request.user
 
-        # Vérifier si l'utilisateur est déjà inscrit
-        if course.students.filter(id=user.id).exists():
-            return Response({"detail": "Vous êtes déjà inscrit à ce cours."},
-                            status=status.HTTP_400_BAD_REQUEST)
-                            
-        # Vérifier la limite d'inscription
-        if course.enrollment_limit and course.students.count() >= course.enrollment_limit:
-            return Response({"detail": "La limite d'inscription a été atteinte."},
-                            status=status.HTTP_400_BAD_REQUEST)
-                            
-        # Vérifier les prérequis (si implémentés)
-        prerequisites = course.prerequisites.all()
-        if prerequisites:
-            completed_prereqs = Certificate.objects.filter(
-                user=user, 
-                course__in=prerequisites
-            ).count()
-            
-            if completed_prereqs < prerequisites.count():
-                return Response(
-                    {"detail": "Vous devez compléter tous les prérequis avant de vous inscrire."},
-                    status=status.HTTP_403_FORBIDDEN
-                )
-                
+        # Réservation atomique d'une place : la limite ne peut pas être dépassée.
+        # La notification est déposée dans la boîte d'envoi, dans la même transaction.
         try:
-            course.students.add(user)
-            course.save()
-            
-            # Créer une notification pour l'utilisateur
-            Notification.objects.create(
-                user=user,
-                title=f"Inscription réussie",
-                message=f"Vous êtes maintenant inscrit au cours: {course.title}",
-                notification_type="enrollment"
-            )
-            
-            logger.info(f"Utilisateur {user.username} inscrit au cours {course.title}")
-            return Response({"detail": "Inscription réussie."}, status=status.HTTP_200_OK)
+            with transaction.atomic():
+                enrollment = enroll_student(course, user)
+                enqueue_notification(
+                    user,
+                    type="enrollment",
+                    title="Inscription réussie",
+                    message=f"Vous êtes maintenant inscrit au cours: {course}",
+                    idempotency_key=f"enrollment:{enrollment.pk}"
+                )
+        except EnrollmentError as e:
+            return Response({"detail": e.message}, status=status.HTTP_400_BAD_REQUEST)
             
-        except Exception as e:
-            logger.error(f"Erreur lors de l'inscription: {str(e)}")
-            return Response(
-                {"detail": "Une erreur est survenue lors de l'inscription."},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        logger.info(f"Utilisateur {user.username} inscrit au cours {course.id}")
+        return Response({"detail": "Inscription réussie."}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def unenroll(self, request, pk=None):
@@ -154,35 +217,79 @@ class CourseViewSet(viewsets.ModelViewSet):
         course = self.get_object()
         user = request.user
         
-        if not course.students.filter(id=user.id).exists():
-            return Response({"detail": "Vous n'êtes pas inscrit à ce cours."},
-                            status=status.HTTP_400_BAD_REQUEST)
-                            
         try:
-            course.students.remove(user)
-            course.save()
-            
-            logger.info(f"Utilisateur {user.username} désinscrit du cours {course.title}")
-            return Response({"detail": "Désinscription réussie."}, status=status.HTTP_200_OK)
-            
+            unenroll_student(course, user)
+        except NotEnrolled as e:
+            return Response({"detail": e.message}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error(f"Erreur lors de la désinscription: {str(e)}")
             return Response(
                 {"detail": "Une erreur est survenue lors de la désinscription."},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+            
+        logger.info(f"Utilisateur {user.username} désinscrit du cours {course.id}")
+        return Response({"detail": "Désinscription réussie."}, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, IsCourseInstructor])
+    def bulk_enroll(self, request, pk=None):
+        """
+        Inscrit une cohorte d'étudiants en une seule requête.
+        Accepte une liste 'students' (ids ou emails) ou un fichier CSV 'file'.
+        Retourne un rapport ligne par ligne.
+        """
+        course = self.get_object()
+        
+        upload = request.FILES.get('file')
+        if upload:
+            identifiers = read_identifiers(io.TextIOWrapper(upload.file, encoding='utf-8-sig'))
+        else:
+            identifiers = request.data.get('students')
+            
+        if not identifiers or not isinstance(identifiers, list):
+            return Response({"detail": "Une liste 'students' ou un fichier CSV 'file' est requis."},
+                            status=status.HTTP_400_BAD_REQUEST)
+                            
+        report = bulk_enroll(course, identifiers)
+        enrolled = sum(1 for row in report if row['status'] == 'enrolled')
+        logger.info(f"{enrolled} étudiants inscrits en masse au cours {course.id} par {request.user}")
+        
+        return Response({"enrolled": enrolled, "results": report}, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated, IsCourseInstructor])
+    def gradebook(self, request, pk=None):
+        """
+        Exporte en flux le carnet de notes du cours : une ligne par étudiant,
+        une colonne par devoir. Paramètre 'output' : csv (par défaut) ou xlsx.
+        """
+        course = self.get_object()
+        output = request.query_params.get('output', 'csv')
+        if output not in ('csv', 'xlsx'):
+            return Response({"detail": "Le paramètre 'output' doit valoir 'csv' ou 'xlsx'."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        logger.info(f"Export {output} du carnet de notes du cours {course.id} par {request.user}")
+        return gradebook_response(request, course, output)
+
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated, IsCourseInstructor])
+    def grade_stats(self, request, pk=None):
+        """
+        Statistiques des notes du cours et de chacun de ses devoirs (moyenne,
+        écart type, médiane, percentiles, histogramme), normalisées par le barème.
+        """
+        return Response(get_course_stats(self.get_object()))
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def my_courses(self, request):
         """
-        Liste paginée des cours dans lesquels l'utilisateur authentifié est inscrit.
+        Liste paginée (par curseur) des cours dans lesquels l'utilisateur authentifié est inscrit.
         """
         user = request.user
         
         # Filtrer par statut si demandé
         status_filter = request.query_params.get('status', None)
         
-        courses = Course.objects.filter(students=user)
+        courses = self.get_queryset().filter(students=user)
         if status_filter:
             if status_filter == 'active':
                 courses = courses.filter(is_active=True)
@@ -191,21 +298,12 @@ class CourseViewSet(viewsets.ModelViewSet):
                 # (par exemple, tous les modules sont marqués comme complétés)
                 pass
                 
-        # Pagination
-        page_size = int(request.query_params.get('page_size', 10))
-        page_number = int(request.query_params.get('page', 1))
+        # Pagination par curseur sur (created_at, id) : ni COUNT ni OFFSET
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(courses, request, view=self)
+        serializer = self.get_serializer(page, many=True)
         
-        paginator = Paginator(courses, page_size)
-        paginated_courses = paginator.get_page(page_number)
-        
-        serializer = self.get_serializer(paginated_courses, many=True)
-        
-        return Response({
-            'count': paginator.count,
-            'num_pages': paginator.num_pages,
-            'current_page': page_number,
-            'results': serializer.data
-        })
+        return paginator.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated, IsEnrolledInCourse])
     def content(self, request, pk=None):
@@ -224,28 +322,8 @@ class CourseViewSet(viewsets.ModelViewSet):
             )
             
         try:
-            modules = course.modules.all().order_by('order')
-            module_data = []
-            
-            for module in modules:
-                lessons = module.lessons.all().order_by('order')
-                module_serializer = CourseModuleSerializer(module)
-                lessons_serializer = LessonSerializer(lessons, many=True)
-                
-                # Pour chaque leçon, vérifier si elle est complétée par l'utilisateur
-                lesson_data = lessons_serializer.data
-                for lesson in lesson_data:
-                    lesson['completed'] = LessonCompletion.objects.filter(
-                        user=user,
-                        lesson_id=lesson['id']
-                    ).exists()
-                
-                module_data.append({
-                    "module": module_serializer.data,
-                    "lessons": lesson_data
-                })
-                
-            return Response(module_data)
+            # Plan du cours mis en cache, complété par les leçons terminées de l'utilisateur
+            return Response(get_course_content(course, user))
             
         except Exception as e:
             logger.error(f"Erreur lors de la récupération du contenu: {str(e)}")
@@ -291,9 +369,10 @@ class LessonViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         # Filtrer par module si spécifié
         module_id = self.request.query_params.get('module_id', None)
+        queryset = Lesson.objects.select_related('module')
         if module_id:
-            return Lesson.objects.filter(module_id=module_id).order_by('order')
-        return Lesson.objects.all()
+            return queryset.filter(module_id=module_id).order_by('order')
+        return queryset
 
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def mark_completed(self, request, pk=None):
@@ -313,65 +392,46 @@ class LessonViewSet(viewsets.ModelViewSet):
             )
             
         try:
-            completion, created = LessonCompletion.objects.get_or_create(
-                user=user,
-                lesson=lesson,
-                defaults={"completed_at": timezone.now()}
-            )
-            
-            if not created:
-                # Mettre à jour la date de completion si déjà existante
-                completion.completed_at = timezone.now()
-                completion.save()
-                
-            # Vérifier si toutes les leçons du module sont terminées
-            module = lesson.module
-            total_lessons = module.lessons.count()
-            completed_lessons = LessonCompletion.objects.filter(
-                user=user,
-                lesson__module=module
-            ).count()
-            
-            # Si toutes les leçons sont terminées, notifier l'utilisateur
-            if total_lessons == completed_lessons:
-                Notification.objects.create(
+            with transaction.atomic():
+                completion, created = LessonCompletion.objects.get_or_create(
                     user=user,
-                    title=f"Module terminé",
-                    message=f"Vous avez terminé le module '{module.title}' du cours '{course.title}'",
-                    notification_type="progression"
+                    lesson=lesson,
+                    defaults={"completed_at": timezone.now()}
                 )
                 
-            # Vérifier si tous les modules du cours sont terminés
-            total_modules = course.modules.count()
-            completed_modules = 0
-            
-            for course_module in course.modules.all():
-                module_lessons = course_module.lessons.count()
-                if module_lessons == 0:  # Module sans leçons
-                    continue
+                if not created:
+                    # Mettre à jour la date de completion si déjà existante
+                    completion.completed_at = timezone.now()
+                    completion.save()
                     
-                completed_module_lessons = LessonCompletion.objects.filter(
-                    user=user,
-                    lesson__module=course_module
-                ).count()
+                # Vérifier si toutes les leçons du module sont terminées
+                # (lecture de la progression maintenue par cours.progress)
+                module = lesson.module
+                module_progress = ModuleProgress.objects.filter(user=user, module=module).first()
                 
-                if module_lessons == completed_module_lessons:
-                    completed_modules += 1
+                # Si toutes les leçons sont terminées, notifier l'utilisateur (une seule fois)
+                if module_progress and module_progress.is_completed:
+                    enqueue_notification(
+                        user,
+                        type="progression",
+                        title="Module terminé",
+                        message=f"Vous avez terminé le module '{module.title}' du cours '{course}'",
+                        idempotency_key=f"module-completed:{module.id}:{user.id}"
+                    )
                     
-            # Si tous les modules sont terminés, générer un certificat
-            if total_modules > 0 and completed_modules == total_modules:
-                certificate, cert_created = Certificate.objects.get_or_create(
-                    user=user,
-                    course=course,
-                    defaults={"certificate_number": f"CERT-{user.id}-{course.id}-{int(time.time())}"}
-                )
-                
-                Notification.objects.create(
-                    user=user,
-                    title=f"Cours terminé",
-                    message=f"Félicitations ! Vous avez terminé le cours '{course.title}'. Un certificat a été généré.",
-                    notification_type="achievement"
-                )
+                # Vérifier si toutes les leçons du cours sont terminées
+                # (même contrôle que CertificateViewSet.generate)
+                # Si le cours est terminé, générer un certificat
+                if is_course_completed(user, course):
+                    certificate, cert_created = issue_certificate(user, course)
+                    
+                    enqueue_notification(
+                        user,
+                        type="achievement",
+                        title="Cours terminé",
+                        message=f"Félicitations ! Vous avez terminé le cours '{course}'. Un certificat a été généré.",
+                        idempotency_key=f"course-completed:{course.id}:{user.id}"
+                    )
                 
             return Response(
                 {"detail": f"La leçon '{lesson.title}' a été marquée comme terminée."},
@@ -385,14 +445,105 @@ class LessonViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['post'], url_path='sync', permission_classes=[IsAuthenticated])
+    def sync_completions(self, request):
+        """
+        Synchronise en une fois les leçons complétées hors ligne.
+        On attend 'events' : une liste de {lesson_id, completed_at}. Rejouer
+        le même lot est sans effet.
+        """
+        events = request.data.get('events')
+        if not isinstance(events, list) or not events:
+            return Response({"detail": "events doit être une liste non vide."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(events) > COMPLETION_SYNC_MAX_EVENTS:
+            return Response({"detail": f"Au plus {COMPLETION_SYNC_MAX_EVENTS} événements par lot."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        summary = sync_completions(request.user, events)
+        logger.info(
+            f"Synchronisation de {len(events)} complétions par {request.user}: "
+            f"{sum(1 for result in summary['results'] if result['status'] == 'completed')} nouvelles"
+        )
+        return Response(summary, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'], authentication_classes=[JWTStatelessUserAuthentication],
+            permission_classes=[IsAuthenticated])
+    def heartbeat(self, request, pk=None):
+        """
+        Position de lecture envoyée périodiquement par le lecteur vidéo.
+        On attend 'position' et 'duration' en secondes. Leçon et inscription
+        sont vérifiées au premier battement, les suivants sont sans requête SQL :
+        la position est mise en tampon et écrite en lot par cours.video.
+        """
+        try:
+            lesson_id = int(pk)
+            position = float(request.data.get('position'))
+            duration = float(request.data.get('duration'))
+        except (TypeError, ValueError):
+            return Response({"detail": "position et duration doivent être des nombres."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not (duration > 0 and 0 <= position <= duration):
+            return Response({"detail": "La position doit être comprise entre 0 et duration."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            enrolled = heartbeat_buffer.check_access(int(request.user.id), lesson_id)
+        except Lesson.DoesNotExist:
+            return Response({"detail": "Leçon introuvable."}, status=status.HTTP_404_NOT_FOUND)
+        if not enrolled:
+            return Response(
+                {"detail": "Vous devez être inscrit à ce cours pour suivre cette vidéo."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        heartbeat_buffer.record(int(request.user.id), lesson_id, position, duration)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['get'], url_path='video-progress', permission_classes=[IsAuthenticated])
+    def video_progress(self, request, pk=None):
+        """
+        Position de reprise de la vidéo de la leçon pour l'utilisateur connecté.
+        """
+        lesson = self.get_object()
+        return Response(get_video_position(request.user, lesson.id), status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def video(self, request, pk=None):
+        """
+        URL de lecture signée de la vidéo de la leçon. L'inscription est
+        vérifiée ici, une fois ; les requêtes Range du lecteur n'y reviennent pas.
+        """
+        lesson = self.get_object()
+        if not lesson.video:
+            return Response({"detail": "Cette leçon n'a pas de vidéo."}, status=status.HTTP_404_NOT_FOUND)
+
+        user = request.user
+        if not user.is_staff and not Enrollment.objects.filter(
+            course_id=lesson.module.course_id, user_id=user.id
+        ).exists():
+            return Response(
+                {"detail": "Vous devez être inscrit à ce cours pour voir cette vidéo."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        return Response({"url": video_url(request, lesson), "expires_in": VIDEO_URL_MAX_AGE})
+
 # ---------------------------
 # Vues pour la gestion des devoirs/assignments
 # ---------------------------
 class AssignmentViewSet(viewsets.ModelViewSet):
-    queryset = Assignment.objects.all()
+    queryset = Assignment.objects.select_related('lesson')
     serializer_class = AssignmentSerializer
     permission_classes = [IsAuthenticated, IsEnrolledInCourse]  # Permission personnalisée
 
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated, IsCourseInstructor])
+    def grade_stats(self, request, pk=None):
+        """
+        Statistiques des notes du devoir, normalisées par son barème.
+        """
+        return Response(get_assignment_stats(self.get_object()))
+
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def submit(self, request, pk=None):
         """
@@ -430,34 +581,158 @@ class CertificateViewSet(viewsets.ModelViewSet):
                             status=status.HTTP_400_BAD_REQUEST)
         course = get_object_or_404(Course, id=course_id)
         
-        # Vérifier si l'utilisateur a complété le cours
-        modules = course.modules.all()
-        all_completed = True
-        
-        for module in modules:
-            lessons = module.lessons.all()
-            for lesson in lessons:
-                if not LessonCompletion.objects.filter(user=user, lesson=lesson).exists():
-                    all_completed = False
-                    break
-            if not all_completed:
-                break
-                
-        if not all_completed:
+        # Vérifier si l'utilisateur a complété le cours (une seule requête)
+        if not is_course_completed(user, course):
             return Response(
                 {"detail": "Vous devez compléter toutes les leçons du cours pour obtenir un certificat."},
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        certificate, created = Certificate.objects.get_or_create(
-            user=user,
-            course=course,
-            defaults={"certificate_number": f"CERT-{user.id}-{course.id}-{int(time.time())}"}
-        )
+        certificate, created = issue_certificate(user, course)
         
         serializer = CertificateSerializer(certificate)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
+    def revoke(self, request, pk=None):
+        """
+        Révoque un certificat ; la vérification publique en cache est invalidée.
+        """
+        certificate = self.get_object()
+        revoke_certificate(certificate)
+        logger.info(f"Certificat révoqué: {certificate.certificate_number} par {request.user}")
+        return Response(CertificateSerializer(certificate).data, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path=r'verify/(?P<number>[^/]+)',
+            permission_classes=[AllowAny], authentication_classes=[])
+    def verify(self, request, number=None):
+        """
+        Vérification publique d'un certificat par son numéro. La réponse signée
+        vient du cache et porte un ETag : une requête conditionnelle dont l'ETag
+        correspond reçoit un 304, sans accès à la base.
+        """
+        entry = get_verification(number)
+        if entry is None:
+            response = Response({"detail": "Certificat introuvable."}, status=status.HTTP_404_NOT_FOUND)
+            patch_cache_control(response, public=True, max_age=60)
+            return response
+
+        etags = parse_etags(request.headers.get('If-None-Match', ''))
+        if entry['etag'] in etags or '*' in etags:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(entry['data'])
+        response['ETag'] = entry['etag']
+        patch_cache_control(response, public=True, max_age=CERTIFICATE_VERIFICATION_MAX_AGE)
+        return response
+
+
+# ---------------------------
+# Vues pour la gestion des notifications
+# ---------------------------
+class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = NotificationSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        queryset = Notification.objects.filter(user=self.request.user).order_by('-created_at', '-id')
+        read = self.request.query_params.get('read')
+        if read in ('true', 'false'):
+            queryset = queryset.filter(read=read == 'true')
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        """
+        Nombre de notifications non lues, servi depuis le compteur en cache.
+        """
+        return Response({"unread_count": get_unread_count(request.user)})
+
+    @action(detail=False, methods=['post'])
+    def mark_read(self, request):
+        """
+        Marque comme lues les notifications dont les identifiants sont passés
+        dans 'ids', ou toutes les notifications si 'ids' est absent.
+        """
+        ids = request.data.get('ids')
+        if ids is not None:
+            if not isinstance(ids, list):
+                return Response({"detail": "ids doit être une liste d'identifiants."},
+                                status=status.HTTP_400_BAD_REQUEST)
+            try:
+                ids = [int(value) for value in ids]
+            except (TypeError, ValueError):
+                return Response({"detail": "ids doit être une liste d'identifiants."},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        updated = mark_notifications_read(request.user, ids)
+        return Response({
+            "updated": updated,
+            "unread_count": get_unread_count(request.user),
+        }, status=status.HTTP_200_OK)
+
+
+async def _stream_user(request):
+    """
+    Utilisateur du flux : jeton JWT (en-tête Authorization, ou paramètre
+    'token' puisque EventSource ne permet pas d'envoyer d'en-tête), sinon session.
+    """
+    authentication = JWTAuthentication()
+    raw_token = request.GET.get('token')
+    if raw_token is None:
+        header = authentication.get_header(request)
+        raw_token = authentication.get_raw_token(header) if header else None
+    if raw_token is not None:
+        try:
+            validated = authentication.get_validated_token(raw_token)
+            return await sync_to_async(authentication.get_user)(validated)
+        except (InvalidToken, AuthenticationFailed):
+            return None
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+async def notification_stream(request):
+    """
+    Flux server-sent events des nouvelles notifications de l'utilisateur.
+    Une connexion inactive ne coûte qu'une coroutine en attente sur sa file.
+    Refusé sous WSGI, où chaque connexion bloquerait un thread du serveur.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    if not isinstance(request, ASGIRequest):
+        logger.error("Flux des notifications demandé sous WSGI : servir elearning.asgi:application")
+        return JsonResponse({"detail": "Le flux temps réel nécessite un serveur ASGI."},
+                            status=status.HTTP_501_NOT_IMPLEMENTED)
+    user = await _stream_user(request)
+    if user is None:
+        return JsonResponse({"detail": "Authentification requise."}, status=status.HTTP_401_UNAUTHORIZED)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    response = StreamingHttpResponse(
+        notification_events(user, last_event_id), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Désactive la mise en tampon des proxys (nginx)
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def lesson_video(request, token):
+    """
+    Vidéo de leçon derrière une URL signée (voir LessonViewSet.video), avec
+    prise en charge des requêtes Range pour le déplacement dans la lecture.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    return serve_video(request, token)
+
 
 class UserProfileViewSet(viewsets.ModelViewSet):
     queryset = UserProfile.objects.all()
@@ -489,14 +764,17 @@ class SubmissionViewSet(viewsets.ModelViewSet):
         
         # Filter based on user role
         if not user.is_staff and not user.is_superuser:
-            if hasattr(user, 'instructor_profile'):
-                # Instructors can see submissions for their assignments
-                queryset = queryset.filter(assignment__course__instructor=user)
-            else:
-                # Students can only see their own submissions
-                queryset = queryset.filter(student=user)
+            # Own submissions, and those of the courses the user teaches
+            queryset = queryset.filter(Q(student=user) | Q(assignment__lesson__module__course__instructor=user))
                 
         return queryset
+
+    @property
+    def keyset_ordering(self):
+        # File de correction : échéance la plus proche d'abord, puis ordre d'arrivée
+        if self.action == 'pending_grading':
+            return GRADING_QUEUE_ORDERING
+        return KeysetPagination.ordering
     
     def perform_create(self, serializer):
         # Set the student to the current user if not provided
@@ -528,20 +806,219 @@ class SubmissionViewSet(viewsets.ModelViewSet):
         
         return Response(SubmissionSerializer(submission).data)
     
+    @action(detail=False, methods=['post'])
+    def bulk_grade(self, request):
+        """
+        Note plusieurs soumissions en une requête.
+        Accepte une liste 'grades' ({submission_id, grade, feedback}) ou un
+        fichier CSV 'file' avec les mêmes colonnes. Seules les soumissions des
+        cours enseignés (toutes pour l'équipe) sont notées, les autres sont
+        signalées not_found. Retourne un rapport ligne par ligne.
+        """
+        if not can_grade(request.user):
+            return Response({"detail": "You do not have permission to grade submissions."}, 
+                            status=status.HTTP_403_FORBIDDEN)
+        
+        upload = request.FILES.get('file')
+        if upload:
+            rows = read_grades(io.TextIOWrapper(upload.file, encoding='utf-8-sig'))
+        else:
+            rows = request.data.get('grades')
+            
+        if not rows or not isinstance(rows, list):
+            return Response({"detail": "Une liste 'grades' ou un fichier CSV 'file' est requis."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > GRADING_BULK_MAX_ROWS:
+            return Response({"detail": f"Au plus {GRADING_BULK_MAX_ROWS} lignes par lot."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        # Seulement les soumissions des cours enseignés : jamais les siennes
+        summary = bulk_grade(rows, grading_scope(self.get_queryset(), request.user))
+        logger.info(f"{summary['graded']} soumissions notées en lot par {request.user}")
+        return Response(summary, status=status.HTTP_200_OK)
+    
     @action(detail=False, methods=['get'])
     def my_submissions(self, request):
         """Get all submissions for the current user"""
         queryset = self.get_queryset().filter(student=request.user)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def pending_grading(self, request):
-        """Get all submissions pending grading (for instructors)"""
-        if not request.user.is_staff and not hasattr(request.user, 'instructor_profile'):
-            return Response({"detail": "You do not have permission to access pending submissions."}, 
+        """
+        File de correction : soumissions non notées des cours enseignés (toutes
+        pour l'équipe), triées par échéance puis par date de rendu, paginées
+        par curseur. Filtres 'assignment' et 'claimed' (mine ou available).
+        """
+        claimed = request.query_params.get('claimed')
+        if claimed not in (None, 'mine', 'available'):
+            return Response({"detail": "Le paramètre 'claimed' doit valoir 'mine' ou 'available'."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        queryset = grading_queue(
+            grading_scope(self.filter_queryset(self.get_queryset()), request.user), request.user, claimed
+        )
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def pending_counts(self, request):
+        """
+        Nombre de soumissions à noter (et déjà réservées) par devoir, en une requête.
+        """
+        queryset = grading_scope(self.filter_queryset(self.get_queryset()), request.user)
+        return Response(pending_counts(queryset))
+
+    @action(detail=False, methods=['post'])
+    def claim(self, request):
+        """
+        Réserve les 'count' prochaines soumissions libres de la file (filtre
+        'assignment' facultatif). Plusieurs correcteurs peuvent réserver en
+        même temps sans jamais recevoir la même soumission.
+        """
+        try:
+            count = int(request.data.get('count', 10))
+        except (TypeError, ValueError):
+            count = 0
+        if not 1 <= count <= GRADING_CLAIM_MAX:
+            return Response({"detail": f"'count' doit être compris entre 1 et {GRADING_CLAIM_MAX}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        queryset = grading_scope(self.get_queryset(), request.user)
+        assignment_id = request.data.get('assignment')
+        if assignment_id:
+            queryset = queryset.filter(assignment_id=assignment_id)
+        
+        submissions = claim_submissions(queryset, request.user, count)
+        logger.info(f"{len(submissions)} soumissions réservées par {request.user}")
+        return Response(self.get_serializer(submissions, many=True).data)
+
+    @action(detail=False, methods=['post'])
+    def release(self, request):
+        """
+        Rend à la file les soumissions réservées (liste 'submissions', ou toutes).
+        """
+        ids = request.data.get('submissions')
+        if ids is not None and not isinstance(ids, list):
+            return Response({"detail": "'submissions' doit être une liste d'identifiants."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        released = release_submissions(self.get_queryset(), request.user, ids)
+        return Response({"released": released}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'])
+    def duplicates(self, request):
+        """
+        Soumissions au contenu identique d'un devoir (paramètre 'assignment'),
+        groupées par empreinte, en une requête. La première soumission de
+        chaque groupe est l'original dont les suivantes sont des copies exactes.
+        """
+        if not can_grade(request.user):
+            return Response({"detail": "You do not have permission to access duplicate submissions."},
                             status=status.HTTP_403_FORBIDDEN)
         
-        queryset = self.get_queryset().filter(grade__isnull=True)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        assignment_id = request.query_params.get('assignment')
+        if not assignment_id:
+            return Response({"detail": "Le paramètre 'assignment' est requis."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        # Seulement les devoirs des cours enseignés (tous pour l'équipe)
+        queryset = grading_scope(self.get_queryset(), request.user)
+        groups = identical_submissions(queryset.filter(assignment_id=assignment_id))
+        return Response([
+            {
+                'sha256': group[0].sha256,
+                'original': group[0].id,
+                'submissions': self.get_serializer(group, many=True).data,
+            }
+            for group in groups
+        ])
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """
+        Télécharge le fichier de la soumission sous le nom envoyé par l'étudiant
+        (le stockage le range sous son empreinte).
+        """
+        submission = self.get_object()
+        if not submission.file:
+            raise Http404("Cette soumission n'a pas de fichier.")
+        try:
+            content = submission.file.open('rb')
+        except FileNotFoundError:
+            raise Http404("Fichier introuvable.")
+        filename = submission.original_filename or os.path.basename(submission.file.name)
+        return FileResponse(content, as_attachment=True, filename=filename)
+
+
+# ---------------------------
+# Envoi reprenable des fichiers de soumission
+# ---------------------------
+class UploadSessionViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Envoi par morceaux d'un fichier de devoir (protocole décrit dans cours.uploads).
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(user=self.request.user)
+
+    def create(self, request):
+        """
+        Ouvre un envoi. On attend 'assignment', 'filename', 'size' et, facultatif,
+        'sha256' (empreinte hexadécimale du fichier complet).
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            session = open_session(
+                request.user, data['assignment'], data['filename'], data['size'], data.get('sha256', '')
+            )
+        except UploadError as e:
+            return Response({"detail": e.message}, status=e.status_code)
+        
+        response = Response(self.get_serializer(session).data, status=status.HTTP_201_CREATED)
+        response['Upload-Offset'] = session.offset
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        response['Upload-Offset'] = response.data['offset']
+        return response
+
+    def partial_update(self, request, pk=None):
+        """
+        Reçoit un morceau : corps brut, en-têtes Upload-Offset et, facultatif,
+        Upload-Checksum. Le corps est lu par blocs, jamais chargé en entier.
+        """
+        session = self.get_object()
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers['Content-Length'])
+        except (KeyError, ValueError):
+            return Response({"detail": "Les en-têtes Upload-Offset et Content-Length sont requis."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            checksum = parse_checksum(request.headers.get('Upload-Checksum'))
+            write_chunk(session, request.stream, offset, length, checksum)
+        except UploadError as e:
+            response = Response({"detail": e.message, "offset": session.offset}, status=e.status_code)
+            response['Upload-Offset'] = session.offset
+            return response
+        
+        response = Response(self.get_serializer(session).data, status=status.HTTP_200_OK)
+        response['Upload-Offset'] = session.offset
+        return response
+
+    def destroy(self, request, pk=None):
+        session = self.get_object()
+        abort_session(session)
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -3,6 +3,12 @@ ASGI config for elearning project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Le flux temps réel des notifications (/api/notifications/stream/) est une vue
+asynchrone : servir l'application par ce point d'entrée, avec un serveur ASGI,
+pour qu'une connexion SSE inactive n'occupe pas un thread, par exemple :
+
+    gunicorn elearning.asgi:application -k uvicorn.workers.UvicornWorker
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
@@ -78,6 +78,15 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Media files (vidéos des leçons, devoirs, certificats)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# L'empreinte SHA-256 des fichiers reçus est calculée pendant la réception (cours.blobs)
+FILE_UPLOAD_HANDLERS = [
+    'cours.blobs.HashingMemoryFileUploadHandler',
+    'cours.blobs.HashingTemporaryFileUploadHandler',
+]
+
 ROOT_URLCONF = 'elearning.urls'
 
 TEMPLATES = [
@@ -120,6 +129,17 @@ else:
         }
     }
 
+# Cache partagé par tous les processus (serveur web et workers) : les compteurs
+# et invalidations écrits par un processus sont vus par les autres.
+# Table créée par `manage.py createcachetable` ; Redis possible via CACHE_BACKEND
+# ('django.core.cache.backends.redis.RedisCache') et CACHE_LOCATION ('redis://...').
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': config('CACHE_LOCATION', default='cache_table'),
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 AUTH_PASSWORD_VALIDATORS = [
@@ -176,4 +196,18 @@ USE_TZ = True
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Notifications : backends de distribution utilisés par `manage.py process_notifications`
+# (ex. 'cours.notifications.ConsoleBackend', 'cours.notifications.FileBackend')
+NOTIFICATION_BACKENDS = []
+# Broker du flux temps réel : 'cours.streaming.InProcessBroker' (un seul processus)
+# ou 'cours.streaming.PostgresBroker' (LISTEN/NOTIFY, partagé avec le worker).
+# Vide : PostgresBroker si la base est PostgreSQL, sinon InProcessBroker
+NOTIFICATION_BROKER = config('NOTIFICATION_BROKER', default='')
+
+# Vidéos des leçons : envoi délégué au proxy ('X-Accel-Redirect' pour nginx,
+# 'X-Sendfile' pour Apache) ; vide, Django sert les fichiers par tranches
+VIDEO_SENDFILE_HEADER = config('VIDEO_SENDFILE_HEADER', default='')
+# Location nginx interne (directive `internal`) pointant sur MEDIA_ROOT
+VIDEO_ACCEL_REDIRECT_PREFIX = config('VIDEO_ACCEL_REDIRECT_PREFIX', default='/protected-media/')
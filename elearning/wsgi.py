@@ -3,6 +3,9 @@ WSGI config for elearning project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
 
+Le flux temps réel des notifications (/api/notifications/stream/) répond 501
+sous WSGI : servir l'application par elearning.asgi (voir ce module).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/wsgi/
 """